@@ -16,6 +16,34 @@ And a 'current' set of properties (animated from last 'current' toward 'target')
 Derived bones can attach to 'base' or 'current' properties - generally not 'target'
 """
 #a Local bezier stuff
+#c c_point
+class c_point( object ):
+    """
+    A point of any dimension for the values of 'vector' bones (c_bone_type_vector)
+
+    Each operation returns a new c_point, so values copied between bones are never shared
+    """
+    #f __init__
+    def __init__( self, coords ):
+        self.coords = tuple([c+0.0 for c in coords])
+        pass
+    #f get_coords
+    def get_coords( self ):
+        return self.coords
+    #f add
+    def add( self, other, scale=1.0 ):
+        return c_point( [a+b*scale for (a,b) in zip(self.coords, other.coords)] )
+    #f scale
+    def scale( self, factor ):
+        return c_point( [a*factor for a in self.coords] )
+    #f mult_by_matrix
+    def mult_by_matrix( self, m ):
+        return c_point( [sum([row[j]*self.coords[j] for j in range(len(row))]) for row in m] )
+    #f __repr__
+    def __repr__( self ):
+        return "(%s)"%(",".join(["%f"%c for c in self.coords]))
+    pass
+
 #c c_bezier
 class c_bezier( object ):
     b_coeffs_of_tn = { 1:((1,),) }
@@ -62,6 +90,7 @@ class c_bezier( object ):
     def __init__( self, pts, pt_coords=None, pt_class=None ):
         self.pts = pts
         self.order = len(pts)
+        self._arc_length_tables = {}
         if type(pts[0])==tuple:
             self.dimension = len(pts[0])
             self.pt_coords = lambda p:p
@@ -113,6 +142,54 @@ class c_bezier( object ):
                 pass
             pass
         return self.pt_class(r)
+    #f coord_many
+    def coord_many( self, ts, gradient=False ):
+        """
+        Evaluate the bezier (or its gradient) at every t in ts, using the same basis coefficients as coord
+
+        Returns an (N,dimension) numpy array rather than instances of the point class
+        """
+        import numpy
+        coeffs_of_tn = self.b_coeffs_of_tn[self.order]
+        if gradient:
+            coeffs_of_tn = self.db_coeffs_of_tn[self.order]
+            pass
+        ts = numpy.asarray(ts, dtype=numpy.float64).ravel()
+        tn = numpy.power(ts[:,numpy.newaxis], numpy.arange(self.order))
+        cs = numpy.array([self.pt_coords(p) for p in self.pts], dtype=numpy.float64)
+        return tn.dot(numpy.array(coeffs_of_tn, dtype=numpy.float64).T).dot(cs)
+    #f arc_length_table
+    def arc_length_table( self, segments=32, order=5 ):
+        """
+        Return the bezier.arc_length_table for the curve, building it on first use
+        Tables are cached by segments and order
+        """
+        k = (segments, order)
+        if k not in self._arc_length_tables:
+            self._arc_length_tables[k] = bezier.arc_length_table(lambda ts:self.coord_many(ts, gradient=True),
+                                                                 segments=segments, order=order)
+            pass
+        return self._arc_length_tables[k]
+    #f length
+    def length( self, segments=32, order=5 ):
+        return self.arc_length_table(segments=segments, order=order).length
+    #f t_at_length
+    def t_at_length( self, s, segments=32, order=5, iterations=2 ):
+        """
+        Return the parameter value (or an array of them) at arc length s along the curve,
+        as bezier.bezier_base.t_at_length
+        """
+        return self.arc_length_table(segments=segments, order=order).t_at_length(s, iterations=iterations)
+    #f point_at_length
+    def point_at_length( self, s, segments=32, order=5, iterations=2 ):
+        """
+        Return the point at arc length s along the curve; for a scalar s this is as coord,
+        for an array of lengths it is as coord_many
+        """
+        t = self.t_at_length(s, segments=segments, order=order, iterations=iterations)
+        if type(t)==float:
+            return self.coord(t)
+        return self.coord_many(t)
     pass
 #x = c_bezier( pts=((1,),
 #                   (3,),
@@ -232,6 +309,7 @@ class c_bone_expr_op( c_bone_expr_element ):
             return expression.set_error("Could not find op %s to do"%(str(k)))
         e_op = expression.expression_ops[k]
         n_ops = len(k)-1
+        if (n_ops==0) and (e_op is not True): expression.trace = None
         r = None
         if e_op is True:
             r = True
@@ -244,6 +322,12 @@ class c_bone_expr_op( c_bone_expr_element ):
         else: # if n_ops==2:
             r = e_op[0](stack[-1-e_op[1]],stack[-1-e_op[2]])
             pass
+        if expression.trace is not None:
+            result = 1
+            if r is True: result = True
+            elif type(r)==tuple: result = len(r)
+            expression.trace.append( ("op", e_op, n_ops, result) )
+            pass
         if r is True:
             stack.pop()
             pass
@@ -282,6 +366,9 @@ class c_bone_expr_push( c_bone_expr_element ):
         pass
     #f evaluate
     def evaluate( self, expression, stack, scope ):
+        if expression.trace is not None:
+            expression.trace.append( ("copy", self.v) )
+            pass
         stack.append( self.v.copy() )
         return True
     pass
@@ -306,6 +393,9 @@ class c_bone_expr_push_bone_var( c_bone_expr_element ):
     #f evaluate
     def evaluate( self, expression, stack, scope ):
         node = self.find_node_in_scope(scope)
+        if expression.trace is not None:
+            expression.trace.append( ("node", node) )
+            pass
         stack.append( node )
         return True
     #f find_dependencies
@@ -320,7 +410,15 @@ class c_bone_expr( object ):
     """
     An expression is an initial stack contents and a list of expression elements
     To evaluate the expression the initial stack contents is copied, then the expression elements are evaluated one by one
+
+    The first successful evaluation in a scope is traced, recording the bone variables found
+    and the op chosen for each element from the types on the stack; as the types of stack entries
+    depend only on the script and the variables, the trace is then compiled into a single Python
+    function with a local variable per stack entry, and later evaluations in the same scope run that
+    instead (if use_compiled is True). The compiled function binds the bone variables it refers to,
+    so it is discarded if elements are added or the bone hierarchy changes.
     """
+    use_compiled = True
     expression_ops = {}
     script_op2s = {"mult":c_bone_expr_op(c_bone_op_mult),
                    "add":c_bone_expr_op(c_bone_op_add),
@@ -350,10 +448,24 @@ class c_bone_expr( object ):
     def __init__( self ):
         self.elements = []
         self.error = None
+        self.trace = None
+        self.invalidate()
+        pass
+    #f invalidate
+    def invalidate( self ):
+        """
+        Discard the compiled function, so that the next evaluation is interpreted (and traced) again
+        This must be called if the bone variables the expression refers to change
+        """
+        self.compiled = None
+        self.compiled_scope = None
+        self.compiled_source = None
+        self.compiled_generation = None
         pass
     #f add_element
     def add_element( self, e ):
         self.elements.append( e )
+        self.invalidate()
         pass
     #f add_script
     def add_script( self, script ):
@@ -422,14 +534,79 @@ class c_bone_expr( object ):
         return self.error is not None
     #f evaluate
     def evaluate( self, scope ):
-        stack = []
         self.clear_error()
+        if self.use_compiled:
+            if ((self.compiled is not None) and (self.compiled_scope is scope) and
+                (self.compiled_generation == c_bone_base.generation)):
+                return self.compiled(self)
+            self.trace = []
+            pass
+        stack = []
         for e in self.elements:
             if not e.evaluate( self, stack, scope ): break
             pass
+        trace = self.trace
+        self.trace = None
         if self.errored():
             return (False, self.get_error())
+        if trace is not None:
+            self.compile( trace, scope )
+            pass
         return (True, stack )
+    #f compile
+    def compile( self, trace, scope ):
+        """
+        Compile a trace of a successful evaluation into a function of the expression
+        that returns the same as evaluate
+        """
+        constants = {}
+        lines = ["def compiled(expression):"]
+        depth = 0
+        for t in trace:
+            c = "c%d"%len(constants)
+            if t[0]=="copy":
+                constants[c] = t[1]
+                lines.append("    s%d = %s.copy()"%(depth,c))
+                depth += 1
+                pass
+            elif t[0]=="node":
+                constants[c] = t[1]
+                lines.append("    s%d = %s"%(depth,c))
+                depth += 1
+                pass
+            elif t[1] is True:
+                depth -= 1
+                pass
+            else:
+                (e_op, n_ops, result) = t[1:]
+                constants[c] = e_op[0]
+                lines.append("    r = %s(%s)"%(c, ", ".join(["s%d"%(depth-1-i) for i in e_op[1:]])))
+                lines.append("    if r is None:")
+                lines.append("        expression.set_error('Expression failed')")
+                lines.append("        return (False, expression.get_error())")
+                if result is True:
+                    depth -= 1
+                    pass
+                elif result==1:
+                    depth -= n_ops
+                    lines.append("    s%d = r"%depth)
+                    depth += 1
+                    pass
+                else:
+                    depth -= n_ops
+                    lines.append("    (%s,) = r"%(", ".join(["s%d"%(depth+i) for i in range(result)])))
+                    depth += result
+                    pass
+                pass
+            pass
+        lines.append("    return (True, [%s])"%(", ".join(["s%d"%i for i in range(depth)])))
+        source = "\n".join(lines)+"\n"
+        exec source in constants
+        self.compiled = constants["compiled"]
+        self.compiled_scope = scope
+        self.compiled_source = source
+        self.compiled_generation = c_bone_base.generation
+        pass
     #f find_dependencies
     def find_dependencies( self, scope ):
         stack = []
@@ -591,17 +768,25 @@ c_bone_type_scalar.add_type()
 class c_bone_base( object ):
     """
     This class is the base class for bones, bone variables, and bone groups. It permits a hierarchical naming system and search.
+
+    Children are indexed by name, and each node caches the results of find_node; any change to
+    the hierarchy (add_child or set_parent) increments the class generation, which invalidates
+    every node's cache (and every compiled expression, as those bind the nodes they refer to).
     """
     #v Required properties
     bone_variables = None
     has_instance = False
     is_bone = False
     is_drawable = False
+    generation = 0
     #f __init__
     def __init__( self, name, parent=None, **kwargs ):
         self.name = name
         self.bone_variables = {}
         self.children = []
+        self.children_by_name = {}
+        self.path_cache = {}
+        self.path_cache_generation = c_bone_base.generation
         self.parent = parent
         if parent is not None: parent.add_child(self)
         self.expressions = {}
@@ -609,6 +794,7 @@ class c_bone_base( object ):
     #f set_parent
     def set_parent( self, parent ):
         self.parent = parent
+        c_bone_base.generation += 1
         return self
     #f add_expression
     def add_expression( self, id, scope, script=None ):
@@ -652,9 +838,20 @@ class c_bone_base( object ):
             c.collate_dependencies(result)
             pass
         return result
+    #f create_dependency_graph
+    def create_dependency_graph( self ):
+        """
+        Create the dependency graph of this node and its children; setting any of their
+        bone variables afterwards marks just the expressions that depend on it as dirty,
+        and the graph's update method evaluates those
+        """
+        return c_bone_dependency_graph( self )
     #f add_child
     def add_child( self, node ):
         self.children.append(node)
+        if node.name not in self.children_by_name:
+            self.children_by_name[node.name] = node
+            pass
         node.set_parent(self)
         return node
     #f find_node
@@ -675,16 +872,32 @@ class c_bone_base( object ):
     #f find_node
     def find_node( self, hierarchical_name, result=None ):
         if result is None: result=[]
-        if type(hierarchical_name)==str: hierarchical_name=hierarchical_name.split('.')
-        return self.find_node_in_children( hierarchical_name, result)
+        if self.path_cache_generation != c_bone_base.generation:
+            self.path_cache = {}
+            self.path_cache_generation = c_bone_base.generation
+            pass
+        if type(hierarchical_name)==str:
+            k = hierarchical_name
+            hierarchical_name = hierarchical_name.split('.')
+            pass
+        else:
+            k = tuple(hierarchical_name)
+            pass
+        if k in self.path_cache:
+            (node, path) = self.path_cache[k]
+            result.extend(path)
+            return (node, result)
+        start = len(result)
+        r = self.find_node_in_children( hierarchical_name, result)
+        self.path_cache[k] = (r[0], result[start:])
+        return r
     #f find_node_in_children
     def find_node_in_children( self, hierarchical_name, result ):
-        for c in self.children:
-            if hierarchical_name[0] == c.name:
-                result.append(c)
-                if len(hierarchical_name)==1: return (c, result)
-                return c.find_node_in_children( hierarchical_name[1:], result)
-            pass
+        c = self.children_by_name.get(hierarchical_name[0])
+        if c is not None:
+            result.append(c)
+            if len(hierarchical_name)==1: return (c, result)
+            return c.find_node_in_children( hierarchical_name[1:], result)
         for i in range(len(hierarchical_name)): result.append(None)
         return (self, result)
     #f e_failed_to_find_node
@@ -760,6 +973,7 @@ class c_bone_var( c_bone_base ):
     It may be defined by a stack of operations which permit operations on other bone variables.
     """
     has_instance = True
+    dependency_graph = None
     #f __init__
     def __init__( self, name, var_type=None, **kwargs ):
         c_bone_base.__init__( self, name, **kwargs )
@@ -782,6 +996,9 @@ class c_bone_var( c_bone_base ):
         return self.var_instance.set(inst.get())
     #f set
     def set( self, value ):
+        if self.dependency_graph is not None:
+            self.dependency_graph.mark_dirty(self)
+            pass
         return self.var_instance.set(value, var=self)
     #f get
     def get( self ):
@@ -869,6 +1086,264 @@ c_bone_expr.add_op( (c_bone_op_direction, c_bone_type_scalar, c_bone_type_bezier
 c_bone_expr.add_op( (c_bone_op_point, c_bone_type_bezier, c_bone_type_scalar ), (c_bone_type_bezier.coord, 0, 1 ) )
 c_bone_expr.add_op( (c_bone_op_point, c_bone_type_scalar, c_bone_type_bezier ), (c_bone_type_bezier.coord, 1, 0 ) )
 
+#a Dependency graph
+#c c_bone_dependency_graph
+class c_bone_dependency_graph( object ):
+    """
+    The expressions of a bone hierarchy ordered by the bone variables they read and define
+
+    An expression must be evaluated after every expression that defines a variable it reads;
+    reading a bezier variable counts as reading the vector variables that are its points
+    (the implicit dependents of those vectors). The expressions are sorted into that order
+    once, failing if there is a cycle.
+
+    Every expression starts dirty. Setting a bone variable (with its set method) marks
+    the expressions that read it dirty, and the expressions that read what those define,
+    and so on; update evaluates just the dirty expressions, in order.
+    """
+    #f __init__
+    def __init__( self, root ):
+        self.root = root
+        root.create_dependencies()
+        entries = root.collate_dependencies()
+        implicit_sources = {}
+        def find_vars( node, state ):
+            if isinstance(node, c_bone_var):
+                node.dependency_graph = self
+                for i in node.instance().get_implicit_dependents():
+                    if i not in implicit_sources: implicit_sources[i] = []
+                    implicit_sources[i].append(node)
+                    pass
+                pass
+            return None
+        root.iterate( find_vars )
+        self.readers = {}
+        self.defines = {}
+        writers = {}
+        for (node,id,deps,defs) in entries:
+            k = (node,id)
+            self.defines[k] = defs
+            reads = []
+            for d in deps:
+                for v in [d]+implicit_sources.get(d,[]):
+                    if (v not in defs) and (v not in reads): reads.append(v)
+                    pass
+                pass
+            for v in reads:
+                if v not in self.readers: self.readers[v] = []
+                self.readers[v].append(k)
+                pass
+            for d in defs:
+                if d not in writers: writers[d] = []
+                writers[d].append(k)
+                pass
+            pass
+        successors = {}
+        n_predecessors = {}
+        for (node,id,deps,defs) in entries:
+            successors[(node,id)] = []
+            n_predecessors[(node,id)] = 0
+            pass
+        for (v, ks) in self.readers.iteritems():
+            for w in writers.get(v,[]):
+                for k in ks:
+                    if (k==w) or (k in successors[w]): continue
+                    successors[w].append(k)
+                    n_predecessors[k] += 1
+                    pass
+                pass
+            pass
+        self.order = []
+        ready = [(node,id) for (node,id,deps,defs) in entries if n_predecessors[(node,id)]==0]
+        while len(ready)>0:
+            k = ready.pop(0)
+            self.order.append(k)
+            for s in successors[k]:
+                n_predecessors[s] -= 1
+                if n_predecessors[s]==0: ready.append(s)
+                pass
+            pass
+        if len(self.order)!=len(entries):
+            cycle = [k for k in n_predecessors if n_predecessors[k]>0]
+            raise Exception("Cyclic dependency chain:%s"%(str(cycle)))
+        self.position = {}
+        for i in range(len(self.order)):
+            self.position[self.order[i]] = i
+            pass
+        self.dirty = set(self.order)
+        pass
+    #f mark_dirty
+    def mark_dirty( self, var ):
+        """
+        Mark every expression downstream of a bone variable as dirty
+        """
+        to_do = [var]
+        while len(to_do)>0:
+            v = to_do.pop()
+            for k in self.readers.get(v,[]):
+                if k in self.dirty: continue
+                self.dirty.add(k)
+                to_do.extend(self.defines[k])
+                pass
+            pass
+        pass
+    #f is_dirty
+    def is_dirty( self ):
+        return len(self.dirty)>0
+    #f update
+    def update( self ):
+        """
+        Evaluate the dirty expressions in dependency order, returning the number evaluated
+        """
+        if len(self.dirty)==0: return 0
+        dirty = sorted(self.dirty, key=lambda k:self.position[k])
+        self.dirty = set()
+        for (node,id) in dirty:
+            node.evaluate_expressions( ids=(id,) )
+            pass
+        return len(dirty)
+    #f detach
+    def detach( self ):
+        """
+        Stop setting bone variables from marking this graph dirty
+        """
+        def detach_vars( node, state ):
+            if isinstance(node, c_bone_var) and node.dependency_graph is self:
+                node.dependency_graph = None
+                pass
+            return None
+        self.root.iterate( detach_vars )
+        pass
+    #f All done
+    pass
+
+#a Baked animation
+#c c_bone_baked_animation
+class c_bone_baked_animation( object ):
+    """
+    Bezier bone coordinates sampled at fixed parameter values for every frame of an animation
+
+    data is a (frames, bones, samples, 2) float32 array, with the coordinates of bone b at
+    parameter ts[s] in frame f at data[f,b,s]; bone_names gives the hierarchical name of each bone
+    """
+    #f __init__
+    def __init__( self, data, bone_names=None, ts=None ):
+        import numpy
+        self.data = data
+        if bone_names is None: bone_names = []
+        self.bone_names = list(bone_names)
+        if ts is None: ts = numpy.linspace(0.0, 1.0, data.shape[2])
+        self.ts = ts
+        pass
+    #f num_frames
+    def num_frames( self ):
+        return self.data.shape[0]
+    #f bone_index
+    def bone_index( self, bone_name ):
+        return self.bone_names.index(bone_name)
+    #f frame
+    def frame( self, n ):
+        """
+        Return the (bones, samples, 2) array of coordinates for frame n
+        """
+        return self.data[n]
+    #f coords_at
+    def coords_at( self, time ):
+        """
+        Return the (bones, samples, 2) array of coordinates at a fractional frame time,
+        interpolating linearly between frames (and clamping to the first and last frames)
+        """
+        n = self.data.shape[0]
+        time = min(max(time, 0.0), n-1.0)
+        f = min(int(time), n-2) if n>1 else 0
+        u = time-f
+        if u==0: return self.data[f]
+        return self.data[f]*(1.0-u) + self.data[f+1]*u
+    #f save
+    def save( self, filename ):
+        """
+        Save the data as a .npy file (to which memory mapping can be applied on load), and the
+        bone names one per line in a file of the same name with '.bones' appended
+        """
+        import numpy
+        numpy.save( filename, self.data )
+        f = open( filename+".bones", "w" )
+        for n in self.bone_names:
+            print >>f, n
+            pass
+        f.close()
+        pass
+    #f load
+    @classmethod
+    def load( cls, filename, mmap=True ):
+        """
+        Load an animation saved with save, memory mapping the data (read-only) unless mmap is False
+        """
+        import numpy
+        data = numpy.load( filename, mmap_mode=("r" if mmap else None) )
+        bone_names = None
+        if os.path.exists(filename+".bones"):
+            f = open( filename+".bones" )
+            bone_names = [l.rstrip("\n") for l in f.readlines()]
+            f.close()
+            pass
+        return cls( data, bone_names=bone_names )
+    #f All done
+    pass
+
+#f find_bezier_bones
+def find_bezier_bones( root ):
+    """
+    Find all the bezier bone variables below root, returning a list of (hierarchical name, node)
+    """
+    bones = []
+    def find_beziers( node, state ):
+        name = node.name
+        if "name" in state: name = "%s.%s"%(state["name"], node.name)
+        if isinstance(node, c_bone_var) and (node.var_type is c_bone_type_bezier):
+            bones.append( (name, node) )
+            pass
+        if node is root: return None
+        return {"name":name}
+    root.iterate( find_beziers )
+    return bones
+
+#f bake_animation
+def bake_animation( root, frames, frame_fn=None, samples=16, bones=None, graph=None ):
+    """
+    Evaluate a bone hierarchy for each frame of an animation, and bake the coordinates of
+    its bezier bones into a c_bone_baked_animation
+
+    For each frame, frame_fn(root, frame) sets the bone variables that drive the animation; the
+    expressions that depend on them are then evaluated with a dependency graph, and the first two
+    coordinates of each bone's bezier are sampled at samples evenly spaced parameter values
+
+    @frames:   Number of frames (0 to frames-1), or a list of frame values to pass to frame_fn
+    @frame_fn: Function to set up the hierarchy for a frame
+    @samples:  Number of parameter values at which to sample each bone
+    @bones:    List of hierarchical names of bezier bones below root to bake, or None for all
+    @graph:    Dependency graph of root to use, or None to create one
+    """
+    import numpy
+    if type(frames)==int: frames = range(frames)
+    if bones is None:
+        bones = find_bezier_bones( root )
+        pass
+    else:
+        bones = [ (b, root.find_node_or_fail(b)) for b in bones ]
+        pass
+    if graph is None: graph = root.create_dependency_graph()
+    ts = numpy.linspace(0.0, 1.0, samples)
+    data = numpy.empty( (len(frames), len(bones), samples, 2), dtype=numpy.float32 )
+    for i in range(len(frames)):
+        if frame_fn is not None: frame_fn( root, frames[i] )
+        graph.update()
+        for j in range(len(bones)):
+            data[i,j] = bones[j][1].instance().bezier.coord_many(ts)[:,0:2]
+            pass
+        pass
+    return c_bone_baked_animation( data, bone_names=[b[0] for b in bones], ts=ts )
+
 #a Functions
 #f add_bezier_bone
 def add_bezier_bone( parent, bone_name, script, scope=None, num_pts=3 ):
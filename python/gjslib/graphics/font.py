@@ -135,18 +135,18 @@ class c_glyph( object ):
         lines = []
         contours = self.create_bezier_lists()
         for bl in contours:
-            points = []
-            lines.append(points)
-            for b in bl:
-                subbeziers = b.break_into_segments(straightness)
-                for s in subbeziers:
-                    points.append(s.pts[0])
-                    pass
-                pass
+            lines.append(bezier.flatten_bezier_list_points(bl, straightness, cache=bezier.default_flatten_cache))
             pass
         return lines
     #f get_mesh
-    def get_mesh( self, straightness=50 ):
+    def get_mesh( self, straightness=50, constrained_delaunay=True ):
+        """
+        Get the mesh for the glyph, creating it if required
+
+        If constrained_delaunay is True then the mesh is the constrained Delaunay triangulation
+        of the contours, else it is created by filling the convex hull of the contour points and
+        repeatedly ensuring the contours are on the mesh and removing small lines and triangles
+        """
         if self.mesh is not None: return self.mesh
         m = mesh.c_mesh()
         contours = self.create_bezier_lists()
@@ -154,18 +154,15 @@ class c_glyph( object ):
             m.add_bezier_list_contour( bezier_list=bl, closed=True, contour_data=None, straightness=straightness )
             pass
         m.map_contours_to_mesh()
+        if constrained_delaunay:
+            self.mesh = m.triangulate_contours()
+            return self.mesh
         m.normalize()
         m.fill_convex_hull_with_triangles()
-        m.remove_small_lines(min_length=0.01)
-        m.remove_small_area_triangles( min_area=0.01)
-        for i in range(10):
-            if m.shorten_quad_diagonals()==0: break
-            pass
+        m.cleanup( min_length=0.01, min_area=0.01 )
         for i in range(10):
-            m.ensure_contours_on_mesh()
-            m.shorten_quad_diagonals()
-            m.remove_small_lines(min_length=0.01)
-            m.remove_small_area_triangles( min_area=0.01)
+            if m.ensure_contours_on_mesh()==0: break
+            m.cleanup( min_length=0.01, min_area=0.01 )
             pass
         m.assign_winding_order_to_contours()
         m.assign_winding_order_to_mesh()
@@ -764,9 +761,9 @@ class c_ttx_font( object ):
         glyph = self.glyphs[glyph_name]
         return glyph.create_straight_lines(straightness=straightness)
     #f get_mesh
-    def get_mesh( self, glyph_name, straightness=50 ):
+    def get_mesh( self, glyph_name, straightness=50, constrained_delaunay=True ):
         glyph = self.glyphs[glyph_name]
-        return glyph.get_mesh( straightness=straightness )
+        return glyph.get_mesh( straightness=straightness, constrained_delaunay=constrained_delaunay )
     #f generate_outline
     def generate_outline(self, glyphs='ab', straightness=10):
         font_glyphs = self.get_glyph_unichrs()
@@ -702,7 +702,7 @@ class c_opengl_camera_app(c_opengl_app):
 
 #a Test app
 class c_opengl_test_app(c_opengl_camera_app):
-    use_primitive_restart = False
+    straightness = 0.0001
     patches = { "flat_xy_square": ( (0,0,0),     (1/3.0,0,0),     (2/3.0,0,0),   (1,0,0),
                                     (0,1/3.0,0), (1/3.0,1/3.0,0), (2/3.0,1/3.0,0), (1,1/3.0,0),
                                     (0,2/3.0,0), (1/3.0,2/3.0,0), (2/3.0,2/3.0,0), (1,2/3.0,0),
@@ -733,50 +733,17 @@ class c_opengl_test_app(c_opengl_camera_app):
         from gjslib.math import bezier
         from ctypes import sizeof, c_float, c_void_p, c_uint
 
-        pts = []
-        for coords in self.patch:
-            pts.append( bezier.c_point(coords=coords) )
-            pass
-        bp = bezier.c_bezier_patch( pts=pts )
+        bp = bezier.bezier_cubic_patch( pts=self.patch )
+        (data_array, index_list) = bp.tessellate( straightness=self.straightness )
+        data_array[:,0:3] = data_array[:,0:3]*2.0 - (1.0,1.0,0.0)
 
         float_size = sizeof(c_float)
         vertex_offset    = c_void_p(0 * float_size)
         normal_offset    = c_void_p(3 * float_size)
-        record_len       = 6 * float_size
-        data_array = []
-        n = 14
-        for i in range(n+1):
-            for j in range(n+1):
-                data_array.append( bp.coord(i/(n+0.0),j/(n+0.0)).get_coords(scale=(2.0,2.0,2.0),offset=(-1.,-1.0,.0)) )
-                data_array.append( bp.normal(i/(n+0.0),j/(n+0.0)).get_coords() )
-                pass
-            pass
+        record_len       = 8 * float_size
 
-        vertices = vbo.VBO( data=numpy.array(data_array, dtype=numpy.float32) )
-        index_list = []
-        if self.use_primitive_restart:
-            glEnable(GL_PRIMITIVE_RESTART) 
-            pass
-        for j in range(n):
-            for i in range(n+1):
-                index_list.append( i+j*(n+1) )
-                index_list.append( i+(j+1)*(n+1) )
-                pass
-            if j<(n-1):
-                if self.use_primitive_restart:
-                    index_list.append( 255 )
-                    pass
-                else:
-                    index_list.append( (n)+(j+1)*(n+1) )
-                    index_list.append( (n)+(j+1)*(n+1) )
-                    index_list.append( (j+1)*(n+1) )
-                    index_list.append( (j+1)*(n+1) )
-                    pass
-            pass
-    
-        print index_list
-        indices = vbo.VBO( data=numpy.array( index_list, dtype=numpy.uint8),
-                           target=GL_ELEMENT_ARRAY_BUFFER )
+        vertices = vbo.VBO( data=data_array )
+        indices = vbo.VBO( data=index_list, target=GL_ELEMENT_ARRAY_BUFFER )
         vertices.bind()
         indices.bind()
         self.opengl_surface["vertices"] = vertices
@@ -873,9 +840,9 @@ class c_opengl_test_app(c_opengl_camera_app):
         glVertexPointer( 3, GL_FLOAT, self.opengl_surface["record_len"], self.opengl_surface["vertex_offset"] )
         glNormalPointer( GL_FLOAT,    self.opengl_surface["record_len"], self.opengl_surface["normal_offset"])
         self.opengl_surface["indices"].bind()
-        glDrawElements( GL_TRIANGLE_STRIP,
+        glDrawElements( GL_TRIANGLES,
                         len(self.opengl_surface["indices"]),
-                        GL_UNSIGNED_BYTE,
+                        GL_UNSIGNED_INT,
                         self.opengl_surface["indices"] )
 
         pass
@@ -75,16 +75,10 @@ class c_opengl_textured_mesh(object):
         self.mesh.map_contours_to_mesh()
         self.mesh.normalize()
         self.mesh.fill_convex_hull_with_triangles()
-        self.mesh.remove_small_lines(min_length=min_length)
-        self.mesh.remove_small_area_triangles( min_area=min_area)
+        self.mesh.cleanup( min_length=min_length, min_area=min_area )
         for i in range(10):
-            if self.mesh.shorten_quad_diagonals()==0: break
-            pass
-        for i in range(10):
-            self.mesh.ensure_contours_on_mesh()
-            self.mesh.shorten_quad_diagonals()
-            self.mesh.remove_small_lines(min_length=min_length)
-            self.mesh.remove_small_area_triangles(min_area=min_area)
+            if self.mesh.ensure_contours_on_mesh()==0: break
+            self.mesh.cleanup( min_length=min_length, min_area=min_area )
             pass
         self.mesh.ensure_contours_on_mesh()
         self.mesh.assign_winding_order_to_contours()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+#a Documentation
+"""
+A drop-in replacement for matrix.matrix whose data is a contiguous numpy float64 buffer
+
+The methods match those of matrix.matrix, but the inner loops
+(multiplication, application to a vector, LU decomposition and the
+substitutions for solving and inversion) are carried out by numpy rather
+than in Python. Determinants and inverses come from the remembered LU
+factorization, as for matrix.matrix.
+
+self.matrix is a flat numpy array in row-major order, so get_matrix()
+returns the buffer itself (suitable for passing straight to OpenGL),
+and apply(), get_row() and get_column() return numpy arrays rather
+than lists.
+
+apply_many() transforms a whole (N,order) array of points in one call,
+optionally into a caller-supplied output buffer.
+"""
+
+#a Imports
+import math
+import numpy
+from matrix import matrix, lup_factorization
+
+#a Classes
+#c array_lup_factorization
+class array_lup_factorization(lup_factorization):
+    """
+    LU factorization of an array_matrix, whose solves substitute for
+    all the right-hand sides at once with numpy
+    """
+    #f solve
+    def solve(self, b):
+        """
+        Solve A.x = b for x, where A is the decomposed matrix
+        Returns x as a numpy array, or None if the matrix is singular
+        """
+        X = self.solve_many([b])
+        if X is None: return None
+        return X[0]
+    #f solve_many
+    def solve_many(self, B):
+        """
+        Solve A.x = b for each vector b in B (an (k,n) array)
+        Returns a (k,n) array of solutions, or None if the matrix is singular
+        """
+        if self.singular: return None
+        n = self.n
+        lu = self.LU.as_array()
+        X = numpy.array(B, dtype=numpy.float64)[:,self.P]
+        for r in range(1,n):
+            X[:,r] -= numpy.dot(X[:,:r], lu[r,:r])
+            pass
+        for r in range(n-1,-1,-1):
+            X[:,r] -= numpy.dot(X[:,r+1:], lu[r,r+1:])
+            X[:,r] /= lu[r,r]
+            pass
+        return X
+    #f All done
+    pass
+
+#c array_matrix
+class array_matrix(matrix):
+    """
+    N x N matrix, held in a flat numpy float64 array in row-major order
+    """
+    factorization_class = array_lup_factorization
+    #f multiply_matrix_data
+    @classmethod
+    def multiply_matrix_data( cls, n, m0, m1 ):
+        return numpy.dot(numpy.reshape(m0,(n,n)), numpy.reshape(m1,(n,n))).ravel()
+    #f __init__
+    def __init__(self, order=None, data=None):
+        if data is not None:
+            data = numpy.array(data, dtype=numpy.float64).ravel()
+            pass
+        if order is None:
+            if data is None:
+                order=self.order
+                pass
+            else:
+                order = int(round(math.sqrt(len(data))))
+                pass
+            pass
+        self.order = order
+        if data is None:
+            self.matrix = numpy.zeros(order*order)
+            pass
+        else:
+            if len(data) != order*order:
+                raise Exception("Bad data for order %d matrix"%order)
+            self.matrix = data
+            pass
+        pass
+    #f as_array
+    def as_array(self):
+        """
+        Return an (order,order) view of the matrix data
+        """
+        return self.matrix.reshape((self.order,self.order))
+    #f set_identity
+    def set_identity(self):
+        self.matrix = numpy.identity(self.order).ravel()
+        return self
+    #f get_matrix
+    def get_matrix(self, row_major=True):
+        if row_major:
+            return self.matrix
+        return self.as_array().T.ravel()
+    #f get_row
+    def get_row(self, r):
+        n = self.order
+        return self.matrix[r*n:(r+1)*n].copy()
+    #f get_column
+    def get_column(self, c):
+        n = self.order
+        return self.matrix[c:n*n+c:n].copy()
+    #f copy
+    def copy(self):
+        return self.__class__(data=self.matrix)
+    #f expand
+    def expand(self, order):
+        if order<self.order:
+            raise Exception("Attempt to shrink a matrix order with 'expand'")
+        m = numpy.identity(order)
+        m[:self.order,:self.order] = self.as_array()
+        self.matrix = m.ravel()
+        self.order = order
+        return self
+    #f shrink
+    def shrink(self, order, r=0, c=0):
+        if order+r>self.order:
+            raise Exception("Attempt to shrink with data beyond the width of the matrix")
+        if order+c>self.order:
+            raise Exception("Attempt to shrink with data beyond the height of the matrix")
+        self.matrix = self.as_array()[r:r+order,c:c+order].ravel()
+        self.order = order
+        return self
+    #f set_perspective
+    def set_perspective(self,fov,aspect,zFar,zNear):
+        matrix.set_perspective(self,fov,aspect,zFar,zNear)
+        self.matrix = numpy.array(self.matrix, dtype=numpy.float64)
+        pass
+    #f scale
+    def scale(self, scale=1.0):
+        n = self.order
+        if type(scale) in (int, float):
+            scale = [float(scale)]*n
+            pass
+        k = min(n,len(scale))
+        self.as_array()[:,:k] *= numpy.asarray(scale[:k],dtype=numpy.float64)
+        return self
+    #f apply
+    def apply(self, v, perspective=False):
+        if (not perspective) and len(v)==self.order:
+            return numpy.dot(self.as_array(), v)
+        return self.apply_many(numpy.asarray(v,dtype=numpy.float64)[numpy.newaxis,:], perspective=perspective)[0]
+    #f apply_many
+    def apply_many(self, points, perspective=False, out=None):
+        """
+        Apply the matrix to an (N,order) array of points, returning an (N,order) array
+
+        Points may instead be given as (N,order-1), in which case their final coordinate is taken to be 1
+        If perspective is True then each result is divided through by its last coordinate (if nonzero)
+        If out is given it must be a C-contiguous float64 (N,order) array; the
+        results are written into it and it is returned, so nothing is allocated
+        """
+        n = self.order
+        points = numpy.asarray(points, dtype=numpy.float64)
+        m = self.as_array()
+        if out is None:
+            out = numpy.empty((len(points),n))
+            pass
+        if points.shape[-1]==n-1:
+            numpy.dot(points, m[:,:n-1].T, out=out)
+            out += m[:,n-1]
+            pass
+        else:
+            numpy.dot(points, m.T, out=out)
+            pass
+        if perspective:
+            w = out[:,n-1:]
+            nonzero = (w!=0)
+            numpy.divide(out[:,:n-1], w, out=out[:,:n-1], where=nonzero)
+            numpy.divide(w, w, out=w, where=nonzero)
+            pass
+        return out
+    #f transpose
+    def transpose(self):
+        self.matrix = self.as_array().T.ravel()
+        return self
+    #f premult
+    def premult(self, matrix=None, data=None):
+        if matrix is not None: data=matrix.matrix
+        self.matrix = self.multiply_matrix_data(self.order, data, self.matrix)
+        return self
+    #f postmult
+    def postmult(self, matrix=None, data=None):
+        if matrix is not None: data=matrix.matrix
+        self.matrix = self.multiply_matrix_data(self.order, self.matrix, data)
+        return self
+    #f lup_decompose
+    def lup_decompose(self):
+        """
+        Decompose into L and U matrices with a pivot P
+
+        The same partial pivoting as matrix.lup_decompose is used, with
+        the elimination below each pivot done a whole block at a time
+        """
+        n =  self.order
+        P = range(n)
+        LU = self.copy()
+        lu = LU.as_array()
+        for d in range(n-1):
+            r_max = d + int(numpy.argmax(numpy.abs(lu[d:,d])))
+            if lu[r_max,d]==0:
+                return None
+            if r_max != d:
+                (P[d], P[r_max]) = (P[r_max], P[d])
+                lu[[d,r_max],:] = lu[[r_max,d],:]
+                pass
+            lu[d+1:,d] /= lu[d,d]
+            lu[d+1:,d+1:] -= numpy.outer(lu[d+1:,d], lu[d,d+1:])
+            pass
+        return self.factorization_class(LU, P)
+    #f factorization_key
+    def factorization_key(self):
+        return self.matrix.tostring()
+    #f lup_invert
+    def lup_invert(self, P):
+        """
+        self should be an LU matrix; returns the inverse of the matrix that was decomposed
+        If A[P] = L.U then A-1 = (L.U)-1 . I[P]
+
+        This substitutes forward through L and back through U a whole row at a time
+        """
+        n = self.order
+        lu = self.as_array()
+        if numpy.any(numpy.diagonal(lu)==0.0): return None
+        X = numpy.identity(n)[P,:]
+        for r in range(1,n):
+            X[r,:] -= numpy.dot(lu[r,:r], X[:r,:])
+            pass
+        for r in range(n-1,-1,-1):
+            X[r,:] -= numpy.dot(lu[r,r+1:], X[r+1:,:])
+            X[r,:] /= lu[r,r]
+            pass
+        return self.__class__(data=X)
+    #f unpivot
+    def unpivot(self, P):
+        """
+        'Unapply' the pivot P
+        """
+        return self.__class__(data=self.as_array()[numpy.argsort(P),:])
+    #f lu_split
+    def lu_split(self):
+        """
+        Split an LU where L has diagonal of 1s and is stored in lower half, U is upper half
+        """
+        lu = self.as_array()
+        L = self.__class__(data=numpy.tril(lu,-1)+numpy.identity(self.order))
+        U = self.__class__(data=numpy.triu(lu))
+        return (L, U)
+    #f eigenvalues
+    def eigenvalues(self, real=True, epsilon=1E-6):
+        """
+        Find the eigenvalues of a matrix of any order
+
+        If real is True then only real eigenvalues are returned - as with polynomial.cubic.find_real_roots,
+        those with an imaginary part of magnitude less than epsilon
+        """
+        e = numpy.linalg.eigvals(self.as_array())
+        if real:
+            return [float(x.real) for x in e if abs(x.imag)<epsilon]
+        return [complex(x) for x in e]
+    #f All done
+    pass
+
+#a Main
+def main():
+    import time
+    def bench(f, number):
+        t = time.time()
+        for i in xrange(number): f()
+        return (time.time()-t)/number*1E6
+    print "Time per call in microseconds, pure Python matrix vs array_matrix"
+    print "%5s %-12s %10s %10s"%("order","operation","matrix","array")
+    for n in [2, 3, 4, 8]:
+        data = list(numpy.random.random(n*n)+numpy.identity(n).ravel()*n)
+        v    = list(numpy.random.random(n))
+        m  = matrix(order=n, data=data)
+        am = array_matrix(order=n, data=data)
+        number = {2:2000, 3:2000, 4:1000, 8:200}[n]
+        for (name, f, af) in [("postmult",    lambda:m.copy().postmult(m),  lambda:am.copy().postmult(am)),
+                              ("apply",       lambda:m.apply(v),            lambda:am.apply(v)),
+                              ("transpose",   lambda:m.transpose(),         lambda:am.transpose()),
+                              ("lup_decomp",  lambda:m.lup_decompose(),     lambda:am.lup_decompose()),
+                              # A copy has no remembered factorization, so these time a full decomposition each call
+                              ("determinant", lambda:m.copy().determinant(), lambda:am.copy().determinant()),
+                              ("inverse",     lambda:m.copy().inverse(),     lambda:am.copy().inverse()),
+                              ]:
+            print "%5d %-12s %10.2f %10.2f"%(n, name, bench(f,number), bench(af,number))
+            pass
+        pass
+    pass
+
+if __name__ == '__main__':
+    main()
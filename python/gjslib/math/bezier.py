@@ -39,16 +39,290 @@ __docformat__ = "restructuredtext"
 
 #a Imports
 import math
+import collections
 from gjslib.math.vectors import *
 
+#a Useful functions
+#f _coords
+def _coords(p):
+    """
+    Return the coordinates of a Bezier point, which may be a vector or an instance of a
+    point class with a 'coords' property
+    """
+    if hasattr(p, "coords"):
+        p = p.coords
+        if callable(p): p=p()
+        pass
+    return p
+
+#f _bernstein_power_matrix
+_bernstein_power_matrices = {}
+def _bernstein_power_matrix(degree):
+    """
+    Return the (degree+1,degree+1) list of lists m such that the Bernstein basis function
+    b_i(t) = C(degree,i).t^i.(1-t)^(degree-i) = Sum(j, m[j][i].t^j)
+
+    The matrices are calculated once for each degree
+    """
+    if degree not in _bernstein_power_matrices:
+        def binomial(n,k):
+            return math.factorial(n)/(math.factorial(k)*math.factorial(n-k))
+        m = [[0.0]*(degree+1) for j in range(degree+1)]
+        for i in range(degree+1):
+            for k in range(degree-i+1):
+                m[i+k][i] = binomial(degree,i)*binomial(degree-i,k)*(1-2*(k&1))
+                pass
+            pass
+        _bernstein_power_matrices[degree] = m
+        pass
+    return _bernstein_power_matrices[degree]
+
+#f bernstein_basis
+def bernstein_basis(ts, degree, derivative=False):
+    """
+    Return an (N,degree+1) numpy array of the Bernstein basis functions of a degree, or their
+    derivatives with respect to t, at each of the N parameter values in ts
+
+    Multiplying this by a (degree+1,d) array of control points gives the N points (or gradients)
+    of the curve
+
+    @ts:         Parameter values
+    @degree:     Degree of the curve (2 for quadratic, 3 for cubic)
+    @derivative: If True, return the derivatives of the basis functions
+    """
+    import numpy
+    ts = numpy.asarray(ts, dtype=numpy.float64).ravel()
+    m = numpy.array(_bernstein_power_matrix(degree))
+    powers = numpy.arange(degree+1)
+    if derivative:
+        tn = powers * numpy.power(ts[:,numpy.newaxis], numpy.maximum(powers-1,0))
+        pass
+    else:
+        tn = numpy.power(ts[:,numpy.newaxis], powers)
+        pass
+    return tn.dot(m)
+
+#f flatten_bezier_list
+def flatten_bezier_list(bezier_list, straightness, closed=True, out=None, cache=None):
+    """
+    Flatten a contour of joined Bezier curves into a flat list of coordinates
+
+    Each curve contributes its start point and the points along it, but not its end point
+    (which is the start of the next curve); if the contour is not closed then the end point
+    of the last curve is added at the end
+
+    @bezier_list:  List of Bezier curves making up the contour
+    @straightness: Straightness criterion, as for break_into_segments
+    @closed:       If False, include the end point of the last curve
+    @out:          List (or array.array) to append coordinates to, or None for a new list
+    @cache:        Optional flatten_cache to reuse flattened curves from
+    """
+    if out is None: out=[]
+    for b in bezier_list:
+        if cache is not None:
+            cache.flatten(b, straightness, out=out, include_last=False)
+            pass
+        else:
+            b.flatten(straightness, out=out, include_last=False)
+            pass
+        pass
+    if (not closed) and len(bezier_list)>0:
+        out.extend(_coords(bezier_list[-1].pts[-1]))
+        pass
+    return out
+
+#f flatten_bezier_list_points
+def flatten_bezier_list_points(bezier_list, straightness, cache=None):
+    """
+    Flatten a contour of joined Bezier curves into a list of points
+
+    The points are the start points of each curve, followed by new instances of the curve's point class
+    for the points along it, as for flatten_points; the end point of each curve is not included
+    """
+    points = []
+    for b in bezier_list:
+        points.extend(b.flatten_points(straightness, include_last=False, cache=cache))
+        pass
+    return points
+
+#a Flattened curve cache
+#c flatten_cache
+class flatten_cache(object):
+    """
+    A least-recently-used cache of flattened Bezier curves
+
+    Entries are keyed by the curve class, the coordinates of its points and the straightness
+    (and segment limit), and hold the coordinates that bezier_base.flatten produces for the
+    whole curve, so identical curves (such as the same glyph outline drawn at a different size)
+    are only flattened once. At most max_entries curves are kept.
+
+    hits, misses and evictions count cache use since creation (or the last clear)
+    """
+    #f __init__
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.clear()
+        pass
+    #f clear
+    def clear(self):
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        pass
+    #f __len__
+    def __len__(self):
+        return len(self.entries)
+    #f key
+    def key(self, b, straightness, max_segments=4096):
+        return (b.__class__.__name__, tuple([tuple(_coords(p)) for p in b.pts]), straightness, max_segments)
+    #f flatten
+    def flatten(self, b, straightness, out=None, include_last=True, max_segments=4096):
+        """
+        Flatten a Bezier curve as b.flatten would, using the cached coordinates if possible
+        """
+        if out is None: out=[]
+        k = self.key(b, straightness, max_segments)
+        coords = self.entries.pop(k, None)
+        if coords is None:
+            self.misses += 1
+            coords = tuple(b.flatten(straightness, max_segments=max_segments))
+            if len(self.entries)>=self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+                pass
+            pass
+        else:
+            self.hits += 1
+            pass
+        self.entries[k] = coords
+        if include_last:
+            out.extend(coords)
+            pass
+        else:
+            out.extend(coords[:-len(_coords(b.pts[-1]))])
+            pass
+        return out
+    #f stats
+    def stats(self):
+        """
+        Return a dictionary of the cache size and usage counters
+        """
+        return {"entries":len(self.entries), "max_entries":self.max_entries,
+                "hits":self.hits, "misses":self.misses, "evictions":self.evictions}
+    #f All done
+    pass
+
+default_flatten_cache = flatten_cache()
+
+#a Arc length
+#c arc_length_table
+class arc_length_table(object):
+    """
+    A table of cumulative arc length of a curve against its parameter t (0 to 1)
+
+    The parameter range is split into equal segments, and the length of each segment is
+    found by Gauss-Legendre quadrature of the speed |dp/dt|; more segments or a higher
+    quadrature order make the table more accurate but more expensive to build.
+
+    A length is converted to a parameter value by binary search of the table for its segment,
+    then by inverting a cubic Hermite fit of length against t within the segment (using the
+    speed at each end), and finally by Newton iterations on the quadrature length of the curve
+    from the start of the segment. All of this is done for an array of lengths at once.
+    """
+    #f __init__
+    def __init__(self, gradient_fn, segments=32, order=5):
+        """
+        @gradient_fn: Function taking an (N,) array of parameter values and returning the (N,d) array of gradients dp/dt
+        @segments:    Number of equal parameter segments in the table
+        @order:       Number of Gauss-Legendre points used for the length of a segment
+        """
+        import numpy
+        self.gradient_fn = gradient_fn
+        self.segments = segments
+        (x, w) = numpy.polynomial.legendre.leggauss(order)
+        self.gauss_x = (x+1)/2.0
+        self.gauss_w = w/2.0
+        self.knots = numpy.linspace(0.0, 1.0, segments+1)
+        dt = 1.0/segments
+        seg_lengths = (self.speed(self.knots[:-1,numpy.newaxis] + dt*self.gauss_x).reshape((segments,-1))*self.gauss_w).sum(axis=-1)*dt
+        self.lengths = numpy.concatenate(([0.0], numpy.cumsum(seg_lengths)))
+        self.knot_speeds = self.speed(self.knots)
+        self.length = self.lengths[-1]
+        pass
+    #f speed
+    def speed(self, ts):
+        """
+        Return |dp/dt| at each parameter value in ts
+        """
+        import numpy
+        g = numpy.asarray(self.gradient_fn(numpy.asarray(ts, dtype=numpy.float64).ravel()))
+        return numpy.sqrt((g*g).sum(axis=-1))
+    #f length_at_t
+    def length_at_t(self, ts):
+        """
+        Return the arc length from the start of the curve to each parameter value in ts
+        """
+        import numpy
+        ts = numpy.clip(numpy.asarray(ts, dtype=numpy.float64).ravel(), 0.0, 1.0)
+        segment = numpy.minimum((ts*self.segments).astype(int), self.segments-1)
+        t0 = self.knots[segment]
+        h = (ts-t0)[:,numpy.newaxis]
+        speeds = self.speed(t0[:,numpy.newaxis] + h*self.gauss_x).reshape(h.shape[0],-1)
+        return self.lengths[segment] + (speeds*self.gauss_w).sum(axis=-1)*h[:,0]
+    #f t_at_length
+    def t_at_length(self, s, iterations=2):
+        """
+        Find the parameter value at arc length s (a scalar or array) along the curve
+        Lengths outside the curve are clamped to its ends
+
+        @iterations: Number of Newton iterations on the quadrature length after the table lookup
+        """
+        import numpy
+        scalar = numpy.isscalar(s)
+        s = numpy.clip(numpy.asarray(s, dtype=numpy.float64).ravel(), 0.0, self.length)
+        segment = numpy.clip(numpy.searchsorted(self.lengths, s, side='right')-1, 0, self.segments-1)
+        dt = 1.0/self.segments
+        l0 = self.lengths[segment]
+        dl = self.lengths[segment+1]-l0
+        m0 = self.knot_speeds[segment]*dt
+        m1 = self.knot_speeds[segment+1]*dt
+        # Hermite cubic for the length within the segment, l0 + dl.(3u^2-2u^3) + m0.(u^3-2u^2+u) + m1.(u^3-u^2)
+        c3 = m0 + m1 - 2*dl
+        c2 = 3*dl - 2*m0 - m1
+        c1 = m0
+        target = s-l0
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            u = numpy.where(dl>0, target/numpy.where(dl>0,dl,1.0), 0.0)
+            for i in range(4):
+                f  = ((c3*u + c2)*u + c1)*u - target
+                df = (3*c3*u + 2*c2)*u + c1
+                u = numpy.clip(numpy.where(df>0, u-f/numpy.where(df>0,df,1.0), u), 0.0, 1.0)
+                pass
+            t = self.knots[segment] + u*dt
+            for i in range(iterations):
+                v = self.speed(t)
+                t = numpy.clip(numpy.where(v>0, t-(self.length_at_t(t)-s)/numpy.where(v>0,v,1.0), t), 0.0, 1.0)
+                pass
+            pass
+        if scalar: return float(t[0])
+        return t
+    #f All done
+    pass
+
 #a Bezier classes
 #c bezier_base
 class bezier_base(object):
     """
     An arbitrary bezier curve class - should it be derived from a 'curve' class?
+
+    Subclasses provide split, evaluate, straight_enough and power_basis, and set flatten_scale
+    so that a curve whose control points have a maximum second difference of D is straight
+    enough if D^2 < straightness*flatten_scale
     """
     n = 100
     fmt = "%6.2f"
+    flatten_scale = 1.0
 
     #f __init__
     def __init__(self, pts=None, controls_relative=False, subdivision_level=0, split_parent=None, first_split=True, **kwargs):
@@ -65,6 +339,7 @@ class bezier_base(object):
         """
         self._subdivision_level = subdivision_level
         self._parent = split_parent
+        self._arc_length_tables = {}
         self.pts = pts
         if controls_relative:
             p = list(pts)
@@ -83,27 +358,173 @@ class bezier_base(object):
     def break_into_segments(self, straightness):
         """
         Break the Bezier curve into segments, until the segments are straight enough
+
+        Curves still to be checked are kept on a stack, second half on top, so that the
+        segments come out in order
         """
-        lines = [self]
-        i = 0
-        while i<len(lines):
-            if not lines[i].straight_enough(straightness):
-                l = lines.pop(i)
-                lines.insert(i,self.__class__(split_parent=l,first_split=False))
-                lines.insert(i,self.__class__(split_parent=l,first_split=True))
+        lines = []
+        stack = [self]
+        while len(stack)>0:
+            l = stack.pop()
+            if not l.straight_enough(straightness):
+                stack.append(self.__class__(split_parent=l,first_split=False))
+                stack.append(self.__class__(split_parent=l,first_split=True))
                 pass
             else:
-                i+=1
+                lines.append(l)
                 pass
             pass
         return lines
+    #f flatten_count
+    def flatten_count(self, straightness, max_segments=4096):
+        """
+        Return the number of equal parameter steps needed to flatten the curve so that every
+        segment is straight enough
+
+        The control points of a curve that covers 1/n of the parameter range of this curve have
+        second differences 1/n^2 of this curve's, so n is found directly from the control point hull
+        """
+        pts = [_coords(p) for p in self.pts]
+        d2 = 0
+        for i in range(len(pts)-2):
+            d2 = max(d2, vector_squared(vector_add(vector_add(pts[i],pts[i+2]),pts[i+1],scale=-2)))
+            pass
+        if straightness<=0: return max_segments
+        n = int(math.pow(d2/(straightness*self.flatten_scale), 0.25))+1
+        return min(n, max_segments)
+    #f flatten
+    def flatten(self, straightness, out=None, include_last=True, max_segments=4096):
+        """
+        Flatten the curve into straight line segments, appending the coordinates of the points
+        (first point first, as a flat sequence of coordinates) to out, and returning out
+
+        The number of segments is given by flatten_count, and the points are generated by
+        forward differencing the power basis form of the curve
+
+        @straightness: Straightness criterion, as for break_into_segments
+        @out:          List (or array.array) to append coordinates to, or None for a new list
+        @include_last: If False, do not include the end point of the curve
+        """
+        if out is None: out=[]
+        n = self.flatten_count(straightness, max_segments=max_segments)
+        basis = self.power_basis()
+        degree = len(basis)-1
+        h = 1.0/n
+        # Difference table from p(0), p(h), ... p(degree.h)
+        table = []
+        for k in range(degree+1):
+            t = k*h
+            table.append([sum([b[j]*math.pow(t,i) for (i,b) in enumerate(basis)]) for j in range(len(basis[0]))])
+            pass
+        for k in range(1,degree+1):
+            for i in range(degree, k-1, -1):
+                table[i] = [a-b for (a,b) in zip(table[i],table[i-1])]
+                pass
+            pass
+        out.extend(_coords(self.pts[0]))
+        for i in range(1,n):
+            for k in range(degree):
+                table[k] = [a+b for (a,b) in zip(table[k],table[k+1])]
+                pass
+            out.extend(table[0])
+            pass
+        if include_last:
+            out.extend(_coords(self.pts[-1]))
+            pass
+        return out
+    #f flatten_points
+    def flatten_points(self, straightness, include_last=True, max_segments=4096, cache=None):
+        """
+        Flatten the curve as for flatten, returning a list of points
+
+        The first (and last) points are the curve's own points; other points are tuples if
+        the curve's points are vectors, or new instances of the class of the curve's first point
+        (created with coords=) if they are instances of a point class
+
+        If cache is given it is a flatten_cache to use for the coordinates
+        """
+        if cache is not None:
+            coords = cache.flatten(self, straightness, include_last=include_last, max_segments=max_segments)
+            pass
+        else:
+            coords = self.flatten(straightness, include_last=include_last, max_segments=max_segments)
+            pass
+        d = len(_coords(self.pts[0]))
+        p0 = self.pts[0]
+        make = tuple
+        if hasattr(p0, "coords"):
+            make = lambda c:p0.__class__(coords=c)
+            pass
+        points = [p0]
+        for i in range(d, len(coords), d):
+            points.append(make(coords[i:i+d]))
+            pass
+        if include_last:
+            points[-1] = self.pts[-1]
+            pass
+        return points
+    #f evaluate_many
+    def evaluate_many(self, ts, gradient=False):
+        """
+        Evaluate the Bezier curve at every parameter value in ts in one go
+
+        Returns an (N,d) numpy array of points, or a tuple of that and an (N,d) array of
+        gradients (dp/dt) if gradient is True
+        """
+        import numpy
+        pts = numpy.array([_coords(p) for p in self.pts], dtype=numpy.float64)
+        degree = len(pts)-1
+        points = bernstein_basis(ts, degree).dot(pts)
+        if gradient:
+            return (points, bernstein_basis(ts, degree, derivative=True).dot(pts))
+        return points
+    #f arc_length_table
+    def arc_length_table(self, segments=32, order=5):
+        """
+        Return the arc_length_table for the curve, building it on first use
+        Tables are cached by segments and order
+        """
+        k = (segments, order)
+        if k not in self._arc_length_tables:
+            self._arc_length_tables[k] = arc_length_table(lambda ts:self.evaluate_many(ts, gradient=True)[1],
+                                                          segments=segments, order=order)
+            pass
+        return self._arc_length_tables[k]
+    #f length
+    def length(self, segments=32, order=5):
+        """
+        Return the arc length of the whole curve
+        """
+        return self.arc_length_table(segments=segments, order=order).length
+    #f t_at_length
+    def t_at_length(self, s, segments=32, order=5, iterations=2):
+        """
+        Return the parameter value (or an array of them) at arc length s (a scalar or array) along the curve
+
+        @segments:   Number of segments in the arc length table (build cost and accuracy)
+        @order:      Quadrature order of the arc length table (build cost and accuracy)
+        @iterations: Newton iterations after the table lookup (lookup cost and accuracy)
+        """
+        return self.arc_length_table(segments=segments, order=order).t_at_length(s, iterations=iterations)
+    #f point_at_length
+    def point_at_length(self, s, segments=32, order=5, iterations=2):
+        """
+        Return the point at arc length s along the curve, as t_at_length
+
+        For a scalar s this is a list of coordinates, as evaluate; for an array of lengths
+        it is an (N,d) numpy array, as evaluate_many
+        """
+        t = self.t_at_length(s, segments=segments, order=order, iterations=iterations)
+        if type(t)==float:
+            return list(self.evaluate_many([t])[0])
+        return self.evaluate_many(t)
     #f draw_in_dots
     def draw_in_dots(self, dot_fn, steps=100):
         """
         Draw the Bezier curve in dots
         """
-        for t in range(steps+1):
-            dot_fn(self.evaluate(t/(steps+0.0)))
+        for pt in self.evaluate_many([t/(steps+0.0) for t in range(steps+1)]):
+            dot_fn(pt)
             pass
         pass
     #f draw_in_lines
@@ -145,6 +566,7 @@ class bezier_quad(bezier_base):
     """
     n = 100
     fmt = "%6.2f"
+    flatten_scale = 16.0
     #f split
     def split(self, first_split):
         """
@@ -197,22 +619,35 @@ class bezier_quad(bezier_base):
         is less than 1-straightness then the line is not straight enough
         """
         max_excursion = vector_squared(vector_add(vector_add(self.pts[0],self.pts[2]),self.pts[1],scale=-2))/16
-        print max_excursion
         return max_excursion<straightness
+    #f power_basis
+    def power_basis(self):
+        """
+        Return (a0, a1, a2) such that p(t) = a0 + a1.t + a2.t^2
+        """
+        (p0, c0, p1) = [_coords(p) for p in self.pts]
+        return (list(p0),
+                vector_scale(vector_add(c0,p0,scale=-1),2),
+                vector_add(vector_add(p0,p1),c0,scale=-2))
     #f All done
     pass
 
 #c bezier_cubic
-class bezier_cubic( object ):
+class bezier_cubic( bezier_base ):
     """
     A cubic bezier curve class
 
     Here a point is defined by p(t) = (1-t)^3*p0 + 3t(1-t)^2*c0 + 3t^2*(1-t)*c1 + t^3*p1
     If we subdivide, we need p(0)=p0, p(1/2)=(p0+p1)/8 + 3/8*(c0+c1), and p(1)=p1
     And we need new control points
+
+    A control point of a curve is at most D from the chord, where D is the largest second
+    difference of the control points; straight_enough requires the control points to be within
+    sqrt(straightness) of the chord, hence a flatten_scale of 1
     """
     n = 100
     fmt = "%6.2f"
+    flatten_scale = 1.0
     #f split
     def split(self, first_split):
         """
@@ -222,18 +657,16 @@ class bezier_cubic( object ):
         """
         (p0, c0, c1, p1) = self.pts
         if first_split:
-            self.pts = ( p0,
-                         vector_scale(vector_add(p0,c0),1/2.0),
-                         vector_scale(vector_add(vector_add(p0,c0,scale=2),c1),1/4.0),
-                         vector_scale(vector_add(vector_add(vector_add(p0,c0,scale=3),c1,scale=3),p1),1/8.0),
-                         )
-        else:
-            self.pts = ( vector_scale(vector_add(vector_add(vector_add(p0,c0,scale=3),c1,scale=3),p1),1/8.0),
-                         vector_scale(vector_add(vector_add(p1,c1,scale=2),c0),1/4.0),
-                         vector_scale(vector_add(p1,c1),1/2.0),
-                         p1,
-                         )
-        pass
+            return ( p0,
+                     vector_scale(vector_add(p0,c0),1/2.0),
+                     vector_scale(vector_add(vector_add(p0,c0,scale=2),c1),1/4.0),
+                     vector_scale(vector_add(vector_add(vector_add(p0,c0,scale=3),c1,scale=3),p1),1/8.0),
+                     )
+        return ( vector_scale(vector_add(vector_add(vector_add(p0,c0,scale=3),c1,scale=3),p1),1/8.0),
+                 vector_scale(vector_add(vector_add(p1,c1,scale=2),c0),1/4.0),
+                 vector_scale(vector_add(p1,c1),1/2.0),
+                 p1,
+                 )
     #f evaluate
     def evaluate(self, t):
         """
@@ -274,10 +707,20 @@ class bezier_cubic( object ):
         c1p10n = (self.pts[2][0]-self.pts[3][0])*p10n[0] + (self.pts[2][1]-self.pts[3][1])*p10n[1]
         if c1p10n*c1p10n>v_len_p10n: return False
         return True
-    #f split
-    def split( self ):
+    #f split_in_two
+    def split_in_two( self ):
         return ( self.__class__(split_parent=self, first_split=True),
                  self.__class__(split_parent=self, first_split=False) )
+    #f power_basis
+    def power_basis(self):
+        """
+        Return (a0, a1, a2, a3) such that p(t) = a0 + a1.t + a2.t^2 + a3.t^3
+        """
+        (p0, c0, c1, p1) = [_coords(p) for p in self.pts]
+        return (list(p0),
+                vector_scale(vector_add(c0,p0,scale=-1),3),
+                vector_scale(vector_add(vector_add(p0,c1),c0,scale=-2),3),
+                vector_add(vector_add(p1,p0,scale=-1),vector_add(c0,c1,scale=-1),scale=3))
     #f All done
     pass
 
@@ -342,5 +785,121 @@ class bezier_cubic_patch(object):
                 pass
             pass
         return pt
+    #f _pts_array
+    def _pts_array( self ):
+        """
+        Return the points as a (4,4,d) numpy array indexed by [u index, t index]
+        """
+        import numpy
+        return numpy.array(self.pts, dtype=numpy.float64).reshape((4,4,self._dimension))
+    #f coord_grid
+    def coord_grid( self, ts, us ):
+        """
+        Calculate the coordinates of the patch at every combination of the parameter values
+        in ts and us, as coord
+
+        Returns a (len(ts),len(us),d) numpy array
+        """
+        import numpy
+        return numpy.einsum('ai,bj,jid->abd', bernstein_basis(ts,3), bernstein_basis(us,3), self._pts_array())
+    #f gradient_grid
+    def gradient_grid( self, ts, us ):
+        """
+        Calculate the gradients of the patch with respect to t and u at every combination
+        of the parameter values in ts and us
+
+        Returns a tuple of two (len(ts),len(us),d) numpy arrays
+        """
+        import numpy
+        pts = self._pts_array()
+        bt  = bernstein_basis(ts,3)
+        bu  = bernstein_basis(us,3)
+        dbt = bernstein_basis(ts,3,derivative=True)
+        dbu = bernstein_basis(us,3,derivative=True)
+        return (numpy.einsum('ai,bj,jid->abd', dbt, bu, pts),
+                numpy.einsum('ai,bj,jid->abd', bt, dbu, pts))
+    #f normal_grid
+    def normal_grid( self, ts, us ):
+        """
+        Calculate the normal to the patch at every combination of the parameter values in ts and us,
+        as normal (so the patch must be 3 dimensional)
+
+        Returns a (len(ts),len(us),3) numpy array
+        """
+        from gjslib.math.vector_array import vector_array_cross_product
+        (dt, du) = self.gradient_grid(ts, us)
+        return vector_array_cross_product([dt, du])
+    #f tessellate_count
+    def tessellate_count( self, straightness, max_segments=64 ):
+        """
+        Return the number of equal parameter steps (nt, nu) in t and u needed so that
+        every row and column of the tessellated patch is straight enough
+
+        This is as bezier_cubic.flatten_count, applied to the second differences of the
+        control points along t and along u; a patch that curves only in one direction is
+        therefore only subdivided in that direction
+
+        @straightness: Straightness criterion, as for bezier_cubic.flatten_count
+        """
+        import numpy
+        pts = self._pts_array()
+        d2t = pts[:,:-2,:] + pts[:,2:,:] - 2*pts[:,1:-1,:]
+        d2u = pts[:-2,:,:] + pts[2:,:,:] - 2*pts[1:-1,:,:]
+        counts = []
+        for d2 in (d2t, d2u):
+            d2 = (d2*d2).sum(axis=-1).max()
+            if straightness<=0:
+                counts.append(max_segments)
+                pass
+            else:
+                counts.append(min(int(math.pow(d2/straightness, 0.25))+1, max_segments))
+                pass
+            pass
+        return tuple(counts)
+    #f tessellate
+    def tessellate( self, nt=None, nu=None, straightness=None, max_segments=64 ):
+        """
+        Tessellate the patch into triangles, ready for upload to a vertex buffer
+
+        Returns (vertices, indices); vertices is an ((nt+1)*(nu+1),8) float32 array of
+        interleaved x,y,z, unit normal nx,ny,nz and texture coordinates t,u, with vertex
+        i*(nu+1)+j at parameters (i/nt, j/nu); indices is a uint32 array of vertex indices
+        for 2*nt*nu triangles, each wound so that its normal is in the direction of normal()
+
+        The patch must be 3 dimensional. Normals at degenerate points of the patch (such as a
+        corner whose control points coincide) are zero.
+
+        @nt:           Number of steps in t (if None, found from straightness)
+        @nu:           Number of steps in u (if None, found from straightness)
+        @straightness: If not None, the straightness for tessellate_count, used for nt and nu if they are not given
+        @max_segments: Limit on the number of steps found from straightness
+        """
+        import numpy
+        if (nt is None) or (nu is None):
+            if straightness is None:
+                raise Exception("Tessellating a bezier patch requires a resolution or a straightness")
+            (snt, snu) = self.tessellate_count(straightness, max_segments=max_segments)
+            if nt is None: nt=snt
+            if nu is None: nu=snu
+            pass
+        ts = numpy.linspace(0.0, 1.0, nt+1)
+        us = numpy.linspace(0.0, 1.0, nu+1)
+        normals = self.normal_grid(ts, us)
+        l = numpy.sqrt((normals*normals).sum(axis=-1))[...,numpy.newaxis]
+        normals = numpy.where(l>0, normals/numpy.where(l>0,l,1.0), 0.0)
+        vertices = numpy.empty((nt+1,nu+1,8), dtype=numpy.float32)
+        vertices[...,0:3] = self.coord_grid(ts, us)
+        vertices[...,3:6] = normals
+        vertices[...,6] = ts[:,numpy.newaxis]
+        vertices[...,7] = us[numpy.newaxis,:]
+        corners = (numpy.arange(nt)[:,numpy.newaxis]*(nu+1) + numpy.arange(nu)[numpy.newaxis,:]).ravel()
+        indices = numpy.empty((len(corners),6), dtype=numpy.uint32)
+        indices[:,0] = corners
+        indices[:,1] = corners+nu+1
+        indices[:,2] = corners+1
+        indices[:,3] = corners+nu+1
+        indices[:,4] = corners+nu+2
+        indices[:,5] = corners+1
+        return (vertices.reshape((-1,8)), indices.ravel())
     #f All done
     pass
@@ -37,6 +37,9 @@ class complex(object):
         else:
             s.add(other=complex(real=a))
         return s
+    #f __radd__ - infix add of int/float with complex
+    def __radd__(self,a):
+        return self.__add__(a)
     #f __sub__ - infix subtract of complex with int/float/complex
     def __sub__(self,a):
         s = self.copy()
@@ -53,6 +56,9 @@ class complex(object):
         else:
             s.multiply(other=complex(real=a))
         return s
+    #f __rmul__ - infix multiply of int/float with complex
+    def __rmul__(self,a):
+        return self.__mul__(a)
     #f __div__ - infix division of complex by int/float/complex
     def __div__(self,a):
         s = self.copy()
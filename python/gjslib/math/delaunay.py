@@ -0,0 +1,631 @@
+#!/usr/bin/env python
+#a Documentation
+"""
+Constrained Delaunay triangulation of a set of 2D points
+
+A constrained_delaunay is created from a list of (x,y) coordinates, and
+triangulates them immediately by incremental insertion with edge
+flipping (Lawson's algorithm), starting from a triangle that encloses
+all of the points.
+
+Constraint edges (pairs of point indices, such as the segments of a
+contour) are then inserted one at a time with insert_constraint; the
+edges crossed by the constraint are flipped away (Sloan's algorithm),
+and the triangulation is made Delaunay again except across constraint
+edges. A constraint that passes through another point is split at that
+point; one that crosses an earlier constraint is split at a new point
+added where the two cross. constraint_path returns the chain of point
+indices that a constraint has become.
+
+Triangles are held as (CCW) vertex index triples, with the neighbouring
+triangle opposite each vertex; the enclosing triangle's vertices follow
+the input points, with any points added where constraints cross
+after them (listed in added_vertices). Triangles using the enclosing
+triangle's vertices are not returned by triangles().
+"""
+
+#a Imports
+
+#a Useful functions
+#f orient
+def orient( xa, ya, xb, yb, xc, yc ):
+    """
+    Return twice the signed area of triangle abc; positive if it is counter-clockwise
+    """
+    return (xb-xa)*(yc-ya) - (yb-ya)*(xc-xa)
+
+#f in_circle
+def in_circle( xa, ya, xb, yb, xc, yc, xd, yd ):
+    """
+    Return positive if d is inside the circumcircle of the counter-clockwise triangle abc
+    """
+    (adx, ady) = (xa-xd, ya-yd)
+    (bdx, bdy) = (xb-xd, yb-yd)
+    (cdx, cdy) = (xc-xd, yc-yd)
+    ad = adx*adx + ady*ady
+    bd = bdx*bdx + bdy*bdy
+    cd = cdx*cdx + cdy*cdy
+    return ( adx*(bdy*cd - bd*cdy) -
+             ady*(bdx*cd - bd*cdx) +
+             ad *(bdx*cdy - bdy*cdx) )
+
+#a Classes
+#c constrained_delaunay
+class constrained_delaunay(object):
+    """
+    A constrained Delaunay triangulation
+
+    tri_v[t] is the list of three vertex indices of triangle t, counter-clockwise
+    tri_n[t][i] is the triangle across the edge opposite tri_v[t][i], or None
+    vert_tri[v] is a triangle that uses vertex v
+    """
+    #f __init__
+    def __init__( self, coords, super_scale=100.0, epsilon=1E-9 ):
+        """
+        @param: coords      List of (x,y) coordinates of the points to triangulate; they should be distinct
+        @param: super_scale Size of the enclosing triangle relative to the extent of the points
+        @param: epsilon     Constraints that cross within this fraction of the end of either are split at that end
+        """
+        self.epsilon = epsilon
+        self.xs = [float(c[0]) for c in coords]
+        self.ys = [float(c[1]) for c in coords]
+        self.num_input_points = len(coords)
+        self.tri_v = []
+        self.tri_n = []
+        self.vert_tri = []
+        self.constraints = set()
+        self.split_vertex = {}
+        self.added_vertices = []
+        self.create_super_triangle( super_scale )
+        for v in self.insertion_order():
+            self.insert_point( v )
+            pass
+        pass
+    #f create_super_triangle
+    def create_super_triangle( self, super_scale ):
+        """
+        Add the vertices of a triangle enclosing all the points, and make it the triangulation
+        """
+        n = self.num_input_points
+        (x0, x1, y0, y1) = (0.0, 0.0, 0.0, 0.0)
+        if n>0:
+            (x0, x1, y0, y1) = (min(self.xs), max(self.xs), min(self.ys), max(self.ys))
+            pass
+        (cx, cy) = ((x0+x1)/2.0, (y0+y1)/2.0)
+        size = max(x1-x0, y1-y0, 1E-6) * super_scale
+        self.xs.extend( [cx-2*size, cx+2*size, cx] )
+        self.ys.extend( [cy-size,   cy-size,   cy+2*size] )
+        self.vert_tri = [0]*(n+3)
+        self.tri_v.append( [n, n+1, n+2] )
+        self.tri_n.append( [None, None, None] )
+        self.last_triangle = 0
+        pass
+    #f insertion_order
+    def insertion_order( self ):
+        """
+        Return the order in which to insert the input points
+
+        The points are bucketed into vertical strips and taken up and down alternate strips,
+        so that each point is usually close to the triangle of the previous point
+        """
+        n = self.num_input_points
+        if n==0: return []
+        (x0, x1) = (min(self.xs[:n]), max(self.xs[:n]))
+        strips = max(1, int((n/4.0)**0.5))
+        width = (x1-x0)/strips or 1.0
+        def key(v):
+            s = min(strips-1, int((self.xs[v]-x0)/width))
+            if s&1: return (s, -self.ys[v])
+            return (s, self.ys[v])
+        return sorted( range(n), key=key )
+    #f coords
+    def coords( self, v ):
+        """Return the coordinates of point v"""
+        return (self.xs[v], self.ys[v])
+    #f orient_v
+    def orient_v( self, a, b, c ):
+        xs = self.xs
+        ys = self.ys
+        return orient( xs[a], ys[a], xs[b], ys[b], xs[c], ys[c] )
+    #f add_vertex
+    def add_vertex( self, x, y ):
+        """
+        Add a vertex (where two constraints cross), returning its index
+        """
+        v = len(self.xs)
+        self.xs.append( x )
+        self.ys.append( y )
+        self.vert_tri.append( None )
+        self.added_vertices.append( v )
+        return v
+    #f is_super_vertex
+    def is_super_vertex( self, v ):
+        """Return True if v is a vertex of the enclosing triangle"""
+        return self.num_input_points <= v < self.num_input_points+3
+    #f locate
+    def locate( self, x, y ):
+        """
+        Find the triangle containing (x,y) by walking from the last triangle created
+
+        Return (triangle, edge) where edge is None if the point is strictly inside the triangle,
+        else the index of the vertex opposite the edge that the point is on
+        """
+        xs = self.xs
+        ys = self.ys
+        t = self.last_triangle
+        previous = None
+        steps = 4*len(self.tri_v)+4
+        while steps>0:
+            steps -= 1
+            tv = self.tri_v[t]
+            on_edge = None
+            moved = False
+            for i in range(3):
+                a = tv[(i+1)%3]
+                b = tv[(i+2)%3]
+                o = orient( xs[a], ys[a], xs[b], ys[b], x, y )
+                if o<0:
+                    u = self.tri_n[t][i]
+                    if (u is None) or (u==previous): continue
+                    (previous, t) = (t, u)
+                    moved = True
+                    break
+                if o==0: on_edge = i
+                pass
+            if not moved: return (t, on_edge)
+            pass
+        raise Exception("Failed to locate point (%f,%f) in triangulation"%(x,y))
+    #f insert_point
+    def insert_point( self, v ):
+        """
+        Insert vertex v into the triangulation, and make it Delaunay again
+        """
+        (t, edge) = self.locate( self.xs[v], self.ys[v] )
+        if edge is not None:
+            self.split_edge( t, edge, v )
+            return
+        (a, b, c) = self.tri_v[t]
+        (na, nb, nc) = self.tri_n[t]
+        t0 = t
+        t1 = len(self.tri_v)
+        t2 = t1+1
+        self.tri_v[t0] = [a, b, v]
+        self.tri_n[t0] = [t1, t2, nc]
+        self.tri_v.append( [b, c, v] )
+        self.tri_n.append( [t2, t0, na] )
+        self.tri_v.append( [c, a, v] )
+        self.tri_n.append( [t0, t1, nb] )
+        self.replace_neighbour( na, t, t1 )
+        self.replace_neighbour( nb, t, t2 )
+        (self.vert_tri[a], self.vert_tri[b], self.vert_tri[c], self.vert_tri[v]) = (t0, t1, t2, t0)
+        self.last_triangle = t0
+        self.legalize( [(t0,2), (t1,2), (t2,2)] )
+        pass
+    #f split_edge
+    def split_edge( self, t, i, v ):
+        """
+        Insert vertex v on the edge opposite vertex i of triangle t, splitting both triangles on the edge
+
+        If the edge is a constraint then it is replaced by the two constraint edges to v
+        """
+        a = self.tri_v[t][i]
+        b = self.tri_v[t][(i+1)%3]
+        c = self.tri_v[t][(i+2)%3]
+        a1 = self.tri_n[t][(i+1)%3]
+        a2 = self.tri_n[t][(i+2)%3]
+        u = self.tri_n[t][i]
+        t2 = len(self.tri_v)
+        self.tri_v[t] = [a, b, v]
+        self.tri_n[t] = [None, t2, a2]
+        self.tri_v.append( [a, v, c] )
+        self.tri_n.append( [None, a1, t] )
+        self.replace_neighbour( a1, t, t2 )
+        (self.vert_tri[a], self.vert_tri[b], self.vert_tri[c], self.vert_tri[v]) = (t, t, t2, t)
+        work = [(t,2), (t2,1)]
+        if u is not None:
+            j = self.tri_n[u].index(t)
+            q = self.tri_v[u][j]
+            b1 = self.tri_n[u][(j+1)%3]
+            b2 = self.tri_n[u][(j+2)%3]
+            u2 = len(self.tri_v)
+            # u is (q, c, b)
+            self.tri_v[u] = [q, c, v]
+            self.tri_n[u] = [t2, u2, b2]
+            self.tri_v.append( [q, v, b] )
+            self.tri_n.append( [t, b1, u] )
+            self.replace_neighbour( b1, u, u2 )
+            self.tri_n[t][0] = u2
+            self.tri_n[t2][0] = u
+            self.vert_tri[q] = u
+            work.extend( [(u,2), (u2,1)] )
+            pass
+        key = (min(b,c), max(b,c))
+        if key in self.constraints:
+            self.constraints.remove(key)
+            self.constraints.add( (min(b,v), max(b,v)) )
+            self.constraints.add( (min(v,c), max(v,c)) )
+            self.split_vertex[key] = v
+            pass
+        self.last_triangle = t
+        self.legalize( work )
+        pass
+    #f replace_neighbour
+    def replace_neighbour( self, t, old, new ):
+        """Replace neighbour old of triangle t (if t is not None) with new"""
+        if t is None: return
+        tn = self.tri_n[t]
+        tn[tn.index(old)] = new
+        pass
+    #f flip
+    def flip( self, t, i ):
+        """
+        Flip the edge opposite vertex i of triangle t, which must have a neighbour across it
+
+        If t is (p, b, c) and the neighbour u is (q, c, b), they become (p, b, q) and (p, q, c)
+        Return (t, u), with p at index 0 of both
+        """
+        u = self.tri_n[t][i]
+        p = self.tri_v[t][i]
+        b = self.tri_v[t][(i+1)%3]
+        c = self.tri_v[t][(i+2)%3]
+        a1 = self.tri_n[t][(i+1)%3]
+        a2 = self.tri_n[t][(i+2)%3]
+        j = self.tri_n[u].index(t)
+        q = self.tri_v[u][j]
+        b1 = self.tri_n[u][(j+1)%3]
+        b2 = self.tri_n[u][(j+2)%3]
+        self.tri_v[t] = [p, b, q]
+        self.tri_n[t] = [b1, u, a2]
+        self.tri_v[u] = [p, q, c]
+        self.tri_n[u] = [b2, a1, t]
+        self.replace_neighbour( b1, u, t )
+        self.replace_neighbour( a1, t, u )
+        (self.vert_tri[p], self.vert_tri[b], self.vert_tri[q], self.vert_tri[c]) = (t, t, u, u)
+        return (t, u)
+    #f legalize
+    def legalize( self, work ):
+        """
+        Flip non-constraint edges until the triangulation is locally Delaunay
+
+        work is a list of (triangle, vertex index) of edges (opposite the vertex) to check
+        """
+        xs = self.xs
+        ys = self.ys
+        while len(work)>0:
+            (t, i) = work.pop()
+            u = self.tri_n[t][i]
+            if u is None: continue
+            (p, b, c) = (self.tri_v[t][i], self.tri_v[t][(i+1)%3], self.tri_v[t][(i+2)%3])
+            if (min(b,c), max(b,c)) in self.constraints: continue
+            q = self.tri_v[u][self.tri_n[u].index(t)]
+            if in_circle( xs[p], ys[p], xs[b], ys[b], xs[c], ys[c], xs[q], ys[q] )<=0: continue
+            (t, u) = self.flip( t, i )
+            work.append( (t, 0) )
+            work.append( (u, 0) )
+            pass
+        pass
+    #f triangles_around
+    def triangles_around( self, v ):
+        """
+        Return a list of (triangle, index of v in triangle) for the triangles using vertex v, counter-clockwise
+        """
+        start = self.vert_tri[v]
+        result = []
+        t = start
+        while True:
+            i = self.tri_v[t].index(v)
+            result.append( (t, i) )
+            t = self.tri_n[t][(i+1)%3]
+            if (t is None) or (t==start): break
+            pass
+        if t is None:
+            # v is on the hull; gather the triangles clockwise from start too
+            t = self.tri_n[start][(self.tri_v[start].index(v)+2)%3]
+            while t is not None:
+                i = self.tri_v[t].index(v)
+                result.insert( 0, (t, i) )
+                t = self.tri_n[t][(i+2)%3]
+                pass
+            pass
+        return result
+    #f find_edge
+    def find_edge( self, a, b ):
+        """
+        Return (triangle, vertex index) for the triangle with the directed edge a->b, with the
+        index being of the vertex opposite the edge; return None if there is no such edge
+        """
+        for (t, i) in self.triangles_around(a):
+            if self.tri_v[t][(i+1)%3]==b: return (t, (i+2)%3)
+            pass
+        return None
+    #f has_edge
+    def has_edge( self, a, b ):
+        """Return True if a and b are joined by an edge"""
+        return (self.find_edge(a,b) is not None) or (self.find_edge(b,a) is not None)
+    #f add_split_constraint
+    def add_split_constraint( self, a, v, b ):
+        """
+        Insert the constraint from a to b as two constraints, a to v and v to b, where v is on the segment
+        """
+        self.split_vertex[(min(a,b), max(a,b))] = v
+        self.insert_constraint( a, v )
+        self.insert_constraint( v, b )
+        pass
+    #f crossing_parameters
+    def crossing_parameters( self, a, b, c, d ):
+        """
+        Return (s, k) for the crossing of segments ab and cd, which must cross; the crossing
+        is s of the way from a to b, and k of the way from c to d
+        """
+        oa = self.orient_v( c, d, a )
+        ob = self.orient_v( c, d, b )
+        oc = self.orient_v( a, b, c )
+        od = self.orient_v( a, b, d )
+        return ( oa/(oa-ob), oc/(oc-od) )
+    #f split_constraint
+    def split_constraint( self, c, d, v ):
+        """
+        Replace the constraint from c to d with constraints c to v and v to d, where v is (very nearly) on the segment
+        """
+        key = (min(c,d), max(c,d))
+        self.constraints.discard( key )
+        self.add_split_constraint( c, v, d )
+        pass
+    #f insert_constraint
+    def insert_constraint( self, a, b ):
+        """
+        Insert a constraint edge between points a and b, flipping away the edges it crosses
+
+        If the segment from a to b passes through another point, or crosses an existing constraint,
+        then it is split; use constraint_path to find the vertices that it ends up passing through.
+        """
+        if a==b: return
+        key = (min(a,b), max(a,b))
+        if self.has_edge(a, b):
+            self.constraints.add( key )
+            return
+        # Find the triangle around a whose edge opposite a is crossed by ab
+        crossing = None
+        for (t, i) in self.triangles_around(a):
+            c = self.tri_v[t][(i+1)%3]
+            d = self.tri_v[t][(i+2)%3]
+            oc = self.orient_v( a, b, c )
+            od = self.orient_v( a, b, d )
+            if (oc==0) and self.is_between( a, c, b ):
+                self.add_split_constraint( a, c, b )
+                return
+            if (oc<0) and (od>0):
+                crossing = (t, i)
+                break
+            pass
+        if crossing is None:
+            raise Exception("Failed to find first edge crossed by constraint %d to %d"%(a,b))
+        # Walk from a to b collecting the crossed edges, as (right vertex, left vertex) pairs
+        (t, i) = crossing
+        edges = []
+        while True:
+            c = self.tri_v[t][(i+1)%3]
+            d = self.tri_v[t][(i+2)%3]
+            if (min(c,d), max(c,d)) in self.constraints:
+                # If the crossing is at (or within rounding of) an end of either segment, split at that end
+                (sp, k) = self.crossing_parameters( a, b, c, d )
+                if sp<self.epsilon:
+                    self.split_constraint( c, d, a )
+                    self.insert_constraint( a, b )
+                    return
+                if sp>1-self.epsilon:
+                    self.split_constraint( c, d, b )
+                    self.insert_constraint( a, b )
+                    return
+                if k<self.epsilon:
+                    self.add_split_constraint( a, c, b )
+                    return
+                if k>1-self.epsilon:
+                    self.add_split_constraint( a, d, b )
+                    return
+                (xs, ys) = (self.xs, self.ys)
+                v = self.add_vertex( xs[c]+k*(xs[d]-xs[c]), ys[c]+k*(ys[d]-ys[c]) )
+                self.split_edge( t, i, v )
+                self.add_split_constraint( a, v, b )
+                return
+            edges.append( (c, d) )
+            u = self.tri_n[t][i]
+            j = self.tri_n[u].index(t)
+            q = self.tri_v[u][j]
+            if q==b: break
+            oq = self.orient_v( a, b, q )
+            if oq==0:
+                self.add_split_constraint( a, q, b )
+                return
+            if oq>0:
+                (t, i) = (u, (j+1)%3)
+                pass
+            else:
+                (t, i) = (u, (j+2)%3)
+                pass
+            pass
+        # Flip crossed edges until none cross ab
+        new_edges = []
+        attempts = 0
+        while len(edges)>0:
+            attempts += 1
+            if attempts>100*(len(edges)+10):
+                raise Exception("Failed to insert constraint %d to %d"%(a,b))
+            (c, d) = edges.pop(0)
+            (t, i) = self.find_edge( c, d )
+            u = self.tri_n[t][i]
+            p = self.tri_v[t][i]
+            q = self.tri_v[u][self.tri_n[u].index(t)]
+            # The quadrilateral p,c,q,d is convex only if pq crosses cd
+            if (self.orient_v(p, q, c)>0)==(self.orient_v(p, q, d)>0) or (self.orient_v(p, q, c)==0) or (self.orient_v(p, q, d)==0):
+                edges.append( (c, d) )
+                continue
+            self.flip( t, i )
+            op = self.orient_v( a, b, p )
+            oq = self.orient_v( a, b, q )
+            if (p not in (a,b)) and (q not in (a,b)) and (((op>0) and (oq<0)) or ((op<0) and (oq>0))):
+                if op<0: edges.append( (p, q) )
+                else:    edges.append( (q, p) )
+                pass
+            else:
+                new_edges.append( (p, q) )
+                pass
+            pass
+        self.constraints.add( key )
+        # Restore the Delaunay property across the new edges
+        work = []
+        for (c, d) in new_edges:
+            if (min(c,d), max(c,d))==key: continue
+            e = self.find_edge( c, d )
+            if e is not None: work.append( e )
+            pass
+        self.legalize( work )
+        pass
+    #f is_between
+    def is_between( self, a, c, b ):
+        """Return True if c (collinear with a and b) is strictly between a and b"""
+        (dx, dy) = (self.xs[b]-self.xs[a], self.ys[b]-self.ys[a])
+        k = (self.xs[c]-self.xs[a])*dx + (self.ys[c]-self.ys[a])*dy
+        return 0<k<dx*dx+dy*dy
+    #f constraint_path
+    def constraint_path( self, a, b ):
+        """
+        Return the list of point indices that the constraint from a to b passes through, from a to b
+        """
+        if a==b: return [a]
+        key = (min(a,b), max(a,b))
+        if key not in self.split_vertex: return [a, b]
+        v = self.split_vertex[key]
+        return self.constraint_path( a, v ) + self.constraint_path( v, b )[1:]
+    #f is_constraint
+    def is_constraint( self, a, b ):
+        """Return True if the edge from a to b is a constraint"""
+        return (min(a,b), max(a,b)) in self.constraints
+    #f triangles
+    def triangles( self ):
+        """
+        Return a list of the counter-clockwise (a,b,c) vertex index triangles, excluding any using the enclosing triangle
+        """
+        (n0, n1) = (self.num_input_points, self.num_input_points+3)
+        result = []
+        for tv in self.tri_v:
+            if (n0<=tv[0]<n1) or (n0<=tv[1]<n1) or (n0<=tv[2]<n1): continue
+            result.append( tuple(tv) )
+            pass
+        return result
+    #f check_consistent
+    def check_consistent( self ):
+        """
+        Check that neighbours agree, triangles are counter-clockwise and constraints are edges
+        """
+        for t in range(len(self.tri_v)):
+            tv = self.tri_v[t]
+            if self.orient_v( tv[0], tv[1], tv[2] )<=0:
+                raise Exception("Triangle %d %s is not counter-clockwise"%(t,str(tv)))
+            for i in range(3):
+                u = self.tri_n[t][i]
+                if u is None: continue
+                if t not in self.tri_n[u]:
+                    raise Exception("Triangle %d neighbour %d does not have it as a neighbour"%(t,u))
+                (b, c) = (tv[(i+1)%3], tv[(i+2)%3])
+                if (b not in self.tri_v[u]) or (c not in self.tri_v[u]):
+                    raise Exception("Triangle %d neighbour %d does not share edge %d,%d"%(t,u,b,c))
+                pass
+            pass
+        for (a, b) in self.constraints:
+            if not self.has_edge(a, b):
+                raise Exception("Constraint %d,%d is not an edge"%(a,b))
+            pass
+        pass
+    #f All done
+    pass
+
+#a Main
+#f glyph_outlines
+def glyph_outlines( glyph, straightness ):
+    """
+    Return the contours of a c_glyph as lists of (x,y), flattening its quadratic Beziers
+
+    This works from the TTX coordinates of the glyph (alternately on-curve and control points)
+    """
+    import gjslib.math.bezier as bezier
+    outlines = []
+    for c in glyph.glyph:
+        beziers = []
+        for i in range(2,len(c),2):
+            beziers.append( bezier.bezier_quad( pts=(c[i-2],c[i-1],c[i]) ) )
+            pass
+        coords = bezier.flatten_bezier_list( beziers, straightness, closed=True )
+        outline = []
+        for j in range(0,len(coords),2):
+            xy = (float(coords[j]), float(coords[j+1]))
+            if (len(outline)==0) or (outline[-1]!=xy): outline.append(xy)
+            pass
+        while (len(outline)>1) and (outline[0]==outline[-1]): outline.pop()
+        if len(outline)>2: outlines.append(outline)
+        pass
+    return outlines
+
+#f glyph_mesh
+def glyph_mesh( outlines, constrained_delaunay=True ):
+    """
+    Mesh the outlines of a glyph as c_glyph.get_mesh does, with or without the constrained Delaunay triangulation
+    """
+    import gjslib.math.mesh as mesh
+    m = mesh.c_mesh()
+    for outline in outlines:
+        m.add_contour( [mesh.c_simple_point(xy) for xy in outline], closed=True )
+        pass
+    m.map_contours_to_mesh()
+    if constrained_delaunay:
+        return m.triangulate_contours()
+    m.normalize()
+    m.fill_convex_hull_with_triangles()
+    m.cleanup( min_length=0.01, min_area=0.01 )
+    for i in range(10):
+        if m.ensure_contours_on_mesh()==0: break
+        m.cleanup( min_length=0.01, min_area=0.01 )
+        pass
+    m.assign_winding_order_to_contours()
+    m.assign_winding_order_to_mesh()
+    return m
+
+#f main
+def main():
+    """
+    Compare meshing glyphs with the constrained Delaunay triangulation against the mesh cleanup pipeline
+
+    The glyph outlines are flattened from the TTX coordinates once, and not included in the times.
+    Glyphs that a pipeline fails to mesh are counted as failures (the time spent on them is included).
+
+    Usage: delaunay.py <ttx font file> [<glyph unichrs>]
+    """
+    import sys
+    import time
+    import gjslib.graphics.font as font
+    if len(sys.argv)<2:
+        print main.__doc__
+        return
+    f = font.c_ttx_font("benchmark").load_from_ttx( sys.argv[1] )
+    glyphs = f.get_glyph_unichrs()
+    if len(sys.argv)>2: glyphs = list(unicode(sys.argv[2]))
+    outlines = [ glyph_outlines( f.glyphs[gu], straightness=50 ) for gu in glyphs ]
+    for constrained_delaunay in [False, True]:
+        (triangles, failures) = (0, 0)
+        t = time.time()
+        for o in outlines:
+            try:
+                triangles += len( glyph_mesh( o, constrained_delaunay=constrained_delaunay ).triangles )
+                pass
+            except Exception:
+                failures += 1
+                pass
+            pass
+        t = time.time()-t
+        name = {False:"mesh cleanup pipeline", True:"constrained Delaunay"}[constrained_delaunay]
+        print "%d glyphs: %-22s %8.4fs %7d triangles %4d failed"%(len(outlines), name, t, triangles, failures)
+        pass
+    pass
+
+if __name__ == '__main__':
+    main()
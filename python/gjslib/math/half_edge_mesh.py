@@ -0,0 +1,404 @@
+#!/usr/bin/env python
+#a Documentation
+"""
+A compact triangle mesh held as a half-edge structure in numpy arrays
+
+This is an alternative to mesh.c_mesh, which is made of one Python
+object per point, line and triangle, each with lists of the others.
+Here a vertex, half-edge or face is just an index:
+
+  coords[v]          (x,y) coordinates of vertex v (float64)
+  vertex_he[v]       a half-edge leaving vertex v, or -1
+  he_vertex[h]       the vertex half-edge h leaves from
+  he_next[h]         the next half-edge counter-clockwise around the face of h
+  he_twin[h]         the half-edge in the opposite direction, or -1 on the boundary
+  he_face[h]         the face (triangle) to the left of h
+  he_winding[h]      +1 if h runs along a contour, -1 if against one, else 0
+  face_he[f]         a half-edge of face f
+  face_winding[f]    winding order of face f
+  face_flags[f]      FACE_WINDING_SET if face_winding[f] has been assigned
+
+set_triangles gives face f the half-edges 3f, 3f+1 and 3f+2, but
+swap_diagonal moves half-edges between faces, so the half-edges of a
+face are found from face_he[f] by following he_next. Contours are
+lists of vertex indices. A mesh is built by adding contours (and any
+extra points), then triangulating with a constrained Delaunay
+triangulation, which also assigns winding orders; c_mesh instances can
+be converted to and from a half_edge_mesh.
+"""
+
+#a Imports
+import numpy
+import delaunay
+
+#a Classes
+#c half_edge_mesh
+class half_edge_mesh( object ):
+    FACE_WINDING_SET = 1
+    #f __init__
+    def __init__( self ):
+        self.coords = numpy.zeros((16,2), dtype=numpy.float64)
+        self.vertex_he = numpy.zeros(16, dtype=numpy.int32)
+        self.num_vertices = 0
+        self.vertex_index = {}
+        self.contours = []
+        self.set_triangles( numpy.zeros((0,3), dtype=numpy.int32) )
+        pass
+    #f add_point
+    def add_point( self, xy ):
+        """
+        Add a vertex at coordinates xy, returning its index; if there is already a vertex there, return that
+        """
+        key = (float(xy[0]), float(xy[1]))
+        if key in self.vertex_index: return self.vertex_index[key]
+        v = self.num_vertices
+        if v>=len(self.coords):
+            self.coords = numpy.resize(self.coords, (2*v,2))
+            self.vertex_he = numpy.resize(self.vertex_he, 2*v)
+            pass
+        self.coords[v] = key
+        self.vertex_he[v] = -1
+        self.vertex_index[key] = v
+        self.num_vertices = v+1
+        return v
+    #f add_contour
+    def add_contour( self, coords, closed=True ):
+        """
+        Add a contour through a list of coordinates, returning the contour number
+        """
+        self.contours.append( {"vertices":[self.add_point(xy) for xy in coords], "closed":closed} )
+        return len(self.contours)-1
+    #f contour_edges
+    def contour_edges( self, c ):
+        """
+        Return the list of (v0, v1) vertex pairs of the segments of contour c, skipping any with v0==v1
+        """
+        vs = c["vertices"]
+        edges = []
+        for i in range(len(vs)):
+            if (i==0) and not c["closed"]: continue
+            if vs[i-1]!=vs[i]: edges.append( (vs[i-1], vs[i]) )
+            pass
+        return edges
+    #f get_coords
+    def get_coords( self ):
+        """Return the (N,2) array of vertex coordinates"""
+        return self.coords[:self.num_vertices]
+    #f set_triangles
+    def set_triangles( self, triangles ):
+        """
+        Replace the faces of the mesh with an (F,3) array of counter-clockwise vertex index triangles
+
+        All half-edges are rebuilt, and face winding orders are cleared
+        """
+        tris = numpy.asarray(triangles, dtype=numpy.int32).reshape((-1,3))
+        f = len(tris)
+        self.num_faces = f
+        self.he_vertex = tris.reshape(-1).copy()
+        self.he_face = numpy.repeat(numpy.arange(f, dtype=numpy.int32), 3)
+        self.he_next = (numpy.arange(3*f, dtype=numpy.int32).reshape((-1,3))[:,[1,2,0]]).reshape(-1)
+        self.face_he = numpy.arange(0, 3*f, 3, dtype=numpy.int32)
+        self.face_winding = numpy.zeros(f, dtype=numpy.int32)
+        self.face_flags = numpy.zeros(f, dtype=numpy.uint8)
+        self.he_winding = numpy.zeros(3*f, dtype=numpy.int8)
+        self.he_twin = self.find_half_edges( self.he_vertex[self.he_next], self.he_vertex )
+        self.vertex_he[:self.num_vertices] = -1
+        self.vertex_he[self.he_vertex[::-1]] = numpy.arange(3*f-1, -1, -1, dtype=numpy.int32)
+        pass
+    #f find_half_edges
+    def find_half_edges( self, v0s, v1s ):
+        """
+        Return an array of the half-edges from each of v0s to the corresponding v1s, with -1 where there is none
+
+        The half-edges are sorted by (from, to) vertex key, and the keys searched for
+        """
+        n = numpy.int64(max(self.num_vertices, 1))
+        keys = self.he_vertex.astype(numpy.int64)*n + self.he_vertex[self.he_next]
+        order = numpy.argsort(keys)
+        sorted_keys = keys[order]
+        find_keys = numpy.asarray(v0s, dtype=numpy.int64)*n + numpy.asarray(v1s, dtype=numpy.int64)
+        result = numpy.full(len(find_keys), -1, dtype=numpy.int32)
+        if len(keys)==0: return result
+        i = numpy.clip(numpy.searchsorted(sorted_keys, find_keys), 0, len(keys)-1)
+        found = sorted_keys[i]==find_keys
+        result[found] = order[i[found]]
+        return result
+    #f find_half_edge
+    def find_half_edge( self, v0, v1 ):
+        """
+        Return the half-edge from v0 to v1, or -1 if there is none
+        """
+        h = self.vertex_he[v0]
+        if h<0: return -1
+        start = h
+        # Rotate clockwise around v0 (twin of the previous half-edge), then counter-clockwise if a boundary is hit
+        while True:
+            if self.he_vertex[self.he_next[h]]==v1: return h
+            h = self.he_twin[self.he_next[self.he_next[h]]]
+            if (h<0) or (h==start): break
+            pass
+        if h<0:
+            h = start
+            while True:
+                t = self.he_twin[h]
+                if t<0: break
+                h = self.he_next[t]
+                if h==start: break
+                if self.he_vertex[self.he_next[h]]==v1: return h
+                pass
+            pass
+        return -1
+    #f triangulate
+    def triangulate( self ):
+        """
+        Triangulate the vertices with a constrained Delaunay triangulation of the contours
+
+        Every contour segment becomes an edge of the mesh; contours are updated with any vertices they
+        pass through (or vertices added where they cross), and winding orders are assigned
+        """
+        cdt = delaunay.constrained_delaunay( self.get_coords() )
+        for c in self.contours:
+            for (v0, v1) in self.contour_edges(c):
+                cdt.insert_constraint( v0, v1 )
+                pass
+            pass
+        n = self.num_vertices
+        # The triangulation numbers its added vertices after its three enclosing triangle vertices
+        remap = numpy.arange(n+3+len(cdt.added_vertices), dtype=numpy.int32)
+        for v in cdt.added_vertices:
+            remap[v] = self.add_point( cdt.coords(v) )
+            pass
+        for c in self.contours:
+            vertices = []
+            for (v0, v1) in self.contour_edges(c):
+                vertices.extend( remap[cdt.constraint_path(v0, v1)[1:]].tolist() )
+                pass
+            if not c["closed"] and (len(c["vertices"])>0): vertices.insert( 0, c["vertices"][0] )
+            c["vertices"] = vertices
+            pass
+        self.set_triangles( remap[numpy.array(cdt.triangles(), dtype=numpy.int32).reshape((-1,3))] )
+        self.assign_winding_order()
+        return self
+    #f swap_diagonal
+    def swap_diagonal( self, h ):
+        """
+        Swap the diagonal of the quadrilateral formed by the two faces either side of half-edge h
+
+        If h is a->b in face (a,b,c) and its twin is b->a in face (b,a,d) then they become d->c and
+        c->d in faces (d,c,a) and (c,d,b). The quadrilateral should be convex.
+        """
+        t = self.he_twin[h]
+        if t<0:
+            raise Exception("Cannot swap diagonal of boundary half-edge %d"%h)
+        (hn, tn) = (self.he_next[h], self.he_next[t])
+        (hp, tp) = (self.he_next[hn], self.he_next[tn])
+        (a, b) = (self.he_vertex[h], self.he_vertex[t])
+        (c, d) = (self.he_vertex[hp], self.he_vertex[tp])
+        (f0, f1) = (self.he_face[h], self.he_face[t])
+        self.he_vertex[h] = d
+        self.he_vertex[t] = c
+        self.he_next[h]  = hp
+        self.he_next[hp] = tn
+        self.he_next[tn] = h
+        self.he_next[t]  = tp
+        self.he_next[tp] = hn
+        self.he_next[hn] = t
+        self.he_face[tn] = f0
+        self.he_face[hn] = f1
+        self.face_he[f0] = h
+        self.face_he[f1] = t
+        self.vertex_he[a] = tn
+        self.vertex_he[b] = hn
+        self.he_winding[h] = 0
+        self.he_winding[t] = 0
+        pass
+    #f assign_winding_order
+    def assign_winding_order( self ):
+        """
+        Mark the half-edges along and against the contours, and assign winding orders to every face
+
+        The winding order of the outside of the mesh is 0; crossing a contour edge onto its left
+        (counter-clockwise) side subtracts 1, as c_mesh does; faces are reached from the boundary
+        """
+        self.he_winding[:] = 0
+        edges = []
+        for c in self.contours:
+            edges.extend( self.contour_edges(c) )
+            pass
+        edges = numpy.array(edges, dtype=numpy.int32).reshape((-1,2))
+        h = self.find_half_edges( edges[:,0], edges[:,1] )
+        self.he_winding[h[h>=0]] = 1
+        h = self.find_half_edges( edges[:,1], edges[:,0] )
+        self.he_winding[h[h>=0]] = -1
+        self.face_flags &= ~numpy.uint8(self.FACE_WINDING_SET)
+        he_twin    = self.he_twin.tolist()
+        he_next    = self.he_next.tolist()
+        he_face    = self.he_face.tolist()
+        face_he    = self.face_he.tolist()
+        he_winding = self.he_winding.tolist()
+        face_winding = [0]*self.num_faces
+        face_set = [False]*self.num_faces
+        work = []
+        for h in numpy.nonzero(self.he_twin<0)[0].tolist():
+            f = he_face[h]
+            if face_set[f]: continue
+            face_winding[f] = -he_winding[h]
+            face_set[f] = True
+            work.append(f)
+            pass
+        while len(work)>0:
+            f = work.pop()
+            h = face_he[f]
+            for i in range(3):
+                t = he_twin[h]
+                h = he_next[h]
+                if t<0: continue
+                g = he_face[t]
+                if face_set[g]: continue
+                face_winding[g] = face_winding[f] - he_winding[t]
+                face_set[g] = True
+                work.append(g)
+                pass
+            pass
+        self.face_winding[:] = face_winding
+        self.face_flags[numpy.array(face_set, dtype=bool)] |= self.FACE_WINDING_SET
+        pass
+    #f get_vertices_and_triangles
+    def get_vertices_and_triangles( self, odd_winding_only=False ):
+        """
+        Return an (N,2) array of vertex coordinates and an (F,3) array of counter-clockwise triangles
+
+        If odd_winding_only is True then only the triangles with an odd winding order (i.e. inside the contours) are returned
+        """
+        faces = numpy.arange(self.num_faces)
+        if odd_winding_only:
+            faces = numpy.nonzero(self.face_winding & 1)[0]
+            pass
+        h = self.face_he[faces]
+        tris = numpy.stack((self.he_vertex[h], self.he_vertex[self.he_next[h]], self.he_vertex[self.he_next[self.he_next[h]]]), axis=-1)
+        return (self.get_coords().copy(), tris)
+    #f check_consistent
+    def check_consistent( self ):
+        """
+        Check the half-edge arrays are consistent with each other and the faces are counter-clockwise
+        """
+        h = numpy.arange(3*self.num_faces)
+        if numpy.any(self.he_next[self.he_next[self.he_next]]!=h):
+            raise Exception("Half-edge next does not cycle in threes")
+        if numpy.any(self.he_face[self.he_next]!=self.he_face):
+            raise Exception("Half-edge next is in a different face")
+        if numpy.any(self.he_face[self.face_he]!=numpy.arange(self.num_faces)):
+            raise Exception("Face half-edge is not in the face")
+        twinned = self.he_twin>=0
+        t = self.he_twin[twinned]
+        if numpy.any(self.he_twin[t]!=h[twinned]):
+            raise Exception("Half-edge twins are not mutual")
+        if numpy.any(self.he_vertex[t]!=self.he_vertex[self.he_next[h[twinned]]]):
+            raise Exception("Half-edge twin does not start at the end of the half-edge")
+        v = self.vertex_he[:self.num_vertices]
+        used = v>=0
+        if numpy.any(self.he_vertex[v[used]]!=numpy.nonzero(used)[0]):
+            raise Exception("Vertex half-edge does not leave the vertex")
+        (coords, tris) = self.get_vertices_and_triangles()
+        (a, b, c) = (coords[tris[:,0]], coords[tris[:,1]], coords[tris[:,2]])
+        area = (b[:,0]-a[:,0])*(c[:,1]-a[:,1]) - (b[:,1]-a[:,1])*(c[:,0]-a[:,0])
+        if numpy.any(area<=0):
+            raise Exception("Face is not counter-clockwise")
+        pass
+    #f classmethod from_mesh
+    @classmethod
+    def from_mesh( cls, mesh ):
+        """
+        Create a half_edge_mesh from a mesh.c_mesh, with the same points, triangles, contours and winding orders
+
+        Vertex numbers are the order of the mesh's points sorted by coordinates
+        """
+        self = cls()
+        index = {}
+        for p in mesh.point_set.sorted_points():
+            index[p] = self.add_point( p.coords() )
+            pass
+        for c in mesh.contours:
+            self.contours.append( {"vertices":[index[p] for p in c["mesh_pts"]], "closed":c["closed"]} )
+            pass
+        tris = []
+        for t in mesh.triangles:
+            (a, b, c) = [index[p] for p in t.get_points()]
+            if delaunay.orient( *(tuple(self.coords[a])+tuple(self.coords[b])+tuple(self.coords[c])) )<0: (b, c) = (c, b)
+            tris.append( (a, b, c) )
+            pass
+        self.set_triangles( numpy.array(tris, dtype=numpy.int32).reshape((-1,3)) )
+        self.assign_winding_order()
+        for f in range(len(tris)):
+            w = mesh.triangles[f].winding_order
+            if w is None:
+                self.face_flags[f] &= ~numpy.uint8(self.FACE_WINDING_SET)
+                pass
+            else:
+                self.face_winding[f] = w
+                self.face_flags[f] |= self.FACE_WINDING_SET
+                pass
+            pass
+        return self
+    #f to_mesh
+    def to_mesh( self, point_fn=None ):
+        """
+        Create a mesh.c_mesh with the same points, triangles, contours and winding orders
+
+        point_fn creates a 'point class' instance from coordinates; it defaults to mesh.c_simple_point
+        """
+        import mesh
+        if point_fn is None: point_fn = mesh.c_simple_point
+        m = mesh.c_mesh()
+        pts = [point_fn(tuple(xy)) for xy in self.get_coords().tolist()]
+        mesh_pts = [m.add_point(p) for p in pts]
+        for c in self.contours:
+            m.add_contour( [pts[v] for v in c["vertices"]], closed=c["closed"] )
+            m.contours[-1]["mesh_pts"] = [mesh_pts[v] for v in c["vertices"]]
+            pass
+        (coords, tris) = self.get_vertices_and_triangles()
+        for f in range(len(tris)):
+            t = m.add_triangle_from_points( [mesh_pts[v] for v in tris[f]] )
+            if self.face_flags[f] & self.FACE_WINDING_SET: t.winding_order = int(self.face_winding[f])
+            pass
+        m.number_points()
+        m.assign_winding_order_to_contours()
+        return m
+    #f All done
+    pass
+
+#a Main
+def main():
+    import time
+    import math
+    import mesh
+    point = mesh.c_simple_point
+    n = 2000
+    outline = [ (math.cos(2*math.pi*i/n)*(2+math.sin(10*math.pi*i/n)), math.sin(2*math.pi*i/n)*(2+math.sin(10*math.pi*i/n))) for i in range(n) ]
+    hole = [ (math.cos(-2*math.pi*i/n), math.sin(-2*math.pi*i/n)) for i in range(n) ]
+    t = time.time()
+    m = mesh.c_mesh()
+    m.add_contour( [point(xy) for xy in outline] )
+    m.add_contour( [point(xy) for xy in hole] )
+    m.map_contours_to_mesh()
+    m.triangulate_contours()
+    t_mesh = time.time()-t
+    t = time.time()
+    h = half_edge_mesh()
+    h.add_contour( outline )
+    h.add_contour( hole )
+    h.triangulate()
+    t_half_edge = time.time()-t
+    print "%d points: c_mesh triangulate_contours %8.4fs half_edge_mesh triangulate %8.4fs"%(2*n, t_mesh, t_half_edge)
+    t = time.time()
+    m.assign_winding_order_to_contours()
+    m.assign_winding_order_to_mesh()
+    t_mesh = time.time()-t
+    t = time.time()
+    h.assign_winding_order()
+    t_half_edge = time.time()-t
+    print "%d triangles: c_mesh winding orders %8.4fs half_edge_mesh winding orders %8.4fs"%(h.num_faces, t_mesh, t_half_edge)
+    pass
+
+if __name__ == '__main__':
+    main()
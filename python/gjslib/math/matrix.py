@@ -4,14 +4,114 @@ import vectors
 import polynomial
   
 #a Classes
+#c lup_factorization
+class lup_factorization(tuple):
+    """
+    The result of matrix.lup_decompose - a tuple of (LU, P), where LU is the combined
+    L and U matrices and P the pivot list, such that row r of L.U is row P[r] of the
+    decomposed matrix
+
+    The factorization can be reused to solve for any number of right-hand sides
+    at O(n^2) each; its determinant and inverse are calculated on first use and remembered
+    """
+    #f __new__
+    def __new__(cls, LU, P):
+        return tuple.__new__(cls, (LU, P))
+    #f __init__
+    def __init__(self, LU, P):
+        self.LU = LU
+        self.P = P
+        self.n = LU.order
+        self._determinant = None
+        self._inverse = None
+        self.singular = False
+        for r in range(self.n):
+            if LU[r,r]==0.0: self.singular=True
+            pass
+        pass
+    #f solve
+    def solve(self, b):
+        """
+        Solve A.x = b for x, where A is the decomposed matrix
+        Returns x as a list, or None if the matrix is singular
+        """
+        if self.singular: return None
+        n = self.n
+        lu = self.LU.matrix
+        # Forward substitution with L (which has 1s on its diagonal) on the pivoted b
+        x = [b[self.P[r]] for r in range(n)]
+        for r in range(n):
+            for i in range(r):
+                x[r] -= lu[r*n+i]*x[i]
+                pass
+            pass
+        # Back substitution with U
+        for r in range(n-1,-1,-1):
+            for i in range(r+1,n):
+                x[r] -= lu[r*n+i]*x[i]
+                pass
+            x[r] = x[r]/lu[r*n+r]
+            pass
+        return x
+    #f solve_many
+    def solve_many(self, B):
+        """
+        Solve A.x = b for each vector b in B
+        Returns a list of solutions, or None if the matrix is singular
+        """
+        if self.singular: return None
+        return [self.solve(b) for b in B]
+    #f determinant
+    def determinant(self):
+        """
+        det(U).det(P), where det(P) = +-1 depending on the parity of the permutation
+        """
+        if self._determinant is None:
+            det = 1.0
+            for rc in range(self.n):
+                det *= self.LU[rc,rc]
+                pass
+            visited = [False]*self.n
+            for i in range(self.n):
+                if visited[i]: continue
+                j = self.P[i]
+                visited[i] = True
+                while j!=i:
+                    visited[j] = True
+                    det = -det
+                    j = self.P[j]
+                    pass
+                pass
+            self._determinant = det
+            pass
+        return self._determinant
+    #f inverse
+    def inverse(self):
+        """
+        Return the inverse of the decomposed matrix, or None if it is singular
+        A copy is returned, so the caller may modify it
+        """
+        if self.singular: return None
+        if self._inverse is None:
+            self._inverse = self.LU.lup_invert(self.P)
+            pass
+        return self._inverse.copy()
+    #f All done
+    pass
+
 #c matrix
 class matrix(object):
     """
     N x N matrix, held in a linear list in row-major order
 
     i.e. matrxi[1] is the second column, first row
+
+    The LU factorization of the matrix is remembered (keyed by the matrix data) so that
+    repeated calls to inverse, determinant and lup_factorization do not recalculate it
     """
     order = 2
+    factorization_class = lup_factorization
+    _factorization = None
     #f multiply_matrix_data
     @classmethod
     def multiply_matrix_data( cls, n, m0, m1 ):
@@ -62,7 +162,7 @@ class matrix(object):
                 order=self.order
                 pass
             else:
-                order = [1,4,9,16,25,36].index(len(data))+1
+                order = int(round(math.sqrt(len(data))))
                 pass
             pass
         self.order = order
@@ -179,8 +279,14 @@ class matrix(object):
         self.premult(matrix(data=m))
         pass
     #f apply
-    def apply(self, v):
+    def apply(self, v, perspective=False):
+        """
+        Apply the matrix to a vector, returning a list
+        If the vector has one fewer coordinate than the order then its final coordinate is taken to be 1
+        If perspective is True then the result is divided through by its last coordinate (if nonzero)
+        """
         n = self.order
+        if len(v)==n-1: v = list(v)+[1.0]
         r = []
         for i in range(n):
             d = 0
@@ -189,7 +295,24 @@ class matrix(object):
                 pass
             r.append(d)
             pass
+        if perspective and r[-1]!=0:
+            w = r[-1]
+            r = [x/w for x in r]
+            pass
         return r
+    #f apply_many
+    def apply_many(self, points, perspective=False, out=None):
+        """
+        Apply the matrix to each of a list of vectors, as apply() does
+        Returns a list of the results; if out is given then the results are
+        stored in it (out[i] for the i'th point) and it is returned instead
+        """
+        if out is None:
+            return [self.apply(v, perspective=perspective) for v in points]
+        for i in range(len(points)):
+            out[i] = self.apply(points[i], perspective=perspective)
+            pass
+        return out
     #f transpose
     def transpose(self):
         n = self.order
@@ -261,7 +384,33 @@ class matrix(object):
             # Next element on the diagonal...
             #print "After diagonal",d,LU
             pass
-        return (LU, P)
+        return self.factorization_class(LU, P)
+    #f factorization_key
+    def factorization_key(self):
+        """
+        Return a hashable snapshot of the matrix data, used to validate a remembered factorization
+        """
+        return tuple(self.matrix)
+    #f lup_factorization
+    def lup_factorization(self):
+        """
+        Return the LU factorization of the matrix (as lup_decompose), or None if it is singular
+
+        The factorization is remembered until the matrix data changes
+        """
+        key = self.factorization_key()
+        if (self._factorization is None) or (self._factorization[0]!=key):
+            self._factorization = (key, self.lup_decompose())
+            pass
+        return self._factorization[1]
+    #f solve
+    def solve(self, b):
+        """
+        Solve M.x = b for x, returning None if the matrix is singular
+        """
+        lup = self.lup_factorization()
+        if lup is None: return None
+        return lup.solve(b)
     #f lup_invert
     def lup_invert(self, P):
         """
@@ -330,25 +479,10 @@ class matrix(object):
         Decompose to LUP, then det(U).det(P)
         det(P) = +-1 depending on the number of swaps required
         """
-        n = self.order
-        lup = self.lup_decompose()
+        lup = self.lup_factorization()
         if lup is None:
             return 0.0
-        (LU, P) = lup
-        det_P = 1
-        for i in range(n):
-            if P[i] != i:
-                det_P = -det_P
-                P_i = P.index(i)
-                P[P_i] = P[i]
-                P[i] = i
-                pass
-            pass
-        det = 1.0 * det_P
-        for rc in range(n):
-            det *= LU[rc,rc]
-            pass
-        return det
+        return lup.determinant()
     #f lu_split
     def lu_split(self):
         """
@@ -374,10 +508,10 @@ class matrix(object):
         return (L, U)
     #f inverse
     def inverse(self):
-        lup = self.lup_decompose()
+        lup = self.lup_factorization()
         if lup is None:
             return None
-        return lup[0].lup_invert(lup[1])
+        return lup.inverse()
     #f invert
     def invert(self):
         m = self.inverse()
@@ -389,14 +523,14 @@ class matrix(object):
             return self.matrix[0]
         if self.order==2:
             (a,b,c,d) = self.matrix
-            q = polynomial.c_quadratic(1,-(a+d),a*d-b*c)
+            q = polynomial.quadratic(1,-(a+d),a*d-b*c)
             if real:
                 return q.find_real_roots()
             return q.find_all_roots()
         if self.order!=3:
             raise Exception("Eigenvalues can only be found for matrices of order <=3 currently")
         (a,b,c, d,e,f, g,h,i) = self.matrix
-        q = polynomial.c_cubic(-1, a+e+i, b*d-a*e + f*h-e*i + c*g-a*i, 
+        q = polynomial.cubic(-1, a+e+i, b*d-a*e + f*h-e*i + c*g-a*i, 
                                 a*e*i + b*f*g + c*d*h - a*f*h - b*d*i - c*e*g)
         if real:
             return q.find_real_roots()
@@ -14,13 +14,42 @@ __docformat__ = "restructuredtext"
 
 #a Imports
 import gjslib.math.bezier as bezier
+import gjslib.math.delaunay as delaunay
+import heapq
 import math
 
 #a Variable
 verbose = True
 verbose = False
 
+#a Useful functions
+#f triangle_area
+def triangle_area( xy0, xy1, xy2 ):
+    """
+    Return the area of the triangle with corners at coordinates xy0, xy1, xy2, in the same measure as c_mesh_triangle.get_area
+    """
+    area = (xy1[0]-xy0[0])*(xy2[1]-xy0[1]) - (xy2[0]-xy0[0])*(xy1[1]-xy0[1])
+    if (area<0): area=-area
+    return area
+
 #a Mesh classes
+#c c_simple_point
+class c_simple_point( object ):
+    """
+    A minimal 'point class' for the points that c_mesh_point wraps, holding just coordinates
+
+    Used where a mesh is built from bare coordinates (half_edge_mesh.to_mesh, benchmarks and tests)
+    """
+    def __init__( self, coords ):
+        self.coords = coords
+        pass
+    def set_coords( self, coords ):
+        self.coords = coords
+        pass
+    def __repr__( self ):
+        return "pt(%f,%f)"%tuple(self.coords)
+    pass
+
 #c c_mesh_point
 class c_mesh_point( object ):
     """
@@ -142,6 +171,22 @@ class c_mesh_point( object ):
             result.append(l)
             pass
         return result
+    #f can_move_to
+    def can_move_to( self, coords, ignore=() ):
+        """
+        Return True if the mesh point could be moved to coords without flipping or flattening any of its triangles
+
+        Triangles in ignore (which are about to be removed) are not checked
+        """
+        for t in self.triangles:
+            if t in ignore: continue
+            xys = [p.coords() for p in t.get_points()]
+            before = (xys[1][0]-xys[0][0])*(xys[2][1]-xys[0][1]) - (xys[2][0]-xys[0][0])*(xys[1][1]-xys[0][1])
+            xys[t.get_points().index(self)] = coords
+            after = (xys[1][0]-xys[0][0])*(xys[2][1]-xys[0][1]) - (xys[2][0]-xys[0][0])*(xys[1][1]-xys[0][1])
+            if before*after<=0: return False
+            pass
+        return True
     #f add_to_triangle
     def add_to_triangle( self, triangle ):
         """Add the mesh point to a triangle by updating the mesh point data *only*."""
@@ -278,6 +323,7 @@ class c_mesh_line( object ):
         pt_other.remove_from_line( self )
         pt_to.add_to_line( self, pt_other, i )
         pt_other.add_to_line( self, pt_to, 1-i )
+        self.calculate_direction()
         pass
     #f get_points
     def get_points( self ):
@@ -361,6 +407,28 @@ class c_mesh_line( object ):
         other.pts[0].remove_from_line( other )
         other.pts[1].remove_from_line( other )
         return c_mesh_line( self.pts[1-self_index], other.pts[self_index] )
+    #f can_merge_ends
+    def can_merge_ends( self ):
+        """
+        Determine if the two ends of this line can be merged into one point without breaking the mesh.
+
+        The only points that may be connected to both ends of the line are those opposite the line in its triangles;
+        any other common neighbour would end up with two lines to the merged point.
+        Also, moving the ends to the midpoint of the line (as merge_two_line_ends does) must not flip any other triangle.
+        """
+        (A, B) = self.pts
+        others = set()
+        for t in self.triangles:
+            if t is not None: others.add( t.get_other_point( self.pts ) )
+            pass
+        neighbours = set( [pt for (l,pt,x) in A.line_segments] )
+        for (l,pt,x) in B.line_segments:
+            if (pt in neighbours) and (pt not in others): return False
+            pass
+        (xA,yA) = A.coords()
+        (xB,yB) = B.coords()
+        mid = ((xA+xB)/2.0, (yA+yB)/2.0)
+        return A.can_move_to( mid, ignore=self.triangles ) and B.can_move_to( mid, ignore=self.triangles )
     #f can_shorten_diagonal
     def can_shorten_diagonal( self ):
         """
@@ -424,6 +492,7 @@ class c_mesh_line( object ):
             print "Triangles ",self.triangles[0], self.triangles[1]
         self.pts = ( X, Y )
         self.calculate_direction()
+        mesh.update_spatial_index( lines=(self,) )
         self.triangles[0].change_point_on_diagonal( B, Y, self.triangles[1] )
         self.triangles[1].change_point_on_diagonal( A, X, self.triangles[0] )
         if verbose:
@@ -687,6 +756,225 @@ class c_mesh_triangle( object ):
         if self.winding_order is not None: winding="%d"%self.winding_order
         return "tri(%d:%s,%d,%d,%d,%6.2f)"%(self.triangle_num,winding,self.pts[0].entry_number,self.pts[1].entry_number,self.pts[2].entry_number,self.get_area())
 
+#c c_mesh_point_set
+class c_mesh_point_set( object ):
+    """
+    The set of mesh points of a mesh, indexed by coordinates
+
+    Mesh points are held in a dictionary keyed by the tuple of their coordinates, so that finding
+    an existing mesh point at a coordinate and adding a new one are both O(1). The points are only
+    sorted (by coordinates, as c_mesh_point.compare_with orders them) when a sorted list is
+    required; the sorted list is kept until the set changes.
+
+    Iteration, and len(), do not sort the set; indexing does.
+    """
+    #f __init__
+    def __init__( self ):
+        self.points = {}
+        self.keys = {}
+        self.sorted = None
+        pass
+    #f key
+    def key( self, coords ):
+        """Return the dictionary key for a coordinate tuple"""
+        return tuple(coords)
+    #f find
+    def find( self, point ):
+        """Return the mesh point whose coordinates are those of the (non-mesh) point, or None"""
+        return self.points.get( self.key(point.coords) )
+    #f add
+    def add( self, mesh_pt ):
+        """Add a mesh point to the set; there must not already be a mesh point at its coordinates"""
+        k = self.key( mesh_pt.coords() )
+        self.points[k] = mesh_pt
+        self.keys[mesh_pt] = k
+        self.sorted = None
+        pass
+    #f remove
+    def remove( self, mesh_pt ):
+        """Remove a mesh point from the set"""
+        k = self.keys.pop( mesh_pt )
+        if self.points.get(k) is mesh_pt: del self.points[k]
+        self.sorted = None
+        pass
+    #f rekey
+    def rekey( self, mesh_pt ):
+        """
+        Update the coordinate key for a mesh point that has moved
+
+        If another mesh point is already at the new coordinates then that mesh point remains the one
+        found for those coordinates
+        """
+        k = self.keys[mesh_pt]
+        if self.points.get(k) is mesh_pt: del self.points[k]
+        k = self.key( mesh_pt.coords() )
+        if k not in self.points: self.points[k] = mesh_pt
+        self.keys[mesh_pt] = k
+        self.sorted = None
+        pass
+    #f sorted_points
+    def sorted_points( self ):
+        """Return a list of the mesh points sorted by coordinates"""
+        if self.sorted is None:
+            self.sorted = sorted( self.keys.keys(), key=lambda p:tuple(p.coords()) )
+            pass
+        return self.sorted
+    #f __len__
+    def __len__( self ):
+        return len(self.keys)
+    #f __iter__
+    def __iter__( self ):
+        return iter(self.keys.keys())
+    #f __contains__
+    def __contains__( self, mesh_pt ):
+        return mesh_pt in self.keys
+    #f __getitem__
+    def __getitem__( self, n ):
+        return self.sorted_points()[n]
+    #f __repr__
+    def __repr__( self ):
+        return str(self.sorted_points())
+    #f All done
+    pass
+
+#c c_mesh_grid
+class c_mesh_grid( object ):
+    """
+    A uniform grid spatial index of the line segments and points of a mesh
+
+    The plane is divided into square cells of side cell_size (unbounded, as cells are held in a
+    dictionary). A point is held in the cell containing it; a line segment is held in every cell
+    that it passes through (with a little margin, so that segments that touch share a cell).
+
+    The cells that each line segment and point was added to are recorded, so that it can be
+    removed after its coordinates have changed; to move a line or point, remove it and add it again.
+    """
+    #f __init__
+    def __init__( self, cell_size ):
+        self.cell_size = float(cell_size)
+        self.line_cells = {}
+        self.point_cells = {}
+        self.lines = {}
+        self.points = {}
+        pass
+    #f cell
+    def cell( self, xy ):
+        """Return the cell containing coordinates xy"""
+        return (int(math.floor(xy[0]/self.cell_size)), int(math.floor(xy[1]/self.cell_size)))
+    #f cells_on_segment
+    def cells_on_segment( self, xy0, xy1 ):
+        """
+        Return a list of the cells that the segment from xy0 to xy1 passes through
+
+        For each column of cells that the segment spans, the segment is clipped to the column
+        and the cells between the lowest and highest y of the clipped segment are used
+        """
+        c = self.cell_size
+        margin = c*1E-6
+        (x0,y0) = xy0
+        (x1,y1) = xy1
+        if x1<x0: (x0,y0,x1,y1) = (x1,y1,x0,y0)
+        ix0 = int(math.floor((x0-margin)/c))
+        ix1 = int(math.floor((x1+margin)/c))
+        cells = []
+        for ix in range(ix0, ix1+1):
+            if x1>x0:
+                t0 = max(0.0, (ix*c-x0)/(x1-x0))
+                t1 = min(1.0, ((ix+1)*c-x0)/(x1-x0))
+                ya = y0+(y1-y0)*t0
+                yb = y0+(y1-y0)*t1
+                pass
+            else:
+                (ya, yb) = (y0, y1)
+                pass
+            if yb<ya: (ya,yb) = (yb,ya)
+            for iy in range(int(math.floor((ya-margin)/c)), int(math.floor((yb+margin)/c))+1):
+                cells.append( (ix,iy) )
+                pass
+            pass
+        return cells
+    #f add_line
+    def add_line( self, line ):
+        (p0, p1) = line.get_points()
+        cells = self.cells_on_segment( p0.coords(), p1.coords() )
+        self.lines[line] = cells
+        for cell in cells:
+            if cell not in self.line_cells: self.line_cells[cell] = set()
+            self.line_cells[cell].add(line)
+            pass
+        pass
+    #f remove_line
+    def remove_line( self, line ):
+        for cell in self.lines.pop(line, []):
+            self.line_cells[cell].discard(line)
+            if len(self.line_cells[cell])==0: del self.line_cells[cell]
+            pass
+        pass
+    #f add_point
+    def add_point( self, pt ):
+        cell = self.cell( pt.coords() )
+        self.points[pt] = cell
+        if cell not in self.point_cells: self.point_cells[cell] = set()
+        self.point_cells[cell].add(pt)
+        pass
+    #f remove_point
+    def remove_point( self, pt ):
+        cell = self.points.pop(pt, None)
+        if cell is None: return
+        self.point_cells[cell].discard(pt)
+        if len(self.point_cells[cell])==0: del self.point_cells[cell]
+        pass
+    #f find_lines_near_segment
+    def find_lines_near_segment( self, xy0, xy1 ):
+        """
+        Return the line segments in the cells that the segment from xy0 to xy1 passes through,
+        in order of line number
+        """
+        lines = set()
+        for cell in self.cells_on_segment( xy0, xy1 ):
+            if cell in self.line_cells: lines.update( self.line_cells[cell] )
+            pass
+        return sorted( lines, key=lambda l:l.line_num )
+    #f find_points_near
+    def find_points_near( self, xy, radius ):
+        """
+        Return the points within radius of coordinates xy
+        """
+        (cx0, cy0) = self.cell( (xy[0]-radius, xy[1]-radius) )
+        (cx1, cy1) = self.cell( (xy[0]+radius, xy[1]+radius) )
+        r2 = radius*radius
+        pts = []
+        for ix in range(cx0, cx1+1):
+            for iy in range(cy0, cy1+1):
+                for pt in self.point_cells.get( (ix,iy), () ):
+                    (x,y) = pt.coords()
+                    if (x-xy[0])*(x-xy[0])+(y-xy[1])*(y-xy[1])<=r2: pts.append(pt)
+                    pass
+                pass
+            pass
+        return pts
+    #f check_consistent
+    def check_consistent( self, mesh ):
+        """
+        Check that the index holds exactly the mesh's line segments and points, in the right cells
+        """
+        if len(self.lines)!=len(mesh.line_segments):
+            raise Exception("Spatial index has %d lines, mesh has %d"%(len(self.lines),len(mesh.line_segments)))
+        for l in mesh.line_segments:
+            (p0, p1) = l.get_points()
+            if self.lines.get(l) != self.cells_on_segment( p0.coords(), p1.coords() ):
+                raise Exception("Line %s is not in the correct spatial index cells"%(str(l)))
+            pass
+        if len(self.points)!=len(mesh.point_set):
+            raise Exception("Spatial index has %d points, mesh has %d"%(len(self.points),len(mesh.point_set)))
+        for pt in mesh.point_set:
+            if self.points.get(pt) != self.cell( pt.coords() ):
+                raise Exception("Point %s is not in the correct spatial index cell"%(str(pt)))
+            pass
+        pass
+    #f All done
+    pass
+
 #c c_mesh
 class c_mesh( object ):
     """
@@ -698,8 +986,8 @@ class c_mesh( object ):
 
     After the mesh is fully built with contours winding rules and fill can be applied, or gradients applied to lines.
 
-    The mesh always has a list of points (self.point_set), list of line segments, and a list of triangles
-    This is a list of c_mesh_points
+    The mesh always has a set of points (self.point_set), list of line segments, and a list of triangles
+    This is a c_mesh_point_set of c_mesh_points, sorted by coordinates only when required
     Each mesh point has a list of lines it is part of
     The list of line_segments is a list of c_mesh_lines(pta,ptb)
     Each mesh line has a pts=(pta,ptb) tuple attribute and a (tria,trib) triangle tuple
@@ -716,6 +1004,10 @@ class c_mesh( object ):
     x = c_mesh()
     x.from_points( [c_point,...] )
 
+    A spatial index (c_mesh_grid) of the line segments and points is built when first needed
+    by a query, and kept up to date as lines and points are added, removed and moved.
+    Methods that replace the line segment list wholesale discard it, to be rebuilt on the next query.
+
     """
     #f __init__
     def __init__( self ):
@@ -727,8 +1019,9 @@ class c_mesh( object ):
         """Reset a mesh to be empty."""
         self.line_segments = []
         self.triangles = []
-        self.point_set = []
+        self.point_set = c_mesh_point_set()
         self.contours = []
+        self.spatial_index = None
         pass
     #f reset_lines
     def reset_lines( self ):
@@ -737,6 +1030,7 @@ class c_mesh( object ):
             l.remove()
             pass
         self.line_segments = []
+        self.spatial_index = None
         pass
     #f reset_triangles
     def reset_triangles( self ):
@@ -762,7 +1056,73 @@ class c_mesh( object ):
         for t in self.triangles:
             t.check_consistent()
             pass
+        if self.spatial_index is not None:
+            self.spatial_index.check_consistent(self)
+            pass
+        pass
+    #f build_spatial_index
+    def build_spatial_index( self, cell_size=None ):
+        """
+        Build the spatial index of the mesh's line segments and points
+
+        If cell_size is None then it is chosen so that the bounding box of the points is covered
+        by roughly as many cells as there are line segments (or points, if more)
+        """
+        if cell_size is None:
+            cell_size = 1.0
+            if len(self.point_set)>0:
+                xs = [p.coords()[0] for p in self.point_set]
+                ys = [p.coords()[1] for p in self.point_set]
+                extent = max(max(xs)-min(xs), max(ys)-min(ys))
+                n = max(len(self.line_segments), len(self.point_set))
+                if extent>0: cell_size = extent/math.ceil(math.sqrt(n))
+                pass
+            pass
+        self.spatial_index = c_mesh_grid( cell_size )
+        for l in self.line_segments:
+            self.spatial_index.add_line(l)
+            pass
+        for pt in self.point_set:
+            self.spatial_index.add_point(pt)
+            pass
+        return self.spatial_index
+    #f get_spatial_index
+    def get_spatial_index( self ):
+        """Return the spatial index, building it if required"""
+        if self.spatial_index is None: self.build_spatial_index()
+        return self.spatial_index
+    #f update_spatial_index
+    def update_spatial_index( self, lines=(), points=() ):
+        """
+        Update the spatial index for line segments and points whose coordinates have changed
+        """
+        if self.spatial_index is None: return
+        for l in lines:
+            self.spatial_index.remove_line(l)
+            self.spatial_index.add_line(l)
+            pass
+        for pt in points:
+            self.spatial_index.remove_point(pt)
+            self.spatial_index.add_point(pt)
+            pass
+        pass
+    #f move_point
+    def move_point( self, pt, coords ):
+        """
+        Move a mesh point, updating the directions of its line segments and the spatial index
+        """
+        pt.set_coords( coords )
+        self.point_set.rekey( pt )
+        lines = pt.all_lines()
+        for l in lines:
+            l.calculate_direction()
+            pass
+        self.update_spatial_index( lines=lines, points=(pt,) )
         pass
+    #f find_points_near
+    def find_points_near( self, xy, radius ):
+        """Return the mesh points within radius of the coordinates xy"""
+        return self.get_spatial_index().find_points_near( xy, radius )
     #f find_insertion_index
     def find_insertion_index( self, set, element, compare_fn ):
         """
@@ -799,15 +1159,17 @@ class c_mesh( object ):
         point is NOT a mesh point
         Add an external representation of a point to the set of points in the mesh, and return that object
         If the point is already in our set, return that object
-        Keep the point set ordered by coords
         """
-        (ins, match) = self.find_insertion_index( self.point_set, point, lambda s,e:s.compare_with(e) )
-        if match: return self.point_set[ins]
+        match = self.point_set.find( point )
+        if match is not None: return match
         new_point = c_mesh_point( point )
-        self.point_set.insert( ins, new_point )
+        self.point_set.add( new_point )
         if append_to_numbers:
             new_point.entry_number = len(self.point_set)
             pass
+        if self.spatial_index is not None:
+            self.spatial_index.add_point( new_point )
+            pass
         return new_point
     #f remove_point
     def remove_point( self, pt ):
@@ -815,6 +1177,9 @@ class c_mesh( object ):
         Remove a point from the mesh - just from the mesh data
         """
         self.point_set.remove( pt )
+        if self.spatial_index is not None:
+            self.spatial_index.remove_point( pt )
+            pass
         return
     #f add_line
     def add_line( self, pt0, pt1 ):
@@ -823,6 +1188,9 @@ class c_mesh( object ):
         """
         line = c_mesh_line(pt0,pt1)
         self.line_segments.append( line )
+        if self.spatial_index is not None:
+            self.spatial_index.add_line( line )
+            pass
         return line
     #f remove_line
     def remove_line( self, line ):
@@ -830,6 +1198,9 @@ class c_mesh( object ):
         Remove a line to the mesh - just from the mesh data
         """
         self.line_segments.remove( line )
+        if self.spatial_index is not None:
+            self.spatial_index.remove_line( line )
+            pass
         return
     #f find_or_create_line
     def find_or_create_line( self, pt0, pt1 ):
@@ -869,16 +1240,10 @@ class c_mesh( object ):
         pass
     #f add_bezier_list_contour
     def add_bezier_list_contour( self, bezier_list, closed=False, contour_data=None, straightness=1000, perturbation=None ):
-        points = []
-        i = 0
-        for b in bezier_list:
-            subbeziers = b.break_into_segments(straightness)
-            for s in subbeziers:
-                if perturbation is not None:
-                    s.pts[0].perturb(i*perturbation)
-                    pass
-                points.append(s.pts[0])
-                i += 1
+        points = bezier.flatten_bezier_list_points( bezier_list, straightness, cache=bezier.default_flatten_cache )
+        if perturbation is not None:
+            for i in range(len(points)):
+                points[i].perturb(i*perturbation)
                 pass
             pass
         self.add_contour( points, closed=closed, contour_data=contour_data )
@@ -909,6 +1274,7 @@ class c_mesh( object ):
         This is a normalized mesh
         """
         self.line_segments = []
+        self.spatial_index = None
         p0 = points[-1]
         for i in range(len(points)):
             p1 = points[i]
@@ -922,21 +1288,19 @@ class c_mesh( object ):
         self.reset()
         points = []
         i = 0
-        for b in bezier_list:
-            subbeziers = b.break_into_segments(straightness)
-            for s in subbeziers:
-                s.pts[0].perturb(i*epsilon)
-                points.append(self.add_point(s.pts[0]) )
-                i += 1
-                pass
+        for p in bezier.flatten_bezier_list_points( bezier_list, straightness, cache=bezier.default_flatten_cache ):
+            p.perturb(i*epsilon)
+            points.append(self.add_point(p) )
+            i += 1
             pass
 
         self.from_points( points )
         return self
     #f number_points
     def number_points( self ):
-        for i in range(len(self.point_set)):
-            self.point_set[i].entry_number = i
+        point_set = self.point_set.sorted_points()
+        for i in range(len(point_set)):
+            point_set[i].entry_number = i
             pass
         pass
     #f find_first_segment
@@ -1024,6 +1388,7 @@ class c_mesh( object ):
 
         If the line segments are (a, b) and (b,c), and b-a and c-b are parallel, then change first line segment to be (a,c) and remove the second
         """
+        self.spatial_index = None
         l = len(self.line_segments)
         i = l-1
         while i>0:
@@ -1059,15 +1424,16 @@ class c_mesh( object ):
         The sweep all points creating triangles from (x0,y0) to (xn,yn), (xn+1,yn+1) in the swept order
         """
         radial_order = []
-        (x0,y0) = self.point_set[0].coords()
-        for pt in self.point_set[1:]:
+        point_set = self.point_set.sorted_points()
+        (x0,y0) = point_set[0].coords()
+        for pt in point_set[1:]:
             if must_be_used_in_lines and not pt.used_in_lines(): continue
             (x,y) = pt.coords()
             (dx,dy) = (x-x0,y-y0)
             (ins, match) = self.find_insertion_index( radial_order, (dx,dy), lambda s,e:s[0]*e[1]-s[1]*e[0] )
             radial_order.insert( ins, (dx, dy, pt) )
             pass
-        radial_order.insert(0,(0,0,self.point_set[0]))
+        radial_order.insert(0,(0,0,point_set[0]))
         num_points_used = len(radial_order)
         if num_points_used<3:
             return
@@ -1130,8 +1496,8 @@ class c_mesh( object ):
           Remove T from point C
           Remove T from mesh
         Remove AB from the mesh
-        For all triangles in the mesh which include B, make them use A instead
-        For all lines in the mesh which include B, make them use A instead
+        For all triangles which include B (from B's own list), make them use A instead
+        For all lines which include B (from B's own list), make them use A instead
         Remove B from the mesh
         """
         (A,B) = line.get_points()
@@ -1140,6 +1506,9 @@ class c_mesh( object ):
         xA = (xA+xB)/2.0
         yA = (yA+yB)/2.0
         A.set_coords( coords=(xA,yA) )
+        self.point_set.rekey( A )
+        self.update_spatial_index( points=(A,) )
+        removed_lines = []
         for t in line.triangles:
             if t is None: continue
             C = t.get_other_point( (A,B) )
@@ -1147,33 +1516,35 @@ class c_mesh( object ):
             BC = B.find_line_segment_to( C )
             tac = AC.find_other_triangle(t)
             tbc = BC.find_other_triangle(t)
-            AC.swap_triangle(t,tbc)
+            if tbc is None:
+                AC.remove_from_triangle(t)
+                pass
+            else:
+                AC.swap_triangle(t,tbc)
+                pass
             A.remove_from_triangle(t)
             C.remove_from_triangle(t)
             C.remove_from_line(BC)
             self.remove_line(BC)
             self.remove_triangle( t )
+            removed_lines.append(BC)
             pass
         self.remove_line(line)
         A.remove_from_line(line)
         self.remove_point(B)
-        for t in self.triangles:
-            if B in t.get_points():
-                t.change_vertex(B,A)
-                pass
+        for t in list(B.triangles):
+            if t in line.triangles: continue
+            t.change_vertex(B,A)
             pass
-        for l in self.line_segments:
-            if l is line: continue
-            lpts = l.get_points()
-            if B in lpts:
-                print "Change vertex for %s from %s to %s"%(str(l),str(B),str(A))
-                l.change_vertex(B,A)
-                print "Changed vertex for %s from %s to %s"%(str(l),str(B),str(A))
-                pass
-            elif A in lpts:
-                l.calculate_direction()
-                pass
+        for l in B.all_lines():
+            if (l is line) or (l in removed_lines): continue
+            if verbose: print "Change vertex for %s from %s to %s"%(str(l),str(B),str(A))
+            l.change_vertex(B,A)
             pass
+        for l in A.all_lines():
+            l.calculate_direction()
+            pass
+        self.update_spatial_index( lines=A.all_lines() )
         for c in self.contours:
             mesh_pts = c["mesh_pts"]
             for i in range(len(mesh_pts)):
@@ -1271,51 +1642,7 @@ class c_mesh( object ):
                 print "********************************************************************************"
                 print "Area %f of %s, want to remove"%(t.get_area(),str(t))
                 pass
-            (A,B,C) = t.get_points()
-
-            (Ax,Ay) = A.coords()
-            (Bx,By) = B.coords()
-            (Cx,Cy) = C.coords()
-            lAB2 = (Ax-Bx)*(Ax-Bx)+(Ay-By)*(Ay-By)
-            lAC2 = (Ax-Cx)*(Ax-Cx)+(Ay-Cy)*(Ay-Cy)
-            lBC2 = (Bx-Cx)*(Bx-Cx)+(By-Cy)*(By-Cy)
-            while (lAB2<lAC2) or (lAB2<lBC2):
-                (A,B,C) = (B,C,A)
-                (lAB2, lAC2, lBC2) = (lBC2, lAB2, lAC2)
-                pass
-            (Ax,Ay) = A.coords()
-            (Bx,By) = B.coords()
-            (Cx,Cy) = C.coords()
-            l = (By-Ay)*(By-Ay)+(Bx-Ax)*(Bx-Ax)
-            k = ((Cx-Ax)*(Bx-Ax) + (Cy-Ay)*(By-Ay)) / l
-            if verbose:
-                print (Ax,Ay), (Bx,By), (Cx,Cy), k, l
-                print "Will move C to",(Ax*(1-k)+k*Bx,Ay*(1-k)+k*By)
-                pass
-            C.set_coords( (Ax*(1-k)+k*Bx,Ay*(1-k)+k*By) )
-            for cl in C.all_lines():
-                cl.calculate_direction()
-                pass
-            AB = A.find_line_segment_to(B)
-            AC = A.find_line_segment_to(C)
-            BC = B.find_line_segment_to(C)
-            if AB.num_triangles()==1:
-                #self.check_consistent()
-                A.remove_from_triangle( t )
-                B.remove_from_triangle( t )
-                AC.remove_from_triangle( t )
-                BC.remove_from_triangle( t )
-                A.remove_from_line( AB )
-                B.remove_from_line( AB )
-                self.remove_line( AB )
-                self.remove_triangle( t )
-                #self.check_consistent()
-                pass
-            else:
-                #self.check_consistent()
-                AB.swap_diagonal( self, verbose=verbose )
-                #self.check_consistent()
-                pass
+            self.remove_small_area_triangle( t, verbose=verbose )
             i+=1
             pass
         if verbose:
@@ -1324,6 +1651,95 @@ class c_mesh( object ):
             print self.__repr__(verbose=True)
             self.check_consistent()
         return triangles_removed
+    #f find_small_area_triangle_move
+    def find_small_area_triangle_move( self, t ):
+        """
+        Find the move that removes a small area triangle, as remove_small_area_triangle does
+
+        Return ((A,B,C), coords) where AB is the longest side of the triangle and coords is
+        the point on AB to move C to
+        """
+        (A,B,C) = t.get_points()
+
+        (Ax,Ay) = A.coords()
+        (Bx,By) = B.coords()
+        (Cx,Cy) = C.coords()
+        lAB2 = (Ax-Bx)*(Ax-Bx)+(Ay-By)*(Ay-By)
+        lAC2 = (Ax-Cx)*(Ax-Cx)+(Ay-Cy)*(Ay-Cy)
+        lBC2 = (Bx-Cx)*(Bx-Cx)+(By-Cy)*(By-Cy)
+        while (lAB2<lAC2) or (lAB2<lBC2):
+            (A,B,C) = (B,C,A)
+            (lAB2, lAC2, lBC2) = (lBC2, lAB2, lAC2)
+            pass
+        (Ax,Ay) = A.coords()
+        (Bx,By) = B.coords()
+        (Cx,Cy) = C.coords()
+        l = (By-Ay)*(By-Ay)+(Bx-Ax)*(Bx-Ax)
+        k = ((Cx-Ax)*(Bx-Ax) + (Cy-Ay)*(By-Ay)) / l
+        return ((A,B,C), (Ax*(1-k)+k*Bx,Ay*(1-k)+k*By))
+    #f remove_small_area_triangle
+    def remove_small_area_triangle( self, t, verbose=False ):
+        """
+        Remove a small area triangle by moving the mesh point not on its longest side onto that side
+
+        See remove_small_area_triangles for the method; return the three points of the triangle, with the moved point last
+        """
+        ((A,B,C), coords) = self.find_small_area_triangle_move( t )
+        if verbose:
+            print A, B, C
+            print "Will move C to",coords
+            pass
+        self.move_point( C, coords )
+        AB = A.find_line_segment_to(B)
+        AC = A.find_line_segment_to(C)
+        BC = B.find_line_segment_to(C)
+        if AB.num_triangles()==1:
+            #self.check_consistent()
+            A.remove_from_triangle( t )
+            B.remove_from_triangle( t )
+            C.remove_from_triangle( t )
+            AC.remove_from_triangle( t )
+            BC.remove_from_triangle( t )
+            A.remove_from_line( AB )
+            B.remove_from_line( AB )
+            self.remove_line( AB )
+            self.remove_triangle( t )
+            #self.check_consistent()
+            pass
+        else:
+            #self.check_consistent()
+            AB.swap_diagonal( self, verbose=verbose )
+            #self.check_consistent()
+            pass
+        return (A,B,C)
+    #f small_area_triangle_move_helps
+    def small_area_triangle_move_helps( self, t, pts, coords, min_area ):
+        """
+        Determine if moving point C of triangle t=ABC to coords (on AB), as remove_small_area_triangle does,
+        strictly reduces the number of triangles of area min_area or less without flipping any triangle
+
+        The triangles that change are those of C; and t itself is either removed (if AB is on the edge of the mesh)
+        or, with the other triangle ABD of AB, replaced by ACD and CBD
+        """
+        (A,B,C) = pts
+        if not C.can_move_to( coords, ignore=(t,) ): return False
+        (before, after) = (0, 0)
+        for u in C.triangles:
+            if u.get_area()<=min_area: before += 1
+            if u is t: continue
+            xys = [p.coords() for p in u.get_points()]
+            xys[u.get_points().index(C)] = coords
+            if triangle_area( *xys )<=min_area: after += 1
+            pass
+        AB = A.find_line_segment_to(B)
+        if AB.num_triangles()==2:
+            other = AB.find_other_triangle(t)
+            D = other.get_other_point( (A,B) )
+            if other.get_area()<=min_area: before += 1
+            if triangle_area( A.coords(), coords, D.coords() )<=min_area: after += 1
+            if triangle_area( coords, B.coords(), D.coords() )<=min_area: after += 1
+            pass
+        return after<before
     #f find_large_area_triangle_centroids
     def find_large_area_triangle_centroids( self, max_area, verbose=False ):
         """
@@ -1367,6 +1783,144 @@ class c_mesh( object ):
         #self.split_line_segment_in_half( self.line_segments[0] )
 
         return work_done
+    #f cleanup
+    def cleanup( self, min_length, min_area, shorten_diagonals=True, max_operations=None, verbose=False ):
+        """
+        Remove small lines and small area triangles, and shorten quadrilateral diagonals, until none remain
+
+        This does the work of remove_small_lines, remove_small_area_triangles and shorten_quad_diagonals,
+        but without repeated passes over the whole mesh: a priority queue is seeded with every offending
+        line and triangle, and after each merge, move or swap only the lines and triangles around the
+        points that were changed are checked and queued. Small lines are handled first (shortest first),
+        then small triangles (smallest first), then diagonals.
+
+        Queue entries may be stale by the time they are popped, so each is checked to still be in the mesh
+        and still need work. Merges and moves that would fold the mesh over are skipped (see can_merge_ends
+        and c_mesh_point.can_move_to), so a few small lines may remain where merging them is not possible.
+        A small triangle's point is only moved if that strictly reduces the number of small triangles, and a
+        diagonal is only swapped if that does not add a small triangle; so every operation makes progress,
+        and the queue empties.
+
+        @param: min_length     Lines of this length or less are removed by merging their ends
+        @param: min_area       Triangles of this area (as c_mesh_triangle.get_area) or less are removed
+        @param: shorten_diagonals  If True, swap diagonals of quadrilaterals that can be shortened
+        @param: max_operations Bound on the total number of operations (None for a bound based on the mesh size)
+
+        Return a dictionary of the number of each kind of operation performed (lines_merged, points_moved,
+        diagonals_swapped), the number of triangles that left the mesh (triangles_removed), and
+        converged - False if max_operations was reached with work still to do
+        """
+        if max_operations is None:
+            max_operations = 10*(len(self.line_segments)+len(self.triangles))+10
+            pass
+        operations = {"lines_merged":0, "points_moved":0, "diagonals_swapped":0, "triangles_removed":0, "converged":True}
+        queue = []
+        entry_number = [0]
+        def queue_entry(kind, value, x):
+            heapq.heappush( queue, (kind, value, entry_number[0], x) )
+            entry_number[0] += 1
+            pass
+        def line_in_mesh(l):
+            (p0, p1) = l.get_points()
+            return (p0.find_line_segment_to(p1) is l) and (p1.find_line_segment_to(p0) is l)
+        def triangle_in_mesh(t):
+            for p in t.get_points():
+                if t not in p.triangles: return False
+                pass
+            return True
+        def num_small(*xyss):
+            n = 0
+            for xys in xyss:
+                if triangle_area( *xys )<=min_area: n+=1
+                pass
+            return n
+        def swap_is_due(l):
+            if not l.can_shorten_diagonal(): return False
+            (A, B) = [p.coords() for p in l.get_points()]
+            X = l.triangles[0].get_other_point( l.pts ).coords()
+            Y = l.triangles[1].get_other_point( l.pts ).coords()
+            return num_small( (X,Y,A), (X,Y,B) ) <= num_small( (A,B,X), (A,B,Y) )
+        def is_due(kind, x):
+            if kind==0:
+                return line_in_mesh(x) and (x.get_length()<=min_length) and x.can_merge_ends()
+            if kind==1:
+                if (not triangle_in_mesh(x)) or (x.get_area()>min_area): return False
+                (pts, coords) = self.find_small_area_triangle_move( x )
+                return self.small_area_triangle_move_helps( x, pts, coords, min_area )
+            return line_in_mesh(x) and swap_is_due(x)
+        def queue_line(l):
+            length = l.get_length()
+            if length<=min_length:
+                queue_entry( 0, length, l )
+                pass
+            elif shorten_diagonals and l.can_shorten_diagonal():
+                queue_entry( 2, -length, l )
+                pass
+            pass
+        def queue_triangle(t):
+            area = t.get_area()
+            if area<=min_area:
+                queue_entry( 1, area, t )
+                pass
+            pass
+        def queue_around(pts, triangles=()):
+            lines = set()
+            triangles = set(triangles)
+            for p in pts:
+                if p not in self.point_set: continue
+                lines.update( p.all_lines() )
+                triangles.update( p.triangles )
+                pass
+            for t in triangles:
+                if not triangle_in_mesh(t): continue
+                lines.update( t.find_lines() )
+                queue_triangle(t)
+                pass
+            for l in lines:
+                if (l is not None) and line_in_mesh(l): queue_line(l)
+                pass
+            pass
+
+        for l in self.line_segments:
+            queue_line(l)
+            pass
+        for t in self.triangles:
+            queue_triangle(t)
+            pass
+        num_operations = 0
+        while len(queue)>0:
+            (kind, value, n, x) = heapq.heappop( queue )
+            if not is_due(kind, x): continue
+            if num_operations>=max_operations:
+                operations["converged"] = False
+                break
+            num_triangles = len(self.triangles)
+            if kind==0:
+                if verbose: print "Merging ends of line %s of length %f"%(str(x),x.get_length())
+                A = x.get_points()[0]
+                self.merge_two_line_ends( x, verbose=verbose )
+                operations["lines_merged"] += 1
+                queue_around( (A,) )
+                pass
+            elif kind==1:
+                if verbose: print "Removing triangle %s of area %f"%(str(x),x.get_area())
+                pts = self.remove_small_area_triangle( x, verbose=verbose )
+                operations["points_moved"] += 1
+                queue_around( pts )
+                pass
+            else:
+                if verbose: print "Shortening diagonal %s"%(str(x))
+                x.swap_diagonal( self, verbose=verbose )
+                operations["diagonals_swapped"] += 1
+                queue_around( (), triangles=x.triangles )
+                pass
+            operations["triangles_removed"] += num_triangles-len(self.triangles)
+            num_operations += 1
+            pass
+        if verbose:
+            print "Cleanup operations",operations
+            pass
+        return operations
     #f find_line_segments_on_line
     def find_line_segments_on_line( self, pt0, pt1 ):
         """
@@ -1376,7 +1930,7 @@ class c_mesh( object ):
         (x0,y0) = pt0.coords()
         (x1,y1) = pt1.coords()
         (dx,dy) = (x1-x0, y1-y0)
-        for l in self.line_segments:
+        for l in self.get_spatial_index().find_lines_near_segment( (x0,y0), (x1,y1) ):
             l_pts = l.get_points()
             if pt0 in l_pts or pt1 in l_pts: continue
             intersect = l.find_intersection( (x0,y0), (dx,dy) )
@@ -1405,7 +1959,7 @@ class c_mesh( object ):
                 pass
             pass
         (x,y) = (intersections[min_i][1][2],intersections[min_i][1][3])
-        pt = self.add_point(bezier.c_point( coords=(x,y) ), append_to_numbers=True)
+        pt = self.add_point(type(mesh_pts[pt_num].pt)( (x,y) ), append_to_numbers=True)
         mesh_pts.insert( pt_num, pt )
         self.split_line_segment( intersections[min_i][0], pt )
         return
@@ -1459,6 +2013,66 @@ class c_mesh( object ):
             pass
         return lines_changed
 
+    #f triangulate_contours
+    def triangulate_contours( self, point_fn=None ):
+        """
+        Triangulate the mesh points with a constrained Delaunay triangulation of the contours
+
+        This replaces fill_convex_hull_with_triangles and the repeated ensure_contours_on_mesh and cleanup passes;
+        the contours must have been mapped to mesh points (with map_contours_to_mesh).
+
+        Any existing lines and triangles are discarded, and the convex hull of the mesh points is filled
+        with triangles such that every contour line segment is a mesh line segment. Where a contour
+        passes through a mesh point, that point is added to the contour; where two contours cross, a
+        point is added to the mesh and both contours. Winding orders are then assigned to the contours
+        and the mesh triangles.
+
+        @param: point_fn  Creates a 'point class' instance for a crossing from its coordinates; if None, the
+                          class of the existing mesh points is used
+        """
+        self.reset_triangles()
+        self.reset_lines()
+        mesh_pts = list(self.point_set.sorted_points())
+        index = {}
+        for i in range(len(mesh_pts)):
+            index[mesh_pts[i]] = i
+            pass
+        cdt = delaunay.constrained_delaunay( [p.coords() for p in mesh_pts] )
+        for c in self.contours:
+            pts = c["mesh_pts"]
+            for i in range(len(pts)):
+                if (i==0) and not c["closed"]: continue
+                cdt.insert_constraint( index[pts[i-1]], index[pts[i]] )
+                pass
+            pass
+        mesh_pts.extend( [None, None, None] ) # The triangulation's enclosing triangle vertices
+        if (point_fn is None) and (len(cdt.added_vertices)>0):
+            point_fn = type(mesh_pts[0].pt)
+            pass
+        for v in cdt.added_vertices:
+            mesh_pts.append( self.add_point( point_fn( cdt.coords(v) ) ) )
+            pass
+        for (a,b,c) in cdt.triangles():
+            self.add_triangle_from_points( (mesh_pts[a], mesh_pts[b], mesh_pts[c]) )
+            pass
+        for c in self.contours:
+            pts = c["mesh_pts"]
+            contour_pts = []
+            for i in range(len(pts)):
+                if (i==0) and not c["closed"]: continue
+                path = cdt.constraint_path( index[pts[i-1]], index[pts[i]] )
+                for j in range(1,len(path)):
+                    self.find_or_create_line( mesh_pts[path[j-1]], mesh_pts[path[j]] )
+                    contour_pts.append( mesh_pts[path[j]] )
+                    pass
+                pass
+            if not c["closed"] and (len(pts)>0): contour_pts.insert( 0, pts[0] )
+            c["mesh_pts"] = contour_pts
+            pass
+        self.number_points()
+        self.assign_winding_order_to_contours()
+        self.assign_winding_order_to_mesh()
+        return self
     #f assign_winding_order_to_contours
     def assign_winding_order_to_contours( self ):
         """
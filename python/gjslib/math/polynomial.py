@@ -210,15 +210,23 @@ class cubic(object):
 class polynomial(object):
     """
     A polynomial class that supports real polynomial coefficients, with differentiation
+
+    Multiplication and division of polynomials switch to FFT methods once the polynomials
+    have at least fast_threshold coefficients
     """
+    fast_threshold = 64
     #f __init__
     def __init__( self, coeffs=[0] ):
         self._coeffs=[]
         for c in coeffs:
             self._coeffs.append(c+0.0)
             pass
+        self._derivative = None
         self.normalize()
         pass
+    #f copy
+    def copy( self ):
+        return polynomial(coeffs=self._coeffs)
     #f __repr__
     def __repr__( self ):
         return str(self._coeffs)
@@ -298,29 +306,33 @@ class polynomial(object):
             pass
         return result
     #f factorize
-    def factorize( self ):
+    def factorize( self, epsilon=1E-6 ):
+        """
+        Factorize the polynomial into linear factors for its real roots, quadratic factors for
+        each complex conjugate pair of roots (if the coefficients are real), and a constant
+
+        The roots are found all at once with find_all_roots; a root is real if its imaginary part
+        is within epsilon of zero. Raises an exception (from find_all_roots) if the roots do not converge
+        """
         import fractions
         factors = []
-        poly = self
-        while len(poly._coeffs)>1:
-            for attempt in (0.01, -1.0, -5.0, -10.0, 1.0, 5.0, 10.0):
-                x = poly.find_root(attempt)
-                if x is not None:
-                    x=x[0]
-                    break
+        roots = self.find_all_roots()
+        real_coeffs = complex not in [type(c) for c in self._coeffs]
+        for r in roots:
+            (x, y) = r.cartesian()
+            if abs(y)<epsilon:
+                factors.append(polynomial([-x,1]))
+                pass
+            elif not real_coeffs:
+                factors.append(polynomial([-r,1]))
+                pass
+            elif y>0:
+                factors.append(polynomial([x*x+y*y,-2*x,1]))
                 pass
-            if x is None:
-                factors.append(poly)
-                return factors
-            f = fractions.Fraction(x).limit_denominator(1000)
-            xx = float(f)
-            p = polynomial([-f,1])
-            p = polynomial([-x,1])
-            factors.append(p)
-            poly = poly.divide(p)[0]
             pass
-        if len(poly._coeffs)==1:
-            f = fractions.Fraction(poly.evaluate(0)).limit_denominator(1000)
+        if len(self._coeffs)>0:
+            f = self._coeffs[-1]
+            if real_coeffs: f = fractions.Fraction(f).limit_denominator(1000)
             factors.append(polynomial([f]))
             pass
         return factors
@@ -330,7 +342,9 @@ class polynomial(object):
         A normalized polynomial has its top coefficient non-zero
 
         The normalization process is to pop the top coefficient off while it is zero...
+        As every change to the coefficients ends with a normalize, this also drops the cached derivative
         """
+        self._derivative = None
         while (len(self._coeffs)>0) and (not bool(self._coeffs[-1])):
             self._coeffs.pop()
             pass
@@ -357,20 +371,17 @@ class polynomial(object):
         self._coeffs = r
         return self.normalize()
     #f multiply
-    def multiply( self, other ):
-        r = []
-        sl = len(self._coeffs)
-        ol = len(other._coeffs)
-        for i in range(sl):
-            v = self._coeffs[i]
-            n = i
-            for j in range(ol):
-                while n>=len(r): r.append(0)
-                r[n] += v*other._coeffs[j]
-                n+=1
-                pass
-            pass
-        self._coeffs = r
+    def multiply( self, other, exact=False ):
+        """
+        Multiply this polynomial by a second polynomial
+
+        If both polynomials have at least fast_threshold coefficients then the product is
+        found by FFT convolution, which rounds each coefficient of the result to within the
+        floating point error of the transform. If exact is True the FFT is never used; if the
+        coefficients are all integers, they are then multiplied exactly as (Python) integers
+        using Kronecker substitution.
+        """
+        self._coeffs = _multiply_coeffs(self._coeffs, other._coeffs, exact=exact)
         return self.normalize()
     #f differentiate
     def differentiate( self ):
@@ -380,58 +391,144 @@ class polynomial(object):
             r.append(self._coeffs[i+1]*(i+1))
             pass
         return polynomial(coeffs=r)
+    #f derivative
+    def derivative( self ):
+        """
+        Return the derivative of the polynomial, differentiating only if the
+        polynomial has changed since the last call
+
+        The result is shared, so it should be copied before it is modified
+        """
+        if self._derivative is None:
+            self._derivative = self.differentiate()
+            pass
+        return self._derivative
     #f evaluate
     def evaluate(self, x):
-        v = None
-        xn = 1
-        sl = len(self._coeffs)
-        for i in range(sl):
-            nv = xn*self._coeffs[i]
-            if v is None: v=nv
-            else: v=nv+v
-            xn = x*xn
+        """
+        Evaluate the polynomial at x using Horner's method
+        """
+        v = 0.0
+        for c in reversed(self._coeffs):
+            v = v*x + c
             pass
         return v
+    #f evaluate_with_derivative
+    def evaluate_with_derivative(self, x):
+        """
+        Evaluate the polynomial and its derivative at x in a single Horner pass
+
+        Returns (f(x), f'(x))
+        """
+        v = 0.0
+        dv = 0.0
+        for c in reversed(self._coeffs):
+            dv = dv*x + v
+            v = v*x + c
+            pass
+        return (v, dv)
+    #f evaluate_many
+    def evaluate_many(self, xs, derivative=False):
+        """
+        Evaluate the polynomial at every element of the array-like xs using Horner's method
+
+        Returns a numpy array of the same shape as xs, or a tuple of that and an array of
+        the derivative if derivative is True. Complex coefficients are supported, in which
+        case the result is a numpy complex array.
+        """
+        import numpy
+        coeffs = self._coeffs
+        if complex in [type(c) for c in coeffs]:
+            coeffs = [c.real()+1j*c.imaginary() if type(c)==complex else c for c in coeffs]
+            pass
+        xs = numpy.asarray(xs)
+        dtype = numpy.result_type(xs, numpy.float64, *coeffs)
+        v  = numpy.zeros(xs.shape, dtype=dtype)
+        dv = numpy.zeros(xs.shape, dtype=dtype)
+        for c in reversed(coeffs):
+            if derivative:
+                dv *= xs
+                dv += v
+                pass
+            v *= xs
+            v += c
+            pass
+        if derivative:
+            return (v, dv)
+        return v
     #f evaluate_poly
-    def evaluate_poly( self, poly ):
+    def evaluate_poly( self, poly, exact=False ):
         """
         self(n) = Sum( coeff[i].n^i )
         Apply to a polynomial 'poly'
         i.e. return self(poly)
+
+        The coefficients are split in half recursively, with self(poly) = low(poly) + poly^h.high(poly),
+        where poly^h is one of poly, poly^2, poly^4, ... (each found once); the products are then of
+        similar sizes, and large ones use FFT multiplication (unless exact is True)
         """
-        result = c_polynomial()
-        pn = c_polynomial(coeffs=[1])
-        sl = len(self._coeffs)
-        for i in range(sl):
-            result = result.add( pn, scale=self._coeffs[i] )
-            pn = pn.multiply(poly)
+        powers = [poly]
+        while (1<<len(powers))<len(self._coeffs):
+            powers.append(powers[-1].copy().multiply(powers[-1], exact=exact))
             pass
-        return result
+        def compose(coeffs, level):
+            if len(coeffs)<=1:
+                return polynomial(coeffs=coeffs)
+            h = 1<<level
+            result = compose(coeffs[h:], level-1).multiply(powers[level], exact=exact)
+            return result.add(compose(coeffs[:h], level-1))
+        return compose(self._coeffs, len(powers)-1)
     #f find_root
-    def find_root( self, attempt ):
+    def find_root( self, attempt, max_iterations=40 ):
         """
-        Use newton-raphson...
+        Use newton-raphson, from attempt, stopping when the step is small or after max_iterations
+
+        Returns (root, previous estimate) or None if it did not converge to a root
         """
         epsilon = 0.000001
-        df = self.differentiate()
         x1 = attempt
-        for i in range(40):
+        for i in range(max_iterations):
             x0 = x1
-            dx = df.evaluate(x0)
+            (fx, dx) = self.evaluate_with_derivative(x0)
             #print x1, dx
             if dx==0:
                 return None
-            x1 = x0 - self.evaluate(x0)/dx
+            x1 = x0 - fx/dx
+            if abs(x1-x0)<=1E-15*abs(x1):
+                break
             pass
         if -epsilon<self.evaluate(x1)<epsilon:
             return (x1, x0)
         return None
+    #f find_all_roots
+    def find_all_roots( self, epsilon=1E-14, max_iterations=200 ):
+        """
+        Find all the roots of the polynomial as complex numbers, using aberth_ehrlich
+
+        Returns a list of complex, with repeated roots repeated; see aberth_ehrlich for epsilon and max_iterations
+        Raises an exception if the roots have not converged
+        """
+        (roots, iterations, converged) = aberth_ehrlich(self._coeffs, epsilon=epsilon, max_iterations=max_iterations)
+        if not converged:
+            raise Exception("Roots of degree %d polynomial did not converge in %d iterations"%(len(roots),iterations))
+        return [complex(real=r.real, imaginary=r.imag) for r in roots]
     #f divide
-    def divide( self, other ):
+    def divide( self, other, exact=False ):
+        """
+        Divide this polynomial by another, returning (quotient, remainder)
+
+        If the divisor and the quotient both have at least fast_threshold coefficients then
+        the quotient is found by multiplying by the reciprocal of the divisor as a power series
+        (found by Newton iteration), using FFT multiplication; if exact is True, the
+        polynomials are small, or either has complex coefficients, long division is used.
+        """
         sl = len(self._coeffs)
+        ol = len(other._coeffs)
+        if ((not exact) and (ol>=self.fast_threshold) and (sl-ol+1>=self.fast_threshold) and
+            _is_real(self._coeffs) and _is_real(other._coeffs)):
+            return self._divide_by_reciprocal(other)
         remainder = self._coeffs[:]
         result = []
-        ol = len(other._coeffs)
         for i in range(1+sl-ol):
             shift = sl-ol-i
             m = remainder[shift+ol-1]/other._coeffs[-1]
@@ -444,6 +541,261 @@ class polynomial(object):
             pass
         result.reverse()
         return (polynomial(coeffs=result),polynomial(coeffs=remainder))
+    #f _divide_by_reciprocal
+    def _divide_by_reciprocal( self, other ):
+        """
+        With a = self, b = other of degree m, and a of degree n, the reversed quotient
+        is rev(a)/rev(b) as a power series truncated to n-m+1 terms
+        """
+        sl = len(self._coeffs)
+        ol = len(other._coeffs)
+        k = sl-ol+1
+        rev_a = self._coeffs[::-1][:k]
+        rev_b = other._coeffs[::-1]
+        q = _multiply_coeffs(rev_a, _reciprocal_series(rev_b, k))[:k]
+        q.reverse()
+        quotient = polynomial(coeffs=q)
+        bq = _multiply_coeffs(other._coeffs, quotient._coeffs)
+        remainder = [self._coeffs[i]-bq[i] for i in range(ol-1)]
+        return (quotient, polynomial(coeffs=remainder))
+#f _is_integral
+def _is_integral( coeffs ):
+    """
+    Return True if all the coefficients are (real) integers
+    """
+    for c in coeffs:
+        if type(c)==complex: return False
+        if c!=int(c): return False
+        pass
+    return True
+
+#f _kronecker_multiply
+def _kronecker_multiply( a, b ):
+    """
+    Multiply two lists of integer coefficients exactly
+
+    Each list is packed into a single (long) integer with k bits per coefficient, i.e. the
+    polynomial is evaluated at 2^k; the two integers are multiplied, and the product unpacked
+    k bits at a time. With k large enough that every coefficient of the product fits in k-1
+    bits, the unpacked values are exactly the coefficients of the product. Packing and
+    unpacking are done through hex strings, offsetting every digit by 2^(k-1) so that it is
+    never negative.
+    """
+    a = [int(x) for x in a]
+    b = [int(x) for x in b]
+    n = len(a)+len(b)-1
+    bits = max([abs(x) for x in a]).bit_length() + max([abs(x) for x in b]).bit_length() + min(len(a),len(b)).bit_length() + 2
+    k = (bits+3)//4
+    half = 1<<(4*k-1)
+    def pack(cs):
+        offset = int(("8"+"0"*(k-1))*len(cs), 16)
+        digits = "".join(["%0*x"%(k, c+half) for c in reversed(cs)])
+        return int(digits, 16) - offset
+    product = pack(a)*pack(b) + int(("8"+"0"*(k-1))*n, 16)
+    digits = "%0*x"%(n*k, product)
+    return [float(int(digits[(n-1-i)*k:(n-i)*k], 16)-half) for i in range(n)]
+
+#f _fft_multiply
+def _fft_multiply( a, b ):
+    """
+    Multiply two lists of real coefficients by FFT convolution
+    """
+    import numpy
+    n = len(a)+len(b)-1
+    size = 1
+    while size<n: size *= 2
+    r = numpy.fft.irfft(numpy.fft.rfft(a, size) * numpy.fft.rfft(b, size), size)[:n]
+    return r.tolist()
+
+#f _multiply_coeffs
+def _multiply_coeffs( a, b, exact=False ):
+    """
+    Multiply two lists of coefficients (lowest power first), returning a list of coefficients
+
+    Uses Kronecker substitution if exact and the coefficients are integers; otherwise FFT
+    convolution if not exact, the lists are both at least polynomial.fast_threshold long,
+    and the coefficients are real; otherwise long multiplication
+    """
+    sl = len(a)
+    ol = len(b)
+    if (sl==0) or (ol==0):
+        return []
+    if exact:
+        if _is_integral(a) and _is_integral(b):
+            return _kronecker_multiply(a, b)
+        pass
+    elif (min(sl,ol)>=polynomial.fast_threshold) and _is_real(a) and _is_real(b):
+        return _fft_multiply(a, b)
+    r = [0]*(sl+ol-1)
+    for i in range(sl):
+        v = a[i]
+        n = i
+        for j in range(ol):
+            r[n] += v*b[j]
+            n+=1
+            pass
+        pass
+    return r
+
+#f _is_real
+def _is_real( coeffs ):
+    """
+    Return True if none of the coefficients are complex
+    """
+    for c in coeffs:
+        if type(c)==complex: return False
+        pass
+    return True
+
+#f _reciprocal_series
+def _reciprocal_series( b, n ):
+    """
+    Find the first n coefficients of the power series 1/b(x) by Newton iteration
+
+    If g is 1/b to k terms, then g.(2-b.g) is 1/b to 2k terms
+    """
+    g = [1.0/b[0]]
+    k = 1
+    while k<n:
+        k = min(2*k, n)
+        e = _multiply_coeffs(b[:k], g)[:k]
+        e = [-x for x in e]
+        e[0] += 2.0
+        g = _multiply_coeffs(g, e)[:k]
+        pass
+    return g
+
+#f _newton_polygon_estimates
+def _newton_polygon_estimates( c ):
+    """
+    Initial root estimates for aberth_ehrlich, using the Newton polygon of the coefficients (Bini)
+
+    c is the coefficients lowest power first, with c[0] and c[-1] non-zero. The upper convex hull
+    of the points (k, log|c[k]|) has edges from i to j; for each, j-i estimates are spread around a
+    circle of radius (|c[i]|/|c[j]|)^(1/(j-i)), which is where that many roots lie for polynomials
+    whose coefficients vary widely in size
+    """
+    import numpy
+    n = len(c)-1
+    log_c = numpy.full(n+1, -numpy.inf)
+    nonzero = (c!=0)
+    log_c[nonzero] = numpy.log(numpy.abs(c[nonzero]))
+    hull = []
+    for k in numpy.flatnonzero(nonzero):
+        while len(hull)>=2:
+            (i, j) = hull[-2:]
+            # Drop j if it is on or below the line from i to k
+            if (log_c[j]-log_c[i])*(k-i) <= (log_c[k]-log_c[i])*(j-i):
+                hull.pop()
+                pass
+            else:
+                break
+            pass
+        hull.append(k)
+        pass
+    z = numpy.zeros(n, dtype=numpy.complex128)
+    for h in range(len(hull)-1):
+        (i, j) = (hull[h], hull[h+1])
+        m = j-i
+        radius = numpy.exp((log_c[i]-log_c[j])/m)
+        z[i:j] = radius * numpy.exp(1j*(2*numpy.pi*numpy.arange(m)/m + 2*numpy.pi*i/n + 0.4))
+        pass
+    return z
+
+#f aberth_ehrlich
+def aberth_ehrlich( coeffs, epsilon=1E-14, max_iterations=200, fallback=True ):
+    """
+    Find all the complex roots of a polynomial simultaneously using the Aberth-Ehrlich method
+
+    Every root estimate z_k is refined each iteration by the Newton ratio f(z_k)/f'(z_k),
+    corrected by the repulsion of all the other estimates:
+
+    z_k -= r_k / (1 - r_k . Sum(j!=k, 1/(z_k-z_j))) where r_k = f(z_k)/f'(z_k)
+
+    An estimate stops being refined once its correction is within epsilon (relative to its
+    magnitude), or once f(z_k) is as small as rounding errors in evaluating f allow (so that
+    repeated roots, which converge slowly, still terminate); the iteration stops when every
+    estimate has converged, or after max_iterations.
+    Roots at zero are removed before iterating, and the initial estimates are spread around
+    circles given by the Newton polygon of the coefficients (see _newton_polygon_estimates).
+    Outside the unit circle f is evaluated through the reversed polynomial at 1/z, so that
+    it cannot overflow for high degrees.
+
+    If the iteration does not converge and fallback is True then the roots from numpy.roots
+    (the eigenvalues of the companion matrix) are refined with up to max_iterations more
+    iterations instead.
+
+    @coeffs:         Polynomial coefficients, lowest power first (int, float, complex or gjslib complex)
+    @epsilon:        Relative size of correction at which a root has converged
+    @max_iterations: Maximum number of iterations
+    @fallback:       If True, start again from numpy.roots if the iteration does not converge
+
+    Returns (roots, iterations, converged) where roots is a numpy complex array
+    """
+    import numpy
+    c = [x.real()+1j*x.imaginary() if type(x)==complex else x for x in coeffs]
+    c = numpy.array(c, dtype=numpy.complex128)
+    while len(c)>0 and c[-1]==0: c = c[:-1]
+    zeros = 0
+    while zeros<len(c)-1 and c[zeros]==0: zeros += 1
+    c = c[zeros:]
+    n = len(c)-1
+    if n<1:
+        return (numpy.zeros(zeros, dtype=numpy.complex128), 0, True)
+
+    # p holds the coefficients highest power first, and dp its derivative; as the coefficients
+    # of the reversed polynomial are c (highest power first), dc is the reversed derivative
+    p  = c[::-1]
+    dp = p[:-1] * numpy.arange(n,0,-1)
+    dc = c[:-1] * numpy.arange(n,0,-1)
+    (abs_p, abs_c) = (numpy.abs(p), numpy.abs(c))
+    rounding = 4*numpy.finfo(numpy.float64).eps
+    def newton_ratios(za):
+        """
+        Return (f/f', True where f is within rounding error of zero) for the estimates za
+
+        With y=1/z, f(z) = z^n.rev(y) and f'(z) = z^(n-1).(n.rev(y) - y.rev'(y)), so f/f' = z/(n - y.rev'(y)/rev(y))
+        """
+        ratio = numpy.zeros(len(za), dtype=numpy.complex128)
+        small = numpy.zeros(len(za), dtype=bool)
+        inside = numpy.abs(za)<=1
+        zi = za[inside]
+        f = numpy.polyval(p, zi)
+        ratio[inside] = f / numpy.polyval(dp, zi)
+        small[inside] = numpy.abs(f) <= rounding*numpy.polyval(abs_p, numpy.abs(zi))
+        outside = ~inside
+        y = 1/za[outside]
+        r = numpy.polyval(c, y)
+        ratio[outside] = za[outside] / (n - y*numpy.polyval(dc, y)/r)
+        small[outside] = numpy.abs(r) <= rounding*numpy.polyval(abs_c, numpy.abs(y))
+        return (ratio, small)
+    def iterate(z):
+        active = numpy.ones(n, dtype=bool)
+        iterations = 0
+        while iterations<max_iterations and numpy.any(active):
+            iterations += 1
+            za = z[active]
+            with numpy.errstate(divide='ignore', invalid='ignore', over='ignore'):
+                (ratio, small) = newton_ratios(za)
+                d = za[:,numpy.newaxis] - z[numpy.newaxis,:]
+                d[d==0] = numpy.inf
+                w = ratio / (1 - ratio*numpy.sum(1/d, axis=1))
+                pass
+            # Where f' is zero away from a root, nudge the estimate instead
+            stuck = ~numpy.isfinite(w)
+            w[stuck] = (numpy.abs(za[stuck])+1)*1E-3
+            z[active] = za - w
+            converged = ((numpy.abs(w) <= epsilon*numpy.abs(za)) | small) & ~stuck
+            active[numpy.flatnonzero(active)[converged]] = False
+            pass
+        return (z, iterations, not numpy.any(active))
+    (z, iterations, converged) = iterate(_newton_polygon_estimates(c))
+    if fallback and not converged:
+        (z, more_iterations, converged) = iterate(numpy.roots(p).astype(numpy.complex128))
+        iterations += more_iterations
+        pass
+    roots = numpy.concatenate((numpy.zeros(zeros, dtype=numpy.complex128), z))
+    return (roots, iterations, converged)
 
 #f find_eqn            
 def find_eqn( x ):
@@ -618,4 +970,43 @@ def main():
     print "\nLooking for ",-2378/985.0
     find_eqn( -2378/985.0 )
 
+    import time
+    import numpy
+    p = polynomial([float((7*i)%11)-5 for i in range(20)])
+    xs = numpy.linspace(-1,1,10000)
+    t = time.time()
+    for x in xs:
+        p.evaluate(x)
+        p.derivative().evaluate(x)
+        pass
+    t_eval = time.time()-t
+    t = time.time()
+    for x in xs:
+        p.evaluate_with_derivative(x)
+        pass
+    t_with_derivative = time.time()-t
+    t = time.time()
+    p.evaluate_many(xs,derivative=True)
+    print "%d evaluations of value and derivative: evaluate %8.4fs evaluate_with_derivative %8.4fs evaluate_many %8.4fs"%(len(xs), t_eval, t_with_derivative, time.time()-t)
+
+    for n in [10, 50, 200, 500]:
+        p = polynomial(numpy.random.random(n+1)-0.5)
+        t = time.time()
+        (roots, iterations, converged) = aberth_ehrlich(p.coeffs())
+        print "All roots of degree %d polynomial: %8.4fs, %d iterations, converged %s"%(n, time.time()-t, iterations, str(converged))
+        pass
+
+    for n in [100, 1000, 4000]:
+        a = polynomial(numpy.random.random(n)-0.5)
+        b = polynomial(list(numpy.random.random(n/2)*0.1)+[1.0])
+        times = []
+        for exact in [True, False]:
+            t = time.time()
+            ab = a.copy().multiply(b, exact=exact)
+            ab.divide(b, exact=exact)
+            times.append(time.time()-t)
+            pass
+        print "Multiply and divide degree %d by %d: long %8.4fs fast %8.4fs"%(n-1, n/2, times[0], times[1])
+        pass
+
 if __name__=="__main__": main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+#a Documentation
+"""
+Batched versions of the quadratic and cubic solvers in polynomial.py
+
+Each function here takes an array of coefficients - an (N,3) array of
+(a,b,c) for quadratics a.x^2+b.x+c, or an (N,4) array of (a,b,c,d) for
+cubics a.x^3+b.x^2+c.x+d - and solves all N equations in one call.
+
+The real solvers return a pair (roots, valid); roots is an (N,2) or
+(N,3) array of the real parts of the roots, and valid is a boolean
+array of the same shape marking those roots that are real. As with
+polynomial.cubic.find_real_roots, a root is taken to be real if its
+imaginary part is within epsilon of zero; as with
+polynomial.quadratic.find_real_roots, a quadratic has real roots if its
+discriminant is not negative. Equations whose leading coefficient is
+zero have no valid roots.
+"""
+
+#a Imports
+import numpy
+
+#a Useful functions
+#f _coefficients
+def _coefficients(coeffs, n):
+    """
+    Internal function that converts coefficients to an (N,n) float64 array, returning its columns
+    """
+    coeffs = numpy.asarray(coeffs, dtype=numpy.float64).reshape((-1,n))
+    return coeffs.T
+
+#a Quadratics
+#f quadratic_roots
+def quadratic_roots(coeffs):
+    """
+    Find both roots of each quadratic, as polynomial.quadratic.find_all_roots
+    Returns an (N,2) complex array
+
+    @coeffs:  (N,3) array of (a,b,c)
+    """
+    (a,b,c) = _coefficients(coeffs, 3)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        d = b*b/(a*a*4) - c/a
+        r = numpy.sqrt(d.astype(numpy.complex128))
+        m = -b/(a*2)
+        pass
+    return numpy.stack((m+r, m-r), axis=-1)
+
+#f solve_quadratic
+def solve_quadratic(coeffs, epsilon=1E-6):
+    """
+    Find the real roots of each quadratic, as polynomial.quadratic.find_real_roots
+    Returns (roots, valid), both (N,2) arrays
+
+    @coeffs:  (N,3) array of (a,b,c)
+    @epsilon: Unused, as with polynomial.quadratic.find_real_roots; a quadratic has real roots if its discriminant is not negative
+    """
+    (a,b,c) = _coefficients(coeffs, 3)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        d = b*b/(a*a*4) - c/a
+        r = numpy.sqrt(numpy.where(d<0, 0.0, d))
+        m = -b/(a*2)
+        roots = numpy.stack((m+r, m-r), axis=-1)
+        valid = (d>=0)[:,numpy.newaxis] & numpy.isfinite(roots)
+        pass
+    return (roots, valid)
+
+#a Cubics
+#f cubic_roots
+def cubic_roots(coeffs):
+    """
+    Find all three roots of each cubic, as polynomial.cubic.find_all_roots
+    Returns an (N,3) complex array
+
+    The cubic is depressed to y^3 + p.y + q = 0 with x = y - b/3a, and solved with Cardano's method;
+    the square root in the method takes whichever sign gives the larger u^3, so that the method
+    does not lose precision (or divide by zero) when p is small
+
+    @coeffs:  (N,4) array of (a,b,c,d)
+    """
+    (a,b,c,d) = _coefficients(coeffs, 4)
+    cube_roots_1 = numpy.exp(2j*numpy.pi/3*numpy.arange(3))
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        ba3 = b/(a*3)
+        ca  = c/a
+        p = (ca - ba3*ba3*3).astype(numpy.complex128)
+        q = (ba3*ba3*ba3*2 - ba3*ca + d/a).astype(numpy.complex128)
+        s = numpy.sqrt(q*q/4 + p*p*p/27)
+        s = numpy.where(numpy.abs(s-q/2)>numpy.abs(s+q/2), s, -s)
+        u3 = s - q/2
+        u = numpy.power(u3, 1/3.0)[:,numpy.newaxis] * cube_roots_1
+        v = numpy.where(u==0, 0.0, -p[:,numpy.newaxis]/(u*3))
+        pass
+    return u + v - ba3[:,numpy.newaxis]
+
+#f solve_cubic
+def solve_cubic(coeffs, epsilon=1E-6):
+    """
+    Find the real roots of each cubic, as polynomial.cubic.find_real_roots
+    Returns (roots, valid), both (N,3) arrays
+
+    @coeffs:  (N,4) array of (a,b,c,d)
+    @epsilon: A root is real if the magnitude of its imaginary part is less than epsilon
+    """
+    r = cubic_roots(coeffs)
+    with numpy.errstate(invalid='ignore'):
+        valid = (numpy.abs(r.imag)<epsilon) & numpy.isfinite(r.real)
+        pass
+    return (r.real, valid)
+
+#a Matrices
+#f solve_eigenvalues
+def solve_eigenvalues(matrices, epsilon=1E-6):
+    """
+    Find the real eigenvalues of each 2x2 or 3x3 matrix, as matrix.eigenvalues
+    Returns (eigenvalues, valid), as solve_quadratic or solve_cubic
+
+    @matrices: (N,2,2) or (N,3,3) array of matrices (or (N,4) or (N,9) array of row-major matrix data)
+    @epsilon:  As solve_cubic
+    """
+    m = numpy.asarray(matrices, dtype=numpy.float64)
+    m = m.reshape((len(m),-1))
+    if m.shape[1]==4:
+        (a,b,c,d) = m.T
+        return solve_quadratic(numpy.stack((numpy.ones(len(m)), -(a+d), a*d-b*c), axis=-1), epsilon=epsilon)
+    if m.shape[1]!=9:
+        raise Exception("Eigenvalues can only be solved for matrices of order 2 or 3")
+    (a,b,c, d,e,f, g,h,i) = m.T
+    return solve_cubic(numpy.stack((-numpy.ones(len(m)), a+e+i, b*d-a*e + f*h-e*i + c*g-a*i,
+                                    a*e*i + b*f*g + c*d*h - a*f*h - b*d*i - c*e*g), axis=-1), epsilon=epsilon)
+
+#a Main
+def main():
+    import time
+    from polynomial import cubic
+    n = 10000
+    coeffs = numpy.random.random((n,4))*2-1
+    t = time.time()
+    for (a,b,c,d) in coeffs:
+        cubic(a,b,c,d).find_real_roots()
+        pass
+    t_cubic = time.time()-t
+    t = time.time()
+    solve_cubic(coeffs)
+    print "%d cubics: cubic.find_real_roots %8.4fs solve_cubic %8.4fs"%(n, t_cubic, time.time()-t)
+    pass
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,12 @@ class quaternion( object ):
     # pitch + = nose up inside looking forward
     # yaw + = nose left inside looking forward
     # when given roll, pitch, yaw the order applies is roll(pitch(yaw())) - i.e. yaw is applied first
+    #
+    # The components are held in slots (_r, _i, _j, _k) rather than a dictionary; all changes
+    # to them go through _set, which discards the cached matrices.
+    # 'matrix' is the cached normalized rotation matrix (as lists), and '_rotation' the cached
+    # (unnormalized) 3x3 matrix used by rotate_vector, as a 9-tuple in row-major order
+    __slots__ = ("_r", "_i", "_j", "_k", "matrix", "_rotation", "repr_fmt")
     fmt = "%7.4f"
     default_fmt = "euler"
     default_fmt = "quat"
@@ -49,24 +55,53 @@ class quaternion( object ):
         return cls().from_rotation( angle=angle, axis=axis, degrees=degrees )
     #f __init__
     def __init__( self, quat=None, euler=None, degrees=False, r=1, i=0, j=0, k=0, repr_fmt=None ):
-        self.quat = {"r":float(r), "i":float(i), "j":float(j), "k":float(k)}
-        self.matrix = None
+        """
+        quat may be a dictionary with 'r', 'i', 'j' and 'k' entries, or an (r,i,j,k) tuple
+        """
+        self._set(float(r), float(i), float(j), float(k))
         if repr_fmt is None:
             repr_fmt = self.default_fmt
         self.repr_fmt = repr_fmt
         if quat is not None:
-            self.quat["r"] = quat["r"]
-            self.quat["i"] = quat["i"]
-            self.quat["j"] = quat["j"]
-            self.quat["k"] = quat["k"]
+            self.quat = quat
             pass
         if euler is not None:
             self.from_euler(roll=euler[0], pitch=euler[1], yaw=euler[2], degrees=degrees)
             pass
         pass
+    #f _set
+    def _set( self, r, i, j, k ):
+        self._r = r
+        self._i = i
+        self._j = j
+        self._k = k
+        self.matrix = None
+        self._rotation = None
+        return self
+    #f quat property
+    def _get_quat( self ):
+        return {"r":self._r, "i":self._i, "j":self._j, "k":self._k}
+    def _set_quat( self, quat ):
+        if type(quat)==dict:
+            self._set(quat["r"], quat["i"], quat["j"], quat["k"])
+            pass
+        else:
+            self._set(*quat)
+            pass
+        pass
+    quat = property(_get_quat, _set_quat, doc="Components as a dictionary (a copy - assign the whole dictionary to change them)")
+    #f classmethod _of_components - create without the argument handling of __init__
+    @classmethod
+    def _of_components( cls, r, i, j, k ):
+        q = cls.__new__(cls)
+        q._set(r, i, j, k)
+        q.repr_fmt = cls.default_fmt
+        return q
     #f copy
     def copy(self):
-        return quaternion(quat=self.quat)
+        q = quaternion._of_components(self._r, self._i, self._j, self._k)
+        q._rotation = self._rotation
+        return q
     #f __repr__
     def __repr__( self ):
         if self.repr_fmt=="euler":
@@ -75,10 +110,10 @@ class quaternion( object ):
         elif self.repr_fmt=="euler_mod":
             result = ("quaternion(euler=("+self.fmt+","+self.fmt+","+self.fmt+"),length="+self.fmt+",degrees=True)") % self.to_euler(degrees=True,include_modulus=True)
             return result
-        result = ("quaternion({'r':"+self.fmt+", 'i':"+self.fmt+", 'j':"+self.fmt+", 'k':"+self.fmt+"})") % (self.quat["r"],
-                                                                                       self.quat["i"],
-                                                                                       self.quat["j"],
-                                                                                       self.quat["k"] )
+        result = ("quaternion({'r':"+self.fmt+", 'i':"+self.fmt+", 'j':"+self.fmt+", 'k':"+self.fmt+"})") % (self._r,
+                                                                                       self._i,
+                                                                                       self._j,
+                                                                                       self._k )
         return result
     #f __add__ - infix add of quaternion with int/float/quaternion
     def __add__(self,a):
@@ -117,25 +152,21 @@ class quaternion( object ):
         return self.modulus()
     #f __nonzero__ - return True if nonzero
     def __nonzero__(self):
-        if self.quat["r"]!=0: return True
-        if self.quat["i"]!=0: return True
-        if self.quat["j"]!=0: return True
-        if self.quat["k"]!=0: return True
+        if self._r!=0: return True
+        if self._i!=0: return True
+        if self._j!=0: return True
+        if self._k!=0: return True
         return False
     #f get
     def get( self ):
-        return (self.quat["r"],
-                self.quat["i"],
-                self.quat["j"],
-                self.quat["k"],
-                )
+        return (self._r, self._i, self._j, self._k)
     #f get_matrix_as_lists - was get_matrix_values
     def get_matrix_as_lists( self ):
         if self.matrix is None: self.__create_matrix()
         return self.matrix
     #f get_matrix
     def get_matrix( self, order=3 ):
-        self.__create_matrix()
+        if self.matrix is None: self.__create_matrix()
         m = self.matrix
         if order==3:
             return matrix(data=(m[0][0], m[0][1], m[0][2],
@@ -147,39 +178,38 @@ class quaternion( object ):
                                      m[2][0], m[2][1], m[2][2], 0.0,
                                      0.0,0.0,0.0,1.0))
         raise Exception("Get matrix of unsupported order")
+    #f __create_rotation
+    def __create_rotation( self ):
+        """
+        Create the 3x3 matrix R such that R.v = conj(q).v.q, i.e. the transpose of the
+        rotation matrix of q scaled by |q|^2 - this needs no division, so it works for any q
+        """
+        (r,i,j,k) = (self._r, self._i, self._j, self._k)
+        rr = r*r
+        ii = i*i
+        jj = j*j
+        kk = k*k
+        ij = 2*i*j
+        ik = 2*i*k
+        jk = 2*j*k
+        ri = 2*r*i
+        rj = 2*r*j
+        rk = 2*r*k
+        self._rotation = (rr+ii-jj-kk, ij+rk,       ik-rj,
+                          ij-rk,       rr-ii+jj-kk, jk+ri,
+                          ik+rj,       jk-ri,       rr-ii-jj+kk)
+        pass
     #f __create_matrix
     def __create_matrix( self ):
         # From http://www.gamasutra.com/view/feature/131686/rotating_objects_using_quaternions.php?page=2
-        # calculate coefficients
+        # This is the rotation matrix scaled by the modulus (rather than its square)
+        if self._rotation is None: self.__create_rotation()
         l = self.modulus()
-
-        x2 = self.quat["i"] + self.quat["i"]
-        y2 = self.quat["j"] + self.quat["j"] 
-        z2 = self.quat["k"] + self.quat["k"]
-        xx = self.quat["i"] * x2
-        xy = self.quat["i"] * y2
-        xz = self.quat["i"] * z2
-        yy = self.quat["j"] * y2
-        yz = self.quat["j"] * z2
-        zz = self.quat["k"] * z2
-        wx = self.quat["r"] * x2
-        wy = self.quat["r"] * y2
-        wz = self.quat["r"] * z2
-        m = [[0,0,0,0.],[0,0,0,0.],[0,0,0,0.],[0.,0.,0.,1.]]
-
-        m[0][0] = l - (yy + zz)/l
-        m[1][0] = (xy - wz)/l
-        m[2][0] = (xz + wy)/l
-
-        m[0][1] = (xy + wz)/l
-        m[1][1] = l - (xx + zz)/l
-        m[2][1] = (yz - wx)/l
-
-        m[0][2] = (xz - wy)/l
-        m[1][2] = (yz + wx)/l
-        m[2][2] = l - (xx + yy)/l
-
-        self.matrix = m
+        R = self._rotation
+        self.matrix = [[R[0]/l, R[1]/l, R[2]/l, 0.],
+                       [R[3]/l, R[4]/l, R[5]/l, 0.],
+                       [R[6]/l, R[7]/l, R[8]/l, 0.],
+                       [0., 0., 0., 1.]]
         pass
     #f from_sequence
     def from_sequence( self, rotations, degrees=False ):
@@ -224,12 +254,11 @@ class quaternion( object ):
 
         crcy = cr * cy
         srsy = sr * sy
-        self.quat["r"] = cp * crcy + sp * srsy
-        self.quat["i"] = sp * crcy - cp * srsy
-        self.quat["j"] = cp * cr * sy + sp * sr * cy
-        self.quat["k"] = cp * sr * cy - sp * cr * sy
+        self._set( cp * crcy + sp * srsy,
+                   sp * crcy - cp * srsy,
+                   cp * cr * sy + sp * sr * cy,
+                   cp * sr * cy - sp * cr * sy )
         self.scale(modulus)
-        self.matrix = None
         return self
     #f to_euler
     def to_euler( self, include_modulus=False, degrees=False ):
@@ -237,10 +266,7 @@ class quaternion( object ):
         Euler angles are roll, pitch and yaw.
         The rotations are performed in the order 
         """
-        r = self.quat["r"]
-        i = self.quat["i"]
-        j = self.quat["j"]
-        k = self.quat["k"]
+        (r, i, j, k) = (self._r, self._i, self._j, self._k)
         l = math.sqrt(r*r+i*i+j*j+k*k)
         if (l>1E-9):
             r=r/l
@@ -290,12 +316,11 @@ class quaternion( object ):
         else:
             pitch = -math.asin(m[2,0])
         q1 = quaternion.of_euler(roll=roll, pitch=pitch, yaw=yaw, degrees=False)
-        self.quat["r"] = (q0.quat["r"] + q1.quat["r"])/2.0
-        self.quat["i"] = (q0.quat["i"] - q1.quat["i"])/2.0
-        self.quat["j"] = (q0.quat["j"] - q1.quat["j"])/2.0
-        self.quat["k"] = (q0.quat["k"] - q1.quat["k"])/2.0
+        self._set( (q0._r + q1._r)/2.0,
+                   (q0._i - q1._i)/2.0,
+                   (q0._j - q1._j)/2.0,
+                   (q0._k - q1._k)/2.0 )
         self.normalize()
-        self.matrix = None
         return self
     #f from_rotation
     def from_rotation(self, angle, axis, degrees=False):
@@ -306,33 +331,24 @@ class quaternion( object ):
             pass
         s = math.sin(angle/2)
         c = math.cos(angle/2)
-        self.quat["r"] = c
-        self.quat["i"] = s*axis[0]
-        self.quat["j"] = s*axis[1]
-        self.quat["k"] = s*axis[2]
-        self.matrix = None
-        return self
+        return self._set(c, s*axis[0], s*axis[1], s*axis[2])
     #f to_rotation
     def to_rotation(self, degrees=False):
         """
         """
         m = self.modulus()
-        angle = 2*math.acos(self.quat["r"]/m)
+        angle = 2*math.acos(self._r/m)
         sm = m*math.sin(angle/2)
-        axis = (self.quat["i"]/sm,
-                self.quat["j"]/sm,
-                self.quat["k"]/sm)
+        axis = (self._i/sm,
+                self._j/sm,
+                self._k/sm)
         if degrees:
             angle  = math.degrees(angle)
             pass
         return (angle, axis)
     #f conjugate
     def conjugate( self ):
-        self.quat["i"] = -self.quat["i"]
-        self.quat["j"] = -self.quat["j"]
-        self.quat["k"] = -self.quat["k"]
-        self.matrix = None
-        return self
+        return self._set(self._r, -self._i, -self._j, -self._k)
     #f reciprocal
     def reciprocal( self ):
         self.conjugate()
@@ -344,30 +360,23 @@ class quaternion( object ):
         return self
     #f modulus_squared
     def modulus_squared( self ):
-        r = self.quat["r"]
-        i = self.quat["i"]
-        j = self.quat["j"]
-        k = self.quat["k"]
+        (r, i, j, k) = (self._r, self._i, self._j, self._k)
         return (r*r+i*i+j*j+k*k)
     #f modulus
     def modulus( self ):
         return math.sqrt(self.modulus_squared())
     #f add
     def add( self, other, scale=1.0 ):
-        self.quat["r"] += other.quat["r"] *scale
-        self.quat["i"] += other.quat["i"] *scale
-        self.quat["j"] += other.quat["j"] *scale
-        self.quat["k"] += other.quat["k"] *scale
-        self.matrix = None
-        return self
+        return self._set( self._r + other._r *scale,
+                          self._i + other._i *scale,
+                          self._j + other._j *scale,
+                          self._k + other._k *scale )
     #f scale
     def scale( self, scale ):
-        self.quat["r"] *= scale
-        self.quat["i"] *= scale
-        self.quat["j"] *= scale
-        self.quat["k"] *= scale
-        self.matrix = None
-        return self
+        return self._set( self._r * scale,
+                          self._i * scale,
+                          self._j * scale,
+                          self._k * scale )
     #f normalize
     def normalize( self, epsilon=1E-9 ):
         l = self.modulus()
@@ -376,38 +385,40 @@ class quaternion( object ):
         return self.scale(1.0/l)
     #f multiply
     def multiply(self, other, premultiply=False):
-        (r1,i1,j1,k1) = self.quat["r"],self.quat["i"],self.quat["j"],self.quat["k"]
-        (r2,i2,j2,k2) = other.quat["r"],other.quat["i"],other.quat["j"],other.quat["k"]
+        (r1,i1,j1,k1) = self._r,self._i,self._j,self._k
+        (r2,i2,j2,k2) = other._r,other._i,other._j,other._k
         if premultiply:
             ((r1,i1,j1,k1), (r2,i2,j2,k2)) = ((r2,i2,j2,k2), (r1,i1,j1,k1))
             pass
-        r = r1*r2 - i1*i2 - j1*j2 - k1*k2
-        i = r1*i2 + i1*r2 + j1*k2 - k1*j2
-        j = r1*j2 + j1*r2 + k1*i2 - i1*k2
-        k = r1*k2 + k1*r2 + i1*j2 - j1*i2
-        self.quat={"r":r, "i":i, "j":j, "k":k }
-        return self
+        return self._set( r1*r2 - i1*i2 - j1*j2 - k1*k2,
+                          r1*i2 + i1*r2 + j1*k2 - k1*j2,
+                          r1*j2 + j1*r2 + k1*i2 - i1*k2,
+                          r1*k2 + k1*r2 + i1*j2 - j1*i2 )
     #f rotation_multiply_what_is_this
     def rotation_multiply_what_is_this( self, other ):
-        A = (self.quat["r"] + self.quat["i"])*(other.quat["r"] + other.quat["i"])
-        B = (self.quat["k"] - self.quat["j"])*(other.quat["j"] - other.quat["k"])
-        C = (self.quat["r"] - self.quat["i"])*(other.quat["j"] + other.quat["k"]) 
-        D = (self.quat["j"] + self.quat["k"])*(other.quat["r"] - other.quat["i"])
-        E = (self.quat["i"] + self.quat["k"])*(other.quat["i"] + other.quat["j"])
-        F = (self.quat["i"] - self.quat["k"])*(other.quat["i"] - other.quat["j"])
-        G = (self.quat["r"] + self.quat["j"])*(other.quat["r"] - other.quat["k"])
-        H = (self.quat["r"] - self.quat["j"])*(other.quat["r"] + other.quat["k"])
+        A = (self._r + self._i)*(other._r + other._i)
+        B = (self._k - self._j)*(other._j - other._k)
+        C = (self._r - self._i)*(other._j + other._k) 
+        D = (self._j + self._k)*(other._r - other._i)
+        E = (self._i + self._k)*(other._i + other._j)
+        F = (self._i - self._k)*(other._i - other._j)
+        G = (self._r + self._j)*(other._r - other._k)
+        H = (self._r - self._j)*(other._r + other._k)
         r = B + (-E - F + G + H) /2
         i = A - (E + F + G + H)/2 
         j = C + (E - F + G - H)/2 
         k = D + (E - F - G + H)/2
-        return quaternion( quat={"r":r, "i":i, "j":j, "k":k } )
+        return quaternion._of_components(r,i,j,k)
     #f interpolate
-    def interpolate( self, other, t ):
-        cosom = ( self.quat["i"] * other.quat["i"] +
-                  self.quat["j"] * other.quat["j"] +
-                  self.quat["k"] * other.quat["k"] +
-                  self.quat["r"] * other.quat["r"] )
+    def interpolate( self, other, t, epsilon=1E-6 ):
+        """
+        Spherical linear interpolation from self (t=0) to other (t=1), taking the shorter path
+        If the quaternions are within epsilon of parallel then linear interpolation is used
+        """
+        cosom = ( self._i * other._i +
+                  self._j * other._j +
+                  self._k * other._k +
+                  self._r * other._r )
         abs_cosom = cosom
         sgn_cosom = 1
         if (cosom <0.0): 
@@ -431,19 +442,22 @@ class quaternion( object ):
             pass
 
         # calculate final values
-        i = scale0 * self.quat["i"] + scale1 * sgn_cosom * other.quat["i"]
-        j = scale0 * self.quat["j"] + scale1 * sgn_cosom * other.quat["j"]
-        k = scale0 * self.quat["k"] + scale1 * sgn_cosom * other.quat["k"]
-        r = scale0 * self.quat["r"] + scale1 * sgn_cosom * other.quat["r"]
-        return quaternion( quat={"r":r, "i":i, "j":j, "k":k } )
+        scale1 = scale1 * sgn_cosom
+        return quaternion._of_components( scale0 * self._r + scale1 * other._r,
+                                          scale0 * self._i + scale1 * other._i,
+                                          scale0 * self._j + scale1 * other._j,
+                                          scale0 * self._k + scale1 * other._k )
     #f rotate_vector
     def rotate_vector(self, xyz):
-        qc = self.copy().conjugate()
-        qxyz = quaternion(r=0,i=xyz[0],j=xyz[1],k=xyz[2])
-        qxyz_r = qc * qxyz * self
-        return ( qxyz_r.quat["i"],
-                 qxyz_r.quat["j"],
-                 qxyz_r.quat["k"] )
+        """
+        Return conj(q).xyz.q, using the cached rotation matrix
+        """
+        if self._rotation is None: self.__create_rotation()
+        R = self._rotation
+        (x,y,z) = (xyz[0], xyz[1], xyz[2])
+        return ( R[0]*x + R[1]*y + R[2]*z,
+                 R[3]*x + R[4]*y + R[5]*z,
+                 R[6]*x + R[7]*y + R[8]*z )
 
 #a Test-y stuff for quick testing (for full testing, see tests/...)
 def veclen(xyz):
@@ -467,8 +481,9 @@ def lookat_complex(xyz, up):
 
     q = quaternion(r=0,i=xyz[0],j=xyz[1],k=xyz[2])
     q.normalize()
-    pitch = math.asin(q.quat["i"])
-    yaw   = math.atan2(q.quat["j"],q.quat["k"])
+    (_, qi, qj, qk) = q.get()
+    pitch = math.asin(qi)
+    yaw   = math.atan2(qj,qk)
 
     r = quaternion.yaw(-yaw) *quaternion.pitch(pitch)
 
@@ -543,6 +558,23 @@ def main():
     print "Expect [1,2,3]/|1,2,3| = 0.267,0.534,0.802",qc.rotate_vector([0,0,1])
     print "Expect [x,0,z]", q.rotate_vector([1+4,2+5,3+4])
     print "Expect [x2,0,z2]", q.rotate_vector([4,5,4])
+    print
+    benchmark()
+    pass
+
+def benchmark(number=20000):
+    import timeit
+    q0 = quaternion.of_euler(roll=10, pitch=20, yaw=30, degrees=True)
+    q1 = quaternion.of_euler(roll=-40, pitch=5, yaw=60, degrees=True)
+    v = (1.0, 2.0, 3.0)
+    def mult():   q0.copy().multiply(q1)
+    def rot():    q0.rotate_vector(v)
+    def interp(): q0.interpolate(q1, 0.3)
+    def getm():   q0.get_matrix()
+    print "Time per call in microseconds"
+    for (name, f) in [("multiply", mult), ("rotate_vector", rot), ("interpolate", interp), ("get_matrix", getm)]:
+        print "%-14s %8.2f"%(name, timeit.timeit(f, number=number)/number*1E6)
+        pass
     pass
 
 if __name__=="__main__": main()
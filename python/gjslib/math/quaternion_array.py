@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+#a Documentation
+"""
+An array of N quaternions, held as an (N,4) numpy array of (r,i,j,k)
+
+The methods mirror those of quaternion.quaternion, operating on every
+quaternion in the array at once; where a method of quaternion takes
+another quaternion, the quaternion_array method takes either another
+quaternion_array of the same length or a single quaternion (which is
+then used for every element).
+"""
+
+#a Imports
+import math
+import numpy
+from quaternion import quaternion
+
+#a quaternion_array
+class quaternion_array( object ):
+    #f classmethod identity
+    @classmethod
+    def identity( cls, n ):
+        return cls(n=n)
+    #f classmethod of_quaternions
+    @classmethod
+    def of_quaternions( cls, quaternions ):
+        return cls(data=[q.get() for q in quaternions])
+    #f classmethod of_euler
+    @classmethod
+    def of_euler( cls, roll=0, pitch=0, yaw=0, rpy=None, degrees=False ):
+        """
+        Create from arrays (or scalars, which are broadcast) of roll, pitch and yaw,
+        or an (N,3) array rpy, as quaternion.of_euler
+        """
+        if rpy is not None:
+            rpy = numpy.asarray(rpy, dtype=numpy.float64)
+            (roll, pitch, yaw) = (rpy[:,0], rpy[:,1], rpy[:,2])
+            pass
+        (roll, pitch, yaw) = numpy.broadcast_arrays(numpy.asarray(roll, dtype=numpy.float64),
+                                                    numpy.asarray(pitch, dtype=numpy.float64),
+                                                    numpy.asarray(yaw, dtype=numpy.float64))
+        if degrees:
+            roll  = 3.14159265/180.0 * roll
+            pitch = 3.14159265/180.0 * pitch
+            yaw   = 3.14159265/180.0 * yaw
+            pass
+
+        (pitch,yaw)=(yaw,pitch)
+        cr = numpy.cos(roll/2)
+        cp = numpy.cos(pitch/2)
+        cy = numpy.cos(yaw/2)
+        sr = numpy.sin(roll/2)
+        sp = numpy.sin(pitch/2)
+        sy = numpy.sin(yaw/2)
+
+        crcy = cr * cy
+        srsy = sr * sy
+        return cls(data=numpy.stack((cp * crcy + sp * srsy,
+                                     sp * crcy - cp * srsy,
+                                     cp * cr * sy + sp * sr * cy,
+                                     cp * sr * cy - sp * cr * sy), axis=-1).reshape((-1,4)))
+    #f classmethod of_matrices
+    @classmethod
+    def of_matrices( cls, matrices, epsilon=1E-6 ):
+        """
+        Create from an (N,3,3) array of matrices, as quaternion.from_matrix
+        """
+        m = numpy.array(matrices, dtype=numpy.float64).reshape((-1,3,3))
+        d = numpy.abs(numpy.linalg.det(m))
+        if numpy.any(d<epsilon):
+            raise Exception("Singular matrix supplied")
+        m /= numpy.power(d,1/3.0)[:,numpy.newaxis,numpy.newaxis]
+
+        def pitch_of(x):
+            return numpy.where((x<-1) | (x>1), -math.asin(1), -numpy.arcsin(numpy.clip(x,-1,1)))
+        q0 = cls.of_euler(roll  = numpy.arctan2(m[:,0,1],m[:,0,0]),
+                          pitch = pitch_of(m[:,0,2]),
+                          yaw   = numpy.arctan2(m[:,1,2],m[:,2,2]))
+        q1 = cls.of_euler(roll  = numpy.arctan2(m[:,1,0],m[:,0,0]),
+                          pitch = pitch_of(m[:,2,0]),
+                          yaw   = numpy.arctan2(m[:,2,1],m[:,2,2]))
+        q0.quats[:,0]  += q1.quats[:,0]
+        q0.quats[:,1:] -= q1.quats[:,1:]
+        q0.quats /= 2.0
+        return q0.normalize()
+    #f __init__
+    def __init__( self, data=None, n=None ):
+        """
+        data is an (N,4) array-like of (r,i,j,k); if it is not given then the array is N identity quaternions
+        """
+        if data is None:
+            self.quats = numpy.zeros((n,4))
+            self.quats[:,0] = 1.0
+            pass
+        else:
+            self.quats = numpy.array(data, dtype=numpy.float64).reshape((-1,4))
+            pass
+        pass
+    #f _components
+    def _components( self, other ):
+        """
+        Return the (N,4) or (4,) array of another quaternion_array or quaternion
+        """
+        if isinstance(other, quaternion_array):
+            return other.quats
+        return numpy.array(other.get())
+    #f copy
+    def copy( self ):
+        return quaternion_array(data=self.quats)
+    #f __len__
+    def __len__( self ):
+        return len(self.quats)
+    #f __getitem__
+    def __getitem__( self, n ):
+        return quaternion(quat=tuple(self.quats[n]))
+    #f __repr__
+    def __repr__( self ):
+        return "quaternion_array(%s)"%(repr(self.quats.tolist()))
+    #f get
+    def get( self ):
+        return self.quats
+    #f to_quaternions
+    def to_quaternions( self ):
+        return [quaternion(quat=tuple(q)) for q in self.quats]
+    #f _rotations
+    def _rotations( self ):
+        """
+        Return an (N,3,3) array of matrices R such that R.v = conj(q).v.q, as used by quaternion.rotate_vector
+        """
+        (r, i, j, k) = self.quats.T
+        m = numpy.empty((len(self.quats),3,3))
+        m[:,0,0] = r*r+i*i-j*j-k*k
+        m[:,0,1] = 2*(i*j+r*k)
+        m[:,0,2] = 2*(i*k-r*j)
+        m[:,1,0] = 2*(i*j-r*k)
+        m[:,1,1] = r*r-i*i+j*j-k*k
+        m[:,1,2] = 2*(j*k+r*i)
+        m[:,2,0] = 2*(i*k+r*j)
+        m[:,2,1] = 2*(j*k-r*i)
+        m[:,2,2] = r*r-i*i-j*j+k*k
+        return m
+    #f get_matrices
+    def get_matrices( self ):
+        """
+        Return an (N,3,3) array of the matrices that quaternion.get_matrix(order=3) would give
+        """
+        return self._rotations() / self.modulus()[:,numpy.newaxis,numpy.newaxis]
+    #f to_euler
+    def to_euler( self, include_modulus=False, degrees=False ):
+        """
+        Return an (N,3) array of (roll, pitch, yaw), or (N,4) including the modulus, as quaternion.to_euler
+        """
+        l = self.modulus()
+        q = self.quats / numpy.where(l>1E-9, l, 1.0)[:,numpy.newaxis]
+        (r, i, j, k) = q.T
+        yaw   = numpy.arctan2(2*(r*i+j*k), 1-2*(i*i+j*j))
+        s = 2*(r*j-i*k)
+        pitch = numpy.where((s<-1) | (s>1), math.asin(1.0), numpy.arcsin(numpy.clip(s,-1,1)))
+        roll  = numpy.arctan2(2*(r*k+i*j), 1-2*(j*j+k*k))
+        if degrees:
+            roll  = 180.0/3.14159265 * roll
+            pitch = 180.0/3.14159265 * pitch
+            yaw   = 180.0/3.14159265 * yaw
+            pass
+        if include_modulus:
+            return numpy.stack((roll, pitch, yaw, l), axis=-1)
+        return numpy.stack((roll, pitch, yaw), axis=-1)
+    #f conjugate
+    def conjugate( self ):
+        self.quats[:,1:] = -self.quats[:,1:]
+        return self
+    #f reciprocal
+    def reciprocal( self ):
+        self.conjugate()
+        self.quats /= self.modulus_squared()[:,numpy.newaxis]
+        return self
+    #f modulus_squared
+    def modulus_squared( self ):
+        return numpy.einsum('ij,ij->i', self.quats, self.quats)
+    #f modulus
+    def modulus( self ):
+        return numpy.sqrt(self.modulus_squared())
+    #f add
+    def add( self, other, scale=1.0 ):
+        self.quats += self._components(other) * scale
+        return self
+    #f scale
+    def scale( self, scale ):
+        """
+        Scale by a scalar or an (N,) array
+        """
+        self.quats *= numpy.reshape(scale, (-1,1))
+        return self
+    #f normalize
+    def normalize( self, epsilon=1E-9 ):
+        l = self.modulus()
+        self.quats /= numpy.where(l<epsilon, 1.0, l)[:,numpy.newaxis]
+        return self
+    #f multiply
+    def multiply( self, other, premultiply=False ):
+        """
+        Postmultiply (or premultiply) each quaternion by the corresponding one in other
+        """
+        (r1,i1,j1,k1) = self.quats.T
+        (r2,i2,j2,k2) = self._components(other).T
+        if premultiply:
+            ((r1,i1,j1,k1), (r2,i2,j2,k2)) = ((r2,i2,j2,k2), (r1,i1,j1,k1))
+            pass
+        self.quats = numpy.stack((r1*r2 - i1*i2 - j1*j2 - k1*k2,
+                                  r1*i2 + i1*r2 + j1*k2 - k1*j2,
+                                  r1*j2 + j1*r2 + k1*i2 - i1*k2,
+                                  r1*k2 + k1*r2 + i1*j2 - j1*i2), axis=-1).reshape((-1,4))
+        return self
+    #f interpolate
+    def interpolate( self, other, t, epsilon=1E-6 ):
+        """
+        Spherical linear interpolation from self (t=0) to other (t=1), as quaternion.interpolate
+
+        t may be a scalar or an (N,) array; each pair takes the shorter path, and pairs
+        within epsilon of parallel are interpolated linearly
+        Returns a new quaternion_array
+        """
+        q0 = self.quats
+        q1 = self._components(other)
+        t = numpy.asarray(t, dtype=numpy.float64)
+        cosom = (q0*q1).sum(axis=-1)
+        sgn_cosom = numpy.where(cosom<0.0, -1.0, 1.0)
+        abs_cosom = cosom * sgn_cosom
+        slerp = (1.0-abs_cosom) > epsilon
+        omega = numpy.arccos(numpy.where(slerp, abs_cosom, 0.0))
+        sinom = numpy.sin(omega)
+        scale0 = numpy.where(slerp, numpy.sin((1.0-t)*omega) / numpy.where(slerp, sinom, 1.0), 1.0-t)
+        scale1 = numpy.where(slerp, numpy.sin(t*omega) / numpy.where(slerp, sinom, 1.0), t) * sgn_cosom
+        return quaternion_array(data=scale0[...,numpy.newaxis]*q0 + scale1[...,numpy.newaxis]*q1)
+    #f rotate_vectors
+    def rotate_vectors( self, xyz ):
+        """
+        Return conj(q).xyz.q for each quaternion q, as quaternion.rotate_vector
+
+        xyz may be a single vector (rotated by every quaternion) or an (N,3) array
+        Returns an (N,3) array
+        """
+        xyz = numpy.asarray(xyz, dtype=numpy.float64)
+        m = self._rotations()
+        return numpy.einsum('nij,nj->ni', m, numpy.broadcast_to(xyz, (len(self.quats),3)))
+    #f All done
+    pass
+
+#a Main
+def main():
+    import time
+    n = 10000
+    qa = quaternion_array.of_euler(rpy=numpy.random.random((n,3))*360, degrees=True)
+    qb = quaternion_array.of_euler(rpy=numpy.random.random((n,3))*360, degrees=True)
+    qs  = qa.to_quaternions()
+    qbs = qb.to_quaternions()
+    v = (1.0,2.0,3.0)
+    for (name, f, fa) in [("multiply",      lambda: [q.copy().multiply(qo) for (q,qo) in zip(qs,qbs)], lambda: qa.copy().multiply(qb)),
+                          ("rotate_vector", lambda: [q.rotate_vector(v) for q in qs],                  lambda: qa.rotate_vectors(v)),
+                          ("interpolate",   lambda: [q.interpolate(qo,0.3) for (q,qo) in zip(qs,qbs)], lambda: qa.interpolate(qb,0.3)),
+                          ]:
+        t = time.time()
+        f()
+        t_list = time.time()-t
+        t = time.time()
+        fa()
+        t_array = time.time()-t
+        print "%-14s %d quaternions: objects %8.4fs array %8.4fs"%(name, n, t_list, t_array)
+        pass
+    pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+#a Documentation
+"""
+Keyframed quaternion tracks, sampled many times at once
+
+A quaternion_spline is built from a list of key times and quaternions.
+Everything that quaternion.interpolate would recalculate for every
+sample - the angle between neighbouring keys, its sine, the shorter
+path sign, and (for squad) the inner control points - is calculated
+once per segment when the spline is created. A whole timeline can then
+be sampled with one call to sample(), which returns a quaternion_array.
+
+Without squad, each segment is sampled exactly as
+keys[n].interpolate(keys[n+1], t) would be; with squad, the curve is
+smoothed through the keys using Shoemake's spherical quadrangle
+interpolation.
+"""
+
+#a Imports
+import math
+import numpy
+from quaternion import quaternion
+from quaternion_array import quaternion_array
+
+#a Useful functions
+#f _multiply
+def _multiply(a, b):
+    """
+    Multiply two (N,4) arrays of quaternions, a.b
+    """
+    return quaternion_array(data=a).multiply(quaternion_array(data=b)).quats
+
+#f _log
+def _log(q):
+    """
+    Log of an (N,4) array of unit quaternions - (0, angle.axis)
+    """
+    v = q[:,1:]
+    s = numpy.sqrt((v*v).sum(axis=-1))
+    angle = numpy.arctan2(s, q[:,0])
+    k = numpy.where(s>1E-12, angle/numpy.where(s>1E-12,s,1.0), 1.0)
+    r = numpy.zeros(q.shape)
+    r[:,1:] = v*k[:,numpy.newaxis]
+    return r
+
+#f _exp
+def _exp(q):
+    """
+    Exponential of an (N,4) array of pure quaternions
+    """
+    v = q[:,1:]
+    angle = numpy.sqrt((v*v).sum(axis=-1))
+    k = numpy.where(angle>1E-12, numpy.sin(angle)/numpy.where(angle>1E-12,angle,1.0), 1.0)
+    r = numpy.empty(q.shape)
+    r[:,0] = numpy.cos(angle)
+    r[:,1:] = v*k[:,numpy.newaxis]
+    return r
+
+#a Classes
+#c quaternion_spline_segments
+class quaternion_spline_segments(object):
+    """
+    Per-segment slerp tables between consecutive rows of two (N,4) arrays:
+    start and end quaternions (with the end negated if that is the shorter path, unless
+    shorter_path is False), omega and 1/sin(omega), and whether the segment is close
+    enough to parallel to be linear
+    """
+    #f __init__
+    def __init__(self, q0, q1, epsilon, shorter_path=True):
+        cosom = (q0*q1).sum(axis=-1)
+        sgn_cosom = numpy.ones(cosom.shape)
+        if shorter_path:
+            sgn_cosom = numpy.where(cosom<0.0, -1.0, 1.0)
+            pass
+        abs_cosom = cosom * sgn_cosom
+        self.q0 = q0
+        self.q1 = q1 * sgn_cosom[:,numpy.newaxis]
+        self.linear = (1.0-abs_cosom) <= epsilon
+        self.omega = numpy.where(self.linear, 0.0, numpy.arccos(numpy.clip(abs_cosom,-1,1)))
+        self.inv_sinom = numpy.where(self.linear, 0.0, 1.0/numpy.where(self.linear, 1.0, numpy.sin(self.omega)))
+        pass
+    #f sample
+    def sample(self, segment, u):
+        """
+        Slerp within each given segment at local parameters u (0 to 1)
+        """
+        omega = self.omega[segment]
+        inv_sinom = self.inv_sinom[segment]
+        linear = self.linear[segment]
+        scale0 = numpy.where(linear, 1.0-u, numpy.sin((1.0-u)*omega)*inv_sinom)
+        scale1 = numpy.where(linear, u,     numpy.sin(u*omega)*inv_sinom)
+        return scale0[:,numpy.newaxis]*self.q0[segment] + scale1[:,numpy.newaxis]*self.q1[segment]
+    #f All done
+    pass
+
+#c quaternion_spline
+class quaternion_spline(object):
+    """
+    A track of keyframe quaternions at increasing times
+    """
+    #f __init__
+    def __init__(self, times, keys, squad=False, epsilon=1E-6):
+        """
+        @times:   Increasing key times
+        @keys:    Quaternions (or a quaternion_array) at those times
+        @squad:   If True, use spherical quadrangle interpolation rather than slerp between keys
+        @epsilon: Segments within epsilon of parallel are interpolated linearly, as quaternion.interpolate
+        """
+        if not isinstance(keys, quaternion_array):
+            keys = quaternion_array.of_quaternions(keys)
+            pass
+        self.times = numpy.array(times, dtype=numpy.float64)
+        self.keys = keys.quats.copy()
+        if len(self.times)!=len(self.keys):
+            raise Exception("Quaternion spline requires one key per time")
+        if len(self.times)<2:
+            raise Exception("Quaternion spline requires at least two keys")
+        if numpy.any(numpy.diff(self.times)<=0):
+            raise Exception("Quaternion spline key times must be increasing")
+        self.squad = squad
+        self.epsilon = epsilon
+        self.durations = numpy.diff(self.times)
+        if not squad:
+            self.segments = quaternion_spline_segments(self.keys[:-1], self.keys[1:], epsilon)
+            return
+        # For squad, first flip keys so that each is on the same side as its predecessor
+        keys = quaternion_array(data=self.keys).normalize().quats
+        for n in range(1,len(keys)):
+            if (keys[n]*keys[n-1]).sum()<0: keys[n] = -keys[n]
+            pass
+        # Inner control points s_n = q_n.exp(-(log(q_n^-1.q_n-1) + log(q_n^-1.q_n+1))/4), with s_n = q_n at the ends
+        inv = quaternion_array(data=keys).conjugate().quats
+        prev = numpy.concatenate((keys[:1], keys[:-1]))
+        next = numpy.concatenate((keys[1:], keys[-1:]))
+        l = _log(_multiply(inv, prev)) + _log(_multiply(inv, next))
+        controls = _multiply(keys, _exp(-l/4.0))
+        controls[0]  = keys[0]
+        controls[-1] = keys[-1]
+        self.segments = quaternion_spline_segments(keys[:-1], keys[1:], epsilon)
+        self.control_segments = quaternion_spline_segments(controls[:-1], controls[1:], epsilon)
+        pass
+    #f locate
+    def locate(self, ts):
+        """
+        Find the segment and local parameter (0 to 1) for each time in ts
+        Times outside the track are clamped to its ends
+        """
+        ts = numpy.clip(numpy.asarray(ts, dtype=numpy.float64).ravel(), self.times[0], self.times[-1])
+        segment = numpy.clip(numpy.searchsorted(self.times, ts, side='right')-1, 0, len(self.durations)-1)
+        u = (ts - self.times[segment]) / self.durations[segment]
+        return (segment, u)
+    #f sample
+    def sample(self, ts):
+        """
+        Sample the track at a scalar time or an array of times
+        Returns a quaternion_array with one quaternion per time
+        """
+        (segment, u) = self.locate(ts)
+        q = self.segments.sample(segment, u)
+        if not self.squad:
+            return quaternion_array(data=q)
+        s = self.control_segments.sample(segment, u)
+        # The outer slerp of squad must not take the shorter path, or the track jumps where q and s become perpendicular
+        outer = quaternion_spline_segments(q, s, self.epsilon, shorter_path=False)
+        return quaternion_array(data=outer.sample(numpy.arange(len(u)), 2*u*(1-u)))
+    #f sample_at
+    def sample_at(self, t):
+        """
+        Sample the track at a single time, returning a quaternion
+        """
+        return self.sample(t)[0]
+    #f sample_range
+    def sample_range(self, t0, t1, n):
+        """
+        Sample the track at n evenly spaced times from t0 to t1 inclusive
+        """
+        return self.sample(numpy.linspace(t0, t1, n))
+    #f All done
+    pass
+
+#a Main
+def main():
+    import time
+    n = 10000
+    times = range(0,50,5)
+    keys = [quaternion.of_euler(roll=37*i, pitch=23*i, yaw=11*i, degrees=True) for i in range(len(times))]
+    ts = numpy.linspace(times[0], times[-1], n)
+    t = time.time()
+    for x in ts:
+        s = min(int(x/5), len(keys)-2)
+        keys[s].interpolate(keys[s+1], (x-times[s])/5.0)
+        pass
+    t_interpolate = time.time()-t
+    for squad in [False, True]:
+        t = time.time()
+        spline = quaternion_spline(times, keys, squad=squad)
+        spline.sample(ts)
+        print "%d samples: quaternion.interpolate %8.4fs spline (squad %s) %8.4fs"%(n, t_interpolate, str(squad), time.time()-t)
+        pass
+    pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+#a Documentation
+"""
+Batched versions of the functions in vectors.py
+
+Each function here takes arrays of vectors - numpy arrays (or anything
+numpy.asarray accepts) whose last axis is the vector dimension, so an
+(N,d) array is N vectors of dimension d - and operates on all of them
+in one call.  Results are (N,d) arrays for vector results and (N,)
+arrays for scalar results.
+
+A single vector of shape (d,) broadcasts against an (N,d) array, so for
+example vector_array_add(points, origin, scale=-1.0) subtracts one
+origin from every point.
+
+The semantics match the single-vector functions in vectors.py,
+including the treatment of scale lists (applied cyclically across the
+coordinates) and of epsilon in normalization.
+"""
+
+#a Imports
+import numpy
+
+#f Useful functions
+#f _as_array
+def _as_array(v):
+    """
+    Internal function that converts an argument to a float64 numpy array
+    (without copying if it is already one)
+    """
+    return numpy.asarray(v, dtype=numpy.float64)
+
+#f _scale_array
+def _scale_array(scale, d):
+    """
+    Internal function that converts a 'scale' argument to something that broadcasts
+    against an array of vectors of dimension d
+
+    @scale:    Argument to convert
+    @d:        Dimension of the vectors to be scaled
+
+    As with vectors._mklist, a list or tuple of scales is applied cyclically
+    across the coordinates of each vector; a numpy array is used as given
+    (so an (N,1) array scales each vector by its own factor)
+    """
+    if type(scale) in (tuple, list):
+        return numpy.resize(_as_array(scale), d)
+    if isinstance(scale, numpy.ndarray):
+        return scale
+    return float(scale)
+
+#f vector_array_scale
+def vector_array_scale(v, scale=1.0):
+    """
+    Scale an array of vectors; if scale is a list or tuple, then the elements of each vector
+    are scaled by the respective elements of scale, otherwise all the elements are scaled by
+    the single scale factor
+    Returns an (N,d) array
+
+    @v:       Array of vectors to scale
+    @scale:   Scaling amount - list, tuple, int/float, or numpy array that broadcasts with v
+    """
+    v = _as_array(v)
+    return v * _scale_array(scale, v.shape[-1])
+
+#f vector_array_dot_product
+def vector_array_dot_product(a, b):
+    """
+    Calculate the inner products (vector dot products) of two arrays of vectors
+    Returns an (N,) array
+
+    @a:       First array of vectors
+    @b:       Second array of vectors
+    """
+    return numpy.einsum('...i,...i->...', _as_array(a), _as_array(b))
+
+#f vector_array_squared
+def vector_array_squared(v):
+    """
+    Calculate the length squared of each of an array of vectors (v.v)
+    Returns an (N,) array
+
+    @v:       Array of vectors whose lengths should be calculated
+    """
+    v = _as_array(v)
+    return vector_array_dot_product(v,v)
+
+#f vector_array_length
+def vector_array_length(v):
+    """
+    Calculate the length of each of an array of vectors (sqrt[v.v])
+    Returns an (N,) array
+
+    @v:       Array of vectors whose lengths should be calculated
+    """
+    return numpy.sqrt(vector_array_squared(v))
+
+#f vector_array_normalize
+def vector_array_normalize(v, epsilon=1E-8):
+    """
+    Normalize an array of vectors - turn each into a unit vector
+    Vectors whose length is less than epsilon are not touched (to avoid div by zero)
+    Returns an (N,d) array
+
+    @v:       Array of vectors to normalize
+    @epsilon: Maximum length of vector to leave untouched
+    """
+    v = _as_array(v)
+    d = vector_array_length(v)
+    d = numpy.where(d<epsilon, 1.0, d)
+    return v / d[...,numpy.newaxis]
+
+#f vector_array_separation
+def vector_array_separation(a,b):
+    """
+    Determine the separations (distances between) two arrays of vectors
+    Returns an (N,) array
+
+    @a:       First array of vectors
+    @b:       Second array of vectors
+    """
+    return vector_array_length(_as_array(a)-_as_array(b))
+
+#f vector_array_add
+def vector_array_add(a,b,scale=1.0):
+    """
+    Add two arrays of vectors, scaling the second by scale.
+    For example, if scale is -1 then the result is the difference between the vectors
+    Returns an (N,d) array
+
+    @a:       First array of vectors
+    @b:       Second array of vectors
+    @scale:   Scaling factor to be applied to second vector prior to addition
+    """
+    a = _as_array(a)
+    return a + _as_array(b) * _scale_array(scale, a.shape[-1])
+
+#f vector_array_cos_angle_between
+def vector_array_cos_angle_between(a,b, epsilon=1E-16):
+    """
+    Calculate the cosines of the angles between two arrays of vectors
+    If a pair of vectors combine in length (through multiplication) to be less than
+    'epsilon', then 1.0 is returned for that pair, as vector_cos_angle_between does
+    Returns an (N,) array of floats between -1 and 1
+
+    @a:       First array of vectors
+    @b:       Second array of vectors
+    @epsilon: Minimum product of lengths for the angle to be calculated
+    """
+    a = _as_array(a)
+    b = _as_array(b)
+    l = vector_array_length(a) * vector_array_length(b)
+    small = l<epsilon
+    dp = vector_array_dot_product(a,b) / numpy.where(small, 1.0, l)
+    return numpy.where(small, 1.0, dp)
+
+#f vector_array_cross_product
+def vector_array_cross_product(vs):
+    """
+    Cross product a list/tuple of arrays of vectors
+    One fewer array than the dimension is required; the cross product is
+    calculated for each of the N rows independently, as vector_cross_product would
+    Returns an (N,d) array
+
+    @vs:   List of N-1 arrays of vectors of dimension N each
+    """
+    vs = [_as_array(v) for v in vs]
+    d = vs[0].shape[-1]
+    if len(vs)!=(d-1):
+        raise Exception("Cross product requires N-1 vectors of dimension N")
+    if d==2:
+        v = vs[0]
+        return numpy.stack((v[...,1],-v[...,0]),axis=-1)
+    if d==3:
+        return numpy.cross(vs[0],vs[1])
+    # Result coordinate i is (-1)^i times the minor of the (d-1)xd matrix of vectors with column i removed
+    m = numpy.stack(numpy.broadcast_arrays(*vs),axis=-2)
+    res = []
+    for i in range(d):
+        s = 1
+        if (i&1):s=-1
+        res.append(s * numpy.linalg.det(numpy.delete(m,i,axis=-1)))
+        pass
+    return numpy.stack(res,axis=-1)
+
+#f vector_array_point_on_plane
+def vector_array_point_on_plane(p0,p1,p2,k01,k02):
+    """
+    Return the coordinates of points on planes
+    Returns an array equal to p0 + k01.(p1-p0) + k02.(p2-p0)
+
+    @p0:     'Origin' points of the planes
+    @p1:     Second points on the planes
+    @p2:     Third points on the planes
+    @k01:    Amount of P0->P1 direction of the points (from P0) - scalar or (N,1) array
+    @k02:    Amount of P0->P2 direction of the points (from P0) - scalar or (N,1) array
+    """
+    p0 = _as_array(p0)
+    return p0 + k01*(_as_array(p1)-p0) + k02*(_as_array(p2)-p0)
+
+#a Toplevel
+def main():
+    import time
+    import vectors
+    n = 100000
+    pts = numpy.random.random((n,3))
+    pts_list = pts.tolist()
+    for (name, f, fa) in [("normalize", vectors.vector_normalize, vector_array_normalize),
+                          ("length",    vectors.vector_length,    vector_array_length),
+                          ]:
+        t = time.time()
+        for p in pts_list: f(p)
+        t_list = time.time()-t
+        t = time.time()
+        fa(pts)
+        t_array = time.time()-t
+        print "%-12s %d vectors: list %8.4fs array %8.4fs"%(name, n, t_list, t_array)
+        pass
+    pass
+
+if __name__ == '__main__':
+    main()
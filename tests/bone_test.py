@@ -1,8 +1,6 @@
 #!/usr/bin/arch -32 /System/Library/Frameworks/Python.framework/Versions/2.7/bin/python
 #a Imports
 import sys, os
-import pygame
-import pygame_test
 
 sys.path.insert(0, os.path.abspath('../python'))
 #import gjslib.graphics.bone as bone
@@ -15,101 +13,45 @@ def main():
     imp.reload(sample_ship)
     ship = sample_ship.build_ship()
 
-    #print ship.create_dependencies(  )
-    dependent_expression_list = ship.collate_dependencies()
-    undefined_vars = {}
-    dependent_vars = {}
-    for t in dependent_expression_list:
-        (node,id,deps,defs) = t
-        for d in defs:
-            if d not in undefined_vars: undefined_vars[d] = []
-            undefined_vars[d].append( t )
-            for p in deps:
-                if p in defs: continue
-                if p not in dependent_vars: dependent_vars[p] = []
-                if d not in dependent_vars[p]:
-                    dependent_vars[p].append(d)
-                    pass
-                pass
-            pass
-        pass
-    print "undefined_vars", undefined_vars
-    i = 0
-    for d in undefined_vars.keys():
-        id = d.instance().get_implicit_dependents()
-        if len(id)>0:
-            for i in id:
-                if i not in undefined_vars: undefined_vars[i] = []
-                undefined_vars[i].append( (None, "imp", [d], [i] ) )
-                pass
-            pass
-        pass
-    print "dependent_vars", dependent_vars
-    defined_vars = {}
-    for d in dependent_vars:
-        if d not in undefined_vars:
-            defined_vars[d] = 0
-            pass
+    graph = ship.create_dependency_graph()
+    print graph.order
+    graph.update()
+    pass
+
+#f benchmark
+def benchmark( iterations=200 ):
+    """
+    Time evaluation of all the sample ship's bone expressions, interpreted and compiled
+    """
+    import time
+    import sample_ship
+    import gjslib.graphics.bone as bone
+    ship = sample_ship.build_ship()
+    expressions = []
+    for (node,id,deps,defs) in ship.collate_dependencies():
+        expressions.append( (node,id) )
         pass
-    print defined_vars
-    predefined_vars = defined_vars.copy()
-    ordered_expressions = []
-    stage = 0
-    while len(undefined_vars)>0:
-        stage = stage + 1
-        undefined_vars_list = undefined_vars.keys()
-        n = len(undefined_vars_list)
-        for d in undefined_vars_list:
-            can_define = True
-            if d not in undefined_vars: continue
-            for t in undefined_vars[d]:
-                (node,id,deps,defs) = t
-                for dd in deps:
-                    if (dd in undefined_vars_list) and (dd not in defs):
-                        can_define = False
-                        break
-                    pass
-                pass
-            if can_define:
-                tl = undefined_vars[d]
-                for t in tl:
-                    (node,id,deps,defs) = t
-                    ordered_expressions.append(t)
-                    for dd in defs:
-                        if dd in undefined_vars:
-                            del undefined_vars[dd]
-                            pass
-                        defined_vars[dd] = stage
-                        pass
-                    pass
+    for use_compiled in (False, True):
+        bone.c_bone_expr.use_compiled = use_compiled
+        t = time.time()
+        for i in range(iterations):
+            for (node,id) in expressions:
+                node.evaluate_expressions( ids=(id,) )
                 pass
             pass
-        if len(undefined_vars)==n:
-            raise Exception("Cyclic dependency chain:%s"%(str(undefined_vars_list)))
+        print "%d evaluations of %d expressions (compiled %s) %8.4fs"%(iterations, len(expressions), str(use_compiled), time.time()-t)
         pass
-    print defined_vars
-    print ordered_expressions
-    expr_deps = predefined_vars
-    expr_defs = defined_vars
-    for d in expr_deps:
-        if d in expr_defs:
-            del expr_defs[d]
-    expr_deps = expr_deps.keys()
-    expr_defs = expr_defs.keys()
-    expressions = []
-    for t in ordered_expressions:
-        (node,id,deps,defs) = t
-        if node is not None:
-            expressions.append( (node,id) )
-            pass
-        pass
-    #print expr_deps
-    #print expr_defs
-    #print expressions
-
-    for (node,id) in expressions:
-        node.evaluate_expressions( ids=(id,) )
+    bone.c_bone_expr.use_compiled = True
+    graph = ship.create_dependency_graph()
+    graph.update()
+    n = 0
+    t = time.time()
+    for i in range(iterations):
+        ship.set_node( "bone15.base_2", ship.find_node_or_fail("bone15.base_2").get() )
+        n += graph.update()
         pass
+    print "%d incremental updates of one control point evaluated %d expressions %8.4fs"%(iterations, n, time.time()-t)
+    pass
 
 #a Toplevel
 def draw_fn( screen ):
@@ -184,6 +126,12 @@ def draw_fn( screen ):
     pass
 
 if __name__ == '__main__':
+    if "benchmark" in sys.argv[1:]:
+        benchmark()
+        sys.exit(0)
+    # pygame is only needed for the display, not for the benchmark
+    import pygame
+    import pygame_test
     main()
     def key_fn(k):
         if k==pygame.K_q: return True
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+#a Imports
+from gjslib.graphics import bone
+import unittest
+
+#a Test
+#c BoneExprTests
+class BoneExprTests(unittest.TestCase):
+    script = [ ("set", "c", ("add", ("get","a"), ("mult", ("get","b"), 4))), "pop",
+               ("set", "a", ("neg", ("get","c"))),
+               "dup", "add", "pop",
+               ("set", "b", ("mult", ("get","b"), 0.5)),
+               ]
+    #f build
+    def build(self, script):
+        group = bone.c_bone_group("group")
+        for (name, value) in ( ("a",2.0), ("b",3.0), ("c",0.0) ):
+            group.add_child( bone.c_bone_var(name, "scalar") )
+            group.set_node( name, value )
+            pass
+        group.add_child( bone.c_bone_var("v", "vector") )
+        expr = group.add_expression( id="script", scope=group, script=script )
+        return (group, expr)
+    #f values
+    def values(self, group):
+        return [group.find_node_or_fail(n).get() for n in ("a","b","c")]
+    #f test_compiled
+    def test_compiled(self):
+        (group, expr) = self.build(self.script)
+        (i_group, i_expr) = self.build(self.script)
+        i_expr.use_compiled = False
+        for i in range(4):
+            r = expr.evaluate( group.expressions["script"]["scope"] )
+            i_r = i_expr.evaluate( i_group.expressions["script"]["scope"] )
+            self.assertEqual(r[0], True)
+            self.assertEqual(len(r[1]), len(i_r[1]))
+            self.assertEqual([x.get() for x in r[1]], [x.get() for x in i_r[1]])
+            self.assertEqual(self.values(group), self.values(i_group))
+            self.assertTrue(expr.compiled is not None)
+            if i==0: self.assertEqual(self.values(group)[2], 14.0)
+            pass
+        self.assertTrue(i_expr.compiled is None)
+        expr.add_script( "dup" )
+        self.assertTrue(expr.compiled is None)
+        r = expr.evaluate( group.expressions["script"]["scope"] )
+        self.assertEqual(len(r[1]), 2)
+        pass
+    #f test_vector
+    def test_vector(self):
+        script = [ ("set", "v", ("rot", ("add", ("get","v"), ("mult", ("get","v"), 2.0)), 90.0)), "pop" ]
+        (group, expr) = self.build(script)
+        (i_group, i_expr) = self.build(script)
+        i_expr.use_compiled = False
+        for g in (group, i_group):
+            g.set_node( "v", bone.c_point((1.0,2.0)) )
+            pass
+        for i in range(2):
+            self.assertEqual(expr.evaluate( group.expressions["script"]["scope"] )[0], True)
+            self.assertEqual(i_expr.evaluate( i_group.expressions["script"]["scope"] )[0], True)
+            pass
+        self.assertTrue(expr.compiled is not None)
+        v = group.find_node_or_fail("v").get().get_coords()
+        self.assertEqual(v, i_group.find_node_or_fail("v").get().get_coords())
+        # (1,2) -> (3,6) -> (6,-3) -> (18,-9) -> (-9,-18)
+        self.assertTrue(abs(v[0]+9)<1E-9 and abs(v[1]+18)<1E-9, str(v))
+        pass
+    #f test_errors
+    def test_errors(self):
+        (group, expr) = self.build( [("add", 1.0, ("get","v"))] )
+        for i in range(2):
+            r = expr.evaluate( group.expressions["script"]["scope"] )
+            self.assertEqual(r[0], False)
+            self.assertTrue(r[1].startswith("Could not find op"))
+            self.assertTrue(expr.compiled is None)
+            pass
+        (group, expr) = self.build( [("get","missing")] )
+        self.assertRaises(Exception, expr.evaluate, group.expressions["script"]["scope"] )
+        pass
+    #f All done
+    pass
+
+#c BoneDependencyTests
+class BoneDependencyTests(unittest.TestCase):
+    #f build
+    def build(self, scripts):
+        group = bone.c_bone_group("group")
+        for name in ("a","b","c","d","e"):
+            group.add_child( bone.c_bone_var(name, "scalar") )
+            group.set_node( name, 0.0 )
+            pass
+        sub = group.add_child( bone.c_bone_group("sub") )
+        for (id, script) in scripts:
+            sub.add_expression( id=id, scope=group, script=script )
+            pass
+        return group
+    #f values
+    def values(self, group):
+        return [group.find_node_or_fail(n).get() for n in ("a","b","c","d","e")]
+    #f test_incremental
+    def test_incremental(self):
+        group = self.build( [ ("d", [("set", "d", ("mult", ("get","c"), 2)), "pop"]),
+                              ("c", [("set", "c", ("add", ("get","a"), ("get","b"))), "pop"]),
+                              ("e", [("set", "e", ("mult", ("get","b"), 3)), "pop"]),
+                              ] )
+        graph = group.create_dependency_graph()
+        ids = [id for (node,id) in graph.order]
+        self.assertTrue(ids.index("c")<ids.index("d"))
+        group.set_node( "a", 1.0 )
+        group.set_node( "b", 2.0 )
+        self.assertEqual(graph.update(), 3)
+        self.assertEqual(self.values(group), [1.0, 2.0, 3.0, 6.0, 6.0])
+        self.assertEqual(graph.update(), 0)
+        group.set_node( "a", 5.0 )
+        self.assertEqual(set([id for (node,id) in graph.dirty]), set(["c","d"]))
+        self.assertEqual(graph.update(), 2)
+        self.assertEqual(self.values(group), [5.0, 2.0, 7.0, 14.0, 6.0])
+        group.set_node( "c", 1.0 )
+        self.assertEqual(graph.update(), 1)
+        self.assertEqual(self.values(group), [5.0, 2.0, 1.0, 2.0, 6.0])
+        graph.detach()
+        group.set_node( "b", 1.0 )
+        self.assertFalse(graph.is_dirty())
+        pass
+    #f test_cycle
+    def test_cycle(self):
+        group = self.build( [ ("c", [("set", "c", ("add", ("get","d"), 1)), "pop"]),
+                              ("d", [("set", "d", ("add", ("get","c"), 1)), "pop"]),
+                              ] )
+        self.assertRaises(Exception, group.create_dependency_graph)
+        pass
+    #f All done
+    pass
+
+#c BoneLookupTests
+class BoneLookupTests(unittest.TestCase):
+    #f test_find_node
+    def test_find_node(self):
+        root = bone.c_bone_group("root")
+        g1 = root.add_child( bone.c_bone_group("g1") )
+        g2 = g1.add_child( bone.c_bone_group("g2") )
+        v = g2.add_child( bone.c_bone_var("v", "scalar") )
+        for i in range(2):
+            self.assertEqual(root.find_node("g1.g2.v"), (v, [g1, g2, v]))
+            self.assertEqual(root.find_node(["g1","g2"]), (g2, [g1, g2]))
+            self.assertEqual(root.find_node("g1.x.v"), (g1, [g1, None, None]))
+            self.assertEqual(g1.find_node("g2.v", result=[g1]), (v, [g1, g2, v]))
+            self.assertTrue(root.find_node_or_fail("g1.g2.v") is v)
+            self.assertRaises(Exception, root.find_node_or_fail, "g1.g2.w")
+            pass
+        w = g2.add_child( bone.c_bone_var("w", "scalar") )
+        self.assertTrue(root.find_node_or_fail("g1.g2.w") is w)
+        # The first child with a name is found
+        g2.add_child( bone.c_bone_var("v", "scalar") )
+        self.assertTrue(root.find_node_or_fail("g1.g2.v") is v)
+        pass
+    #f test_compiled_rebinds
+    def test_compiled_rebinds(self):
+        group = bone.c_bone_group("group")
+        sub = group.add_child( bone.c_bone_group("sub") )
+        group.add_child( bone.c_bone_var("a", "scalar") )
+        group.set_node( "a", 1.0 )
+        expr = sub.add_expression( id="script", scope=[sub, group], script=[("get","a")] )
+        scope = sub.expressions["script"]["scope"]
+        for i in range(2):
+            self.assertEqual(expr.evaluate(scope)[1][0].get(), 1.0)
+            pass
+        self.assertTrue(expr.compiled is not None)
+        sub.add_child( bone.c_bone_var("a", "scalar") )
+        sub.set_node( "a", 2.0 )
+        for i in range(2):
+            self.assertEqual(expr.evaluate(scope)[1][0].get(), 2.0)
+            pass
+        pass
+    #f All done
+    pass
+
+#c BoneBakeTests
+class BoneBakeTests(unittest.TestCase):
+    class point(object):
+        def __init__(self, coords):
+            self.coords = tuple(coords)
+            pass
+        def get_coords(self):
+            return self.coords
+        pass
+    #f build
+    def build(self):
+        root = bone.c_bone_group("root")
+        skeleton = root.add_child( bone.c_bone_group("skeleton") )
+        for name in ("b0", "b1"):
+            b = skeleton.add_child( bone.c_bone_var(name, "bezier") )
+            pts = [ b.add_child( bone.c_bone_var("base_%d"%i, "vector") ) for i in range(3) ]
+            for i in range(3):
+                pts[i].set( self.point((i, 0.0, 7.0)) )
+                pass
+            b.set( pts )
+            pass
+        return root
+    #f frame
+    def frame(self, root, frame):
+        root.set_node( "skeleton.b0.base_1", self.point((1.0, frame*2.0, 7.0)) )
+        root.set_node( "skeleton.b1.base_2", self.point((2.0, -frame, 7.0)) )
+        pass
+    #f test_bake
+    def test_bake(self):
+        import numpy, os, tempfile
+        root = self.build()
+        anim = bone.bake_animation( root, 4, frame_fn=self.frame, samples=5 )
+        self.assertEqual(anim.data.shape, (4, 2, 5, 2))
+        self.assertEqual(anim.data.dtype, numpy.float32)
+        self.assertEqual(anim.bone_names, ["skeleton.b0", "skeleton.b1"])
+        b0 = root.find_node_or_fail("skeleton.b0").instance().bezier
+        for f in range(4):
+            self.frame(root, f)
+            for (t, c) in zip(anim.ts, anim.frame(f)[0]):
+                self.assertTrue(numpy.all(numpy.abs(c-b0.coord(t).coords[0:2])<1E-6))
+                pass
+            pass
+        self.assertTrue(numpy.all(numpy.abs(anim.coords_at(1.25)-(anim.data[1]*0.75+anim.data[2]*0.25))<1E-6))
+        self.assertTrue(numpy.all(anim.coords_at(10)==anim.data[3]))
+        anim = bone.bake_animation( root, [0.5, 1.5], frame_fn=self.frame, samples=3, bones=["skeleton.b1"] )
+        self.assertEqual(anim.data.shape, (2, 1, 3, 2))
+        self.assertTrue(abs(anim.data[1,0,2,1]+1.5)<1E-6)
+        filename = os.path.join(tempfile.mkdtemp(), "anim.npy")
+        anim.save(filename)
+        loaded = bone.c_bone_baked_animation.load(filename)
+        self.assertTrue(isinstance(loaded.data, numpy.memmap))
+        self.assertTrue(numpy.all(loaded.data==anim.data))
+        self.assertEqual(loaded.bone_names, ["skeleton.b1"])
+        self.assertEqual(loaded.bone_index("skeleton.b1"), 0)
+        del loaded
+        os.remove(filename)
+        os.remove(filename+".bones")
+        os.rmdir(os.path.dirname(filename))
+        pass
+    #f All done
+    pass
+
+#a Toplevel
+loader = unittest.TestLoader().loadTestsFromTestCase
+suites = [ loader(BoneExprTests),
+           loader(BoneDependencyTests),
+           loader(BoneLookupTests),
+           loader(BoneBakeTests),
+           ]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+#a Imports
+import math
+from gjslib.math.matrix import *
+from gjslib.math.array_matrix import *
+import unittest
+epsilon = 1E-9
+
+#a Test
+#c Array matrix tests
+class ArrayMatrixTests(unittest.TestCase):
+    """
+    Test that array_matrix matches matrix
+    """
+    datas = [ [1.,2.,4.,3.],
+              [1.,2.,3,4.,5.,4.,6.,3,2.],
+              [1.,0.,0.,0.,  0.,4.,2.,0., -5.,0.,0.,1., 0.,0.,1.,0.],
+              [-1.,3.,4.,5.,  0.,4.,2.,1., -5.,5.,2.,-3., -4.,3.,2.,1.],
+              [float((7*i*i+3*i)%11)-5. for i in range(25)],
+              ]
+    #f check_scalar
+    def check_scalar(self,d,value):
+        self.assertTrue(abs(d-value)<epsilon, 'Scalars differ too much %s,%s'%(str(d),str(value)))
+        pass
+    #f check_vector
+    def check_vector(self,d,value):
+        self.assertEqual(len(value),len(d), 'Length of vectors differs')
+        for i in range(len(d)):
+            self.assertTrue(abs(value[i]-d[i])<epsilon, 'Coordinate %d mismatches (%s,%s)'%(i,str(value[i]),str(d[i])))
+            pass
+        pass
+    #f check_matrix
+    def check_matrix(self,m,values):
+        d = m.get_matrix(row_major=True)
+        self.assertEqual(len(values),len(d), 'Length of data differs')
+        for i in range(len(d)):
+            self.assertTrue(abs(values[i]-d[i])<epsilon, 'Matrix data %d mismatches'%i)
+            pass
+        pass
+    #f test_basics
+    def test_basics(self):
+        """
+        Test creation, accessors, identity, rows and columns, transpose, scale, expand and shrink
+        """
+        for data in self.datas:
+            m  = matrix(data=data)
+            am = array_matrix(data=data)
+            self.assertEqual(am.order, m.order)
+            self.check_matrix(am, m.get_matrix())
+            self.check_vector(am.get_matrix(row_major=False), m.get_matrix(row_major=False))
+            n = m.order
+            for r in range(n):
+                self.check_vector(am.get_row(r), m.get_row(r))
+                self.check_vector(am.get_column(r), m.get_column(r))
+                for c in range(n):
+                    self.check_scalar(am[r,c], m[r,c])
+                    pass
+                pass
+            self.check_matrix(am.copy().transpose(), m.copy().transpose().get_matrix())
+            self.check_matrix(am.copy().scale(2), m.copy().scale(2).get_matrix())
+            self.check_matrix(am.copy().scale([3,2]), m.copy().scale([3,2]).get_matrix())
+            self.check_matrix(am.copy().expand(n+2), m.copy().expand(n+2).get_matrix())
+            self.check_matrix(am.copy().shrink(n-1,1,0), m.copy().shrink(n-1,1,0).get_matrix())
+            self.check_matrix(array_matrix(order=n).set_identity(), matrix(order=n).set_identity().get_matrix())
+            pass
+        return
+    #f test_multiply
+    def test_multiply(self):
+        """
+        Test premult, postmult, multiply_matrices, apply and translate
+        """
+        for data in self.datas:
+            m  = matrix(data=data)
+            am = array_matrix(data=data)
+            m2 = matrix(data=m.copy().transpose().get_matrix())
+            am2 = array_matrix(data=m2.get_matrix())
+            self.check_matrix(am.copy().premult(am2), m.copy().premult(m2).get_matrix())
+            self.check_matrix(am.copy().postmult(am2), m.copy().postmult(m2).get_matrix())
+            self.check_matrix(am.copy().postmult(m2), m.copy().postmult(m2).get_matrix())
+            self.check_matrix(array_matrix.multiply_matrices(am,am2), matrix.multiply_matrices(m,m2).get_matrix())
+            v = range(1,m.order+1)
+            self.check_vector(am.apply(v), m.apply(v))
+            am.translate(v)
+            m.translate(v)
+            self.check_matrix(am, m.get_matrix())
+            pass
+        return
+    #f test_apply_many
+    def test_apply_many(self):
+        """
+        Test apply and apply_many, with implied final coordinates, perspective and output buffers
+        """
+        for data in self.datas:
+            m  = matrix(data=data)
+            am = array_matrix(data=data)
+            n = m.order
+            pts = [[float((i*j+3*i+j)%7)-3. for j in range(n)] for i in range(20)]
+            pts.append([0.]*n)
+            for points in [pts, [p[:-1] for p in pts]]:
+                for perspective in [False, True]:
+                    r = m.apply_many(points, perspective=perspective)
+                    self.assertEqual(len(r), len(points))
+                    for i in range(len(points)):
+                        self.check_vector(r[i], m.apply(points[i], perspective=perspective))
+                        self.check_vector(am.apply(points[i], perspective=perspective), r[i])
+                        pass
+                    ar = am.apply_many(numpy.array(points), perspective=perspective)
+                    self.assertEqual(ar.shape, (len(points),n))
+                    for i in range(len(points)):
+                        self.check_vector(ar[i], r[i])
+                        pass
+                    out = numpy.zeros((len(points),n))
+                    self.assertTrue(am.apply_many(points, perspective=perspective, out=out) is out)
+                    self.check_vector(out.ravel(), ar.ravel())
+                    pass
+                pass
+            pass
+        m = matrix(order=4).set_identity()
+        m[3,2] = -1.0
+        m[3,3] = 0.0
+        self.check_vector(m.apply((2.,4.,-2.), perspective=True), (1.,2.,-1.,1.))
+        self.check_vector(m.apply((2.,4.,0.,0.), perspective=True), (2.,4.,0.,0.))
+        return
+    #f test_lup
+    def test_lup(self):
+        """
+        Test LU decomposition, inversion, unpivot and determinants
+        """
+        for data in self.datas:
+            m  = matrix(data=data)
+            am = array_matrix(data=data)
+            (LU, P) = m.lup_decompose()
+            (aLU, aP) = am.lup_decompose()
+            self.assertEqual(aP, P)
+            self.check_matrix(aLU, LU.get_matrix())
+            self.check_matrix(aLU.lup_invert(aP), LU.lup_invert(P).get_matrix())
+            (L,U) = aLU.lu_split()
+            self.check_matrix(array_matrix.multiply_matrices(L,U).unpivot(aP), data)
+            self.check_matrix(am.inverse(), m.inverse().get_matrix())
+            self.check_matrix(am.copy().invert().postmult(am), array_matrix(order=m.order).set_identity().get_matrix())
+            self.check_scalar(am.determinant(), m.determinant())
+            pass
+        for data in self.datas:
+            m  = matrix(data=data)
+            am = array_matrix(data=data)
+            B = [[float((i*j+3*i+j)%7)-3. for j in range(m.order)] for i in range(5)]
+            X = am.lup_factorization().solve_many(B)
+            for i in range(len(B)):
+                self.check_vector(X[i], m.solve(B[i]))
+                self.check_vector(am.solve(B[i]), X[i])
+                pass
+            self.assertTrue(am.lup_factorization() is am.lup_factorization())
+            pass
+        self.assertEqual(array_matrix(data=[1.,2.,2.,4.]).inverse(), None)
+        self.assertEqual(array_matrix(data=[1.,2.,2.,4.]).solve((1.,2.)), None)
+        self.assertEqual(array_matrix(data=[0.,1.,0.,2.]).lup_decompose(), None)
+        self.check_scalar(array_matrix(data=[1.,2.,2.,4.]).determinant(), 0)
+        return
+    #f test_eigenvalues
+    def test_eigenvalues(self):
+        """
+        Test eigenvalues and eigenvectors
+        """
+        for (data, e) in [ ([3.,0.,2.,1.], [1.,3.]),
+                           ([1.,0.,-2.,3.], [1.,3.]),
+                           ([2.,0.,0., 0.,3.,4., 0.,4.,9.], [1.,2.,11.]),
+                           ([0.,-1.,1.,0.], []),
+                           ]:
+            am = array_matrix(data=data)
+            self.check_vector(sorted(am.eigenvalues()), e)
+            for k in e:
+                v = am.eigenvector(k)
+                self.check_vector(am.apply(v), [k*x for x in v])
+                pass
+            pass
+        self.assertEqual(len(array_matrix(data=[0.,-1.,1.,0.]).eigenvalues(real=False)), 2)
+        return
+    #f All done
+    pass
+
+#a Toplevel
+loader = unittest.TestLoader().loadTestsFromTestCase
+suites = [ loader(ArrayMatrixTests),
+           ]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -55,9 +55,272 @@ class SimpleBezierTests(unittest.TestCase):
         pass
     pass
 
+#c Bezier flattening tests
+class FlattenBezierTests(unittest.TestCase):
+    class point(object):
+        def __init__(self, coords):
+            self.coords = tuple(coords)
+            pass
+        pass
+    curves = [ bezier_quad(pts=([0,0],[0,100],[50,0])),
+               bezier_quad(pts=([0,0,0],[10,20,-30],[40,0,10])),
+               bezier_quad(pts=([0,0],[1,1],[2,2])),
+               bezier_cubic(pts=([0,0],[0,100],[100,100],[100,0])),
+               bezier_cubic(pts=([0,0],[10,100],[100,-100],[100,0])),
+               ]
+    def check_vector(self,d,value):
+        self.assertEqual(len(value),len(d), 'Length of vectors differs')
+        for i in range(len(d)):
+            self.assertTrue(abs(value[i]-d[i])<epsilon, 'Coordinate %d mismatches (%s, %s)'%(i,str(value),str(d)))
+            pass
+        pass
+    def test_flatten(self):
+        """
+        Flattened points must lie on the curve at equal steps of t, and each segment must be straight enough
+        """
+        for b in self.curves:
+            d = len(b.pts[0])
+            for straightness in [100, 10, 1, 0.1, 0.01]:
+                pts = b.flatten(straightness)
+                n = len(pts)/d-1
+                self.assertEqual(n, b.flatten_count(straightness))
+                for i in range(n+1):
+                    self.check_vector(pts[i*d:i*d+d], b.evaluate(i/float(n)))
+                    pass
+                self.assertEqual(len(b.flatten(straightness,include_last=False)), n*d)
+                sub = b
+                for i in range(n-1):
+                    # Split off each segment in turn: the first 1/(n-i) of what remains
+                    (first, sub) = (b.__class__(pts=self.sub_curve(sub, 1.0/(n-i), True)),
+                                    b.__class__(pts=self.sub_curve(sub, 1.0/(n-i), False)))
+                    self.assertTrue(first.straight_enough(straightness) or d!=2)
+                    pass
+                self.assertTrue(sub.straight_enough(straightness) or d!=2)
+                if n>1:
+                    self.assertTrue(len(b.break_into_segments(straightness))>1)
+                    pass
+                pass
+            pass
+        pass
+    def sub_curve(self, b, t, first):
+        """
+        Control points of the part of b before (or after) t, by de Casteljau
+        """
+        pts = [list(p) for p in b.pts]
+        left = [pts[0]]
+        right = [pts[-1]]
+        while len(pts)>1:
+            pts = [[a+(c-a)*t for (a,c) in zip(pts[i],pts[i+1])] for i in range(len(pts)-1)]
+            left.append(pts[0])
+            right.insert(0,pts[-1])
+            pass
+        if first: return left
+        return right
+    def test_flatten_list(self):
+        b0 = bezier_quad(pts=(self.point((0,0)),self.point((0,100)),self.point((50,0))))
+        b1 = bezier_quad(pts=(self.point((50,0)),self.point((100,-100)),self.point((100,0))))
+        pts = flatten_bezier_list([b0,b1], 1)
+        n0 = b0.flatten_count(1)
+        n1 = b1.flatten_count(1)
+        self.assertEqual(len(pts), 2*(n0+n1))
+        self.assertEqual(len(flatten_bezier_list([b0,b1], 1, closed=False)), 2*(n0+n1+1))
+        points = flatten_bezier_list_points([b0,b1], 1)
+        self.assertEqual(len(points), n0+n1)
+        self.assertTrue(points[0] is b0.pts[0])
+        self.assertTrue(points[n0] is b1.pts[0])
+        for i in range(len(points)):
+            self.assertTrue(isinstance(points[i], self.point))
+            self.check_vector(points[i].coords, pts[2*i:2*i+2])
+            pass
+        self.assertEqual(b0.flatten_points(1)[-1], b0.pts[-1])
+        self.assertEqual(bezier_cubic(pts=((0,0),(1,2),(2,2),(3,0))).flatten_points(1000), [(0,0),(3,0)])
+        pass
+    def test_flatten_cache(self):
+        cache = flatten_cache(max_entries=2)
+        b0 = bezier_quad(pts=(self.point((0,0)),self.point((0,100)),self.point((50,0))))
+        b1 = bezier_quad(pts=(self.point((50,0)),self.point((100,-100)),self.point((100,0))))
+        b2 = bezier_cubic(pts=((0,0),(0,100),(100,100),(100,0)))
+        pts = flatten_bezier_list([b0,b1], 1)
+        self.assertEqual(flatten_bezier_list([b0,b1], 1, cache=cache), pts)
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+        self.assertEqual(flatten_bezier_list([b0,b1], 1, cache=cache), pts)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        self.assertEqual(cache.flatten(b0, 1), b0.flatten(1))
+        self.assertEqual(cache.flatten(b0, 0.5), b0.flatten(0.5))
+        self.assertEqual((cache.hits, cache.misses, cache.evictions), (3, 3, 1))
+        self.assertEqual(len(cache), 2)
+        # An equal curve built from new points hits the cache
+        b0_copy = bezier_quad(pts=(self.point((0,0)),self.point((0,100)),self.point((50,0))))
+        points = flatten_bezier_list_points([b0_copy], 1, cache=cache)
+        self.assertEqual(cache.hits, 4)
+        self.assertTrue(points[0] is b0_copy.pts[0])
+        self.assertEqual(len(points), b0.flatten_count(1))
+        self.assertEqual(cache.flatten(b2, 1), b2.flatten(1))
+        self.assertEqual(cache.flatten(b2, 1, include_last=False), b2.flatten(1, include_last=False))
+        self.assertEqual(cache.stats()["evictions"], 2)
+        cache.clear()
+        self.assertEqual((len(cache), cache.hits, cache.misses), (0, 0, 0))
+        pass
+    def test_split(self):
+        b = bezier_cubic(pts=([0,0],[0,100],[100,100],[100,0]))
+        (b0, b1) = b.split_in_two()
+        self.check_vector(b0.pts[0], b.pts[0])
+        self.check_vector(b0.pts[3], b.evaluate(0.5))
+        self.check_vector(b1.pts[0], b.evaluate(0.5))
+        self.check_vector(b0.evaluate(0.5), b.evaluate(0.25))
+        self.check_vector(b1.evaluate(0.5), b.evaluate(0.75))
+        segments = b.break_into_segments(1)
+        self.check_vector(segments[0].pts[0], b.pts[0])
+        self.check_vector(segments[-1].pts[-1], b.pts[-1])
+        for i in range(len(segments)-1):
+            self.check_vector(segments[i].pts[-1], segments[i+1].pts[0])
+            pass
+        pass
+    pass
+
+#c Bezier evaluation tests
+class EvaluateManyBezierTests(unittest.TestCase):
+    ts = [0.0, 0.1, 0.25, 0.5, 0.8, 1.0]
+    patch_pts = [ (float(i), float(j), float((i*j+i)%3)-1.0) for j in range(4) for i in range(4) ]
+    def check_vector(self,d,value,tolerance=epsilon):
+        self.assertEqual(len(value),len(d), 'Length of vectors differs')
+        for i in range(len(d)):
+            self.assertTrue(abs(value[i]-d[i])<tolerance, 'Coordinate %d mismatches (%s, %s)'%(i,str(value),str(d)))
+            pass
+        pass
+    def test_evaluate_many(self):
+        h = 1E-6
+        for b in [ bezier_quad(pts=([0,0],[0,100],[50,0])),
+                   bezier_quad(pts=([0,0,0],[10,20,-30],[40,0,10])),
+                   bezier_cubic(pts=([0,0],[10,100],[100,-100],[100,0])),
+                   ]:
+            pts = b.evaluate_many(self.ts)
+            self.assertEqual(pts.shape, (len(self.ts),len(b.pts[0])))
+            (pts, gradients) = b.evaluate_many(self.ts, gradient=True)
+            for i in range(len(self.ts)):
+                t = self.ts[i]
+                self.check_vector(pts[i], b.evaluate(t))
+                g = [(x1-x0)/(2*h) for (x0,x1) in zip(b.evaluate(t-h),b.evaluate(t+h))]
+                self.assertTrue(max([abs(x-y) for (x,y) in zip(g,gradients[i])])<1E-4)
+                pass
+            pass
+        dots = []
+        bezier_quad(pts=([0,0],[0,100],[50,0])).draw_in_dots(lambda pt:dots.append(pt), steps=10)
+        self.assertEqual(len(dots), 11)
+        self.check_vector(dots[5], bezier_quad(pts=([0,0],[0,100],[50,0])).evaluate(0.5))
+        pass
+    def test_patch_grid(self):
+        patch = bezier_cubic_patch(self.patch_pts)
+        us = [0.0, 0.3, 1.0]
+        grid = patch.coord_grid(self.ts, us)
+        self.assertEqual(grid.shape, (len(self.ts),len(us),3))
+        normals = patch.normal_grid(self.ts, us)
+        self.assertEqual(normals.shape, (len(self.ts),len(us),3))
+        for a in range(len(self.ts)):
+            for b in range(len(us)):
+                self.check_vector(grid[a,b], patch.coord(self.ts[a],us[b]))
+                self.check_vector(normals[a,b], patch.normal(self.ts[a],us[b]))
+                pass
+            pass
+        pass
+    def test_patch_tessellate(self):
+        import numpy
+        patch = bezier_cubic_patch(self.patch_pts)
+        (vertices, indices) = patch.tessellate(nt=4, nu=3)
+        self.assertEqual(vertices.dtype, numpy.float32)
+        self.assertEqual(indices.dtype, numpy.uint32)
+        self.assertEqual(vertices.shape, (5*4,8))
+        self.assertEqual(indices.shape, (2*3*4*3,))
+        self.assertTrue(indices.max()<len(vertices))
+        for v in vertices:
+            self.check_vector(v[0:3], patch.coord(v[6],v[7]), tolerance=1E-5)
+            n = patch.normal(v[6],v[7])
+            self.check_vector(v[3:6], vector_scale(n,1/vector_length(n)), tolerance=1E-5)
+            pass
+        for tri in indices.reshape((-1,3)):
+            (p0, p1, p2) = [numpy.array(vertices[i,0:3],dtype=numpy.float64) for i in tri]
+            self.assertTrue(numpy.dot(numpy.cross(p1-p0,p2-p0), vertices[tri[0],3:6])>0)
+            pass
+        # A patch curved only along t is only subdivided along t
+        flat_u = bezier_cubic_patch([ (float(i), float(j), float(i%3)) for j in range(4) for i in range(4) ])
+        (nt, nu) = flat_u.tessellate_count(0.001)
+        self.assertEqual(nu, 1)
+        self.assertTrue(nt>5)
+        self.assertEqual(len(flat_u.tessellate(straightness=0.001)[0]), (nt+1)*(nu+1))
+        self.assertTrue(flat_u.tessellate_count(0.001, max_segments=4)[0]==4)
+        self.assertRaises(Exception, flat_u.tessellate, nt=3)
+        pass
+    def test_bone_bezier(self):
+        from gjslib.graphics.bone import c_bezier
+        b = c_bezier(pts=((1.,2.),(3.,5.),(4.,0.),(5.,1.),(2.,2.)))
+        pts = b.coord_many(self.ts)
+        gradients = b.coord_many(self.ts, gradient=True)
+        for i in range(len(self.ts)):
+            self.check_vector(pts[i], b.coord(self.ts[i]))
+            self.check_vector(gradients[i], b.coord(self.ts[i], gradient=True))
+            pass
+        pass
+    pass
+
+#c Bezier arc length tests
+class ArcLengthBezierTests(unittest.TestCase):
+    curves = [ bezier_quad(pts=([0,0],[0,100],[50,0])),
+               bezier_quad(pts=([0,0,0],[10,20,-30],[40,0,10])),
+               bezier_cubic(pts=([0,0],[0,100],[100,100],[100,0])),
+               bezier_cubic(pts=([0,0],[10,100],[100,-100],[100,0])),
+               bezier_cubic(pts=([0,0],[0,0],[100,0],[100,0])),
+               ]
+    def polyline_lengths(self, pts):
+        import numpy
+        d = numpy.diff(pts, axis=0)
+        return numpy.concatenate(([0.0], numpy.cumsum(numpy.sqrt((d*d).sum(axis=-1)))))
+    def check_curve(self, evaluate_many, c):
+        import numpy
+        ts = numpy.linspace(0, 1, 100001)
+        lengths = self.polyline_lengths(evaluate_many(ts))
+        self.assertTrue(abs(c.length()-lengths[-1])<1E-6*lengths[-1])
+        ss = numpy.linspace(0, lengths[-1], 37)
+        t = c.t_at_length(ss)
+        self.assertTrue(numpy.all(numpy.abs(numpy.interp(t, ts, lengths)-ss)<1E-6*lengths[-1]))
+        self.assertTrue(numpy.all(numpy.diff(t)>0))
+        self.assertEqual(c.t_at_length(0), 0.0)
+        self.assertEqual(c.t_at_length(lengths[-1]*2), 1.0)
+        self.assertTrue(abs(c.t_at_length(ss[10])-t[10])<1E-12)
+        pts = c.point_at_length(ss)
+        self.assertTrue(numpy.all(numpy.abs(pts-evaluate_many(t))<1E-9))
+        return lengths[-1]
+    def test_arc_length(self):
+        import numpy
+        for b in self.curves:
+            self.check_curve(b.evaluate_many, b)
+            t = b.t_at_length(b.length()/3)
+            p = b.point_at_length(b.length()/3)
+            self.assertEqual(len(p), len(b.pts[0]))
+            self.assertTrue(numpy.all(numpy.abs(numpy.array(p)-b.evaluate(t))<1E-9))
+            pass
+        b = self.curves[2]
+        self.assertTrue(b.arc_length_table() is b.arc_length_table())
+        self.assertTrue(b.arc_length_table(segments=4) is not b.arc_length_table())
+        # A straight line at constant speed has length proportional to t
+        line = bezier_cubic(pts=([0,0],[1,1],[2,2],[3,3]))
+        self.assertTrue(abs(line.t_at_length(math.sqrt(2))-1/3.0)<1E-9)
+        pass
+    def test_bone_bezier(self):
+        from gjslib.graphics.bone import c_bezier
+        b = c_bezier(pts=((1.,2.),(3.,5.),(4.,0.),(5.,1.),(2.,2.)))
+        self.check_curve(b.coord_many, b)
+        p = b.point_at_length(b.length()/2)
+        self.assertEqual(type(p), tuple)
+        self.assertEqual(len(p), 2)
+        pass
+    pass
+
 #a Toplevel
 loader = unittest.TestLoader().loadTestsFromTestCase
 suites = [ loader(SimpleBezierTests),
+           loader(FlattenBezierTests),
+           loader(EvaluateManyBezierTests),
+           loader(ArcLengthBezierTests),
            ]
 
 if __name__ == '__main__':
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+#a Imports
+import random
+from gjslib.math.delaunay import *
+import unittest
+
+#a Test
+#c Constrained Delaunay tests
+class ConstrainedDelaunayTests(unittest.TestCase):
+    #f check_delaunay
+    def check_delaunay(self, cdt):
+        """
+        Check every edge that is not a constraint is locally Delaunay
+        """
+        for t in range(len(cdt.tri_v)):
+            (a,b,c) = cdt.tri_v[t]
+            for i in range(3):
+                u = cdt.tri_n[t][i]
+                if u is None: continue
+                if cdt.is_constraint( cdt.tri_v[t][(i+1)%3], cdt.tri_v[t][(i+2)%3] ): continue
+                q = cdt.tri_v[u][cdt.tri_n[u].index(t)]
+                self.assertTrue( in_circle( *(cdt.coords(a)+cdt.coords(b)+cdt.coords(c)+cdt.coords(q)) )<1E-9 )
+                pass
+            pass
+        pass
+    #f check_path
+    def check_path(self, cdt, a, b, path):
+        self.assertEqual( cdt.constraint_path(a,b), path )
+        for i in range(len(path)-1):
+            self.assertTrue( cdt.has_edge(path[i], path[i+1]) )
+            self.assertTrue( cdt.is_constraint(path[i], path[i+1]) )
+            pass
+        pass
+    #f test_random_points
+    def test_random_points(self):
+        r = random.Random(1)
+        pts = [ (r.random(), r.random()) for i in range(500) ]
+        cdt = constrained_delaunay( pts )
+        cdt.check_consistent()
+        self.check_delaunay( cdt )
+        # A triangulation of n points with h on the convex hull has 2n-h-2 triangles
+        self.assertTrue( 2*len(pts)-2-50 < len(cdt.triangles()) <= 2*len(pts)-5 )
+        pass
+    #f test_grid
+    def test_grid(self):
+        """
+        A grid has many collinear and cocircular points, and constraints that pass through points
+        """
+        cdt = constrained_delaunay( [ (x,y) for x in range(10) for y in range(10) ] )
+        self.assertEqual( len(cdt.triangles()), 162 )
+        cdt.insert_constraint( 0, 99 )
+        self.check_path( cdt, 0, 99, [0, 11, 22, 33, 44, 55, 66, 77, 88, 99] )
+        cdt.insert_constraint( 1, 38 )
+        self.check_path( cdt, 1, 38, [1, 38] )
+        cdt.check_consistent()
+        self.check_delaunay( cdt )
+        pass
+    #f test_crossing_constraints
+    def test_crossing_constraints(self):
+        cdt = constrained_delaunay( [ (x,y) for x in range(10) for y in range(10) ] )
+        cdt.insert_constraint( 0, 99 )
+        cdt.insert_constraint( 9, 90 )
+        self.assertEqual( len(cdt.added_vertices), 1 )
+        v = cdt.added_vertices[0]
+        self.assertEqual( cdt.coords(v), (4.5, 4.5) )
+        self.check_path( cdt, 9, 90, [9, 18, 27, 36, 45, v, 54, 63, 72, 81, 90] )
+        self.check_path( cdt, 0, 99, [0, 11, 22, 33, 44, v, 55, 66, 77, 88, 99] )
+        cdt.check_consistent()
+        self.check_delaunay( cdt )
+        r = random.Random(2)
+        pts = [ (r.random(), r.random()) for i in range(300) ]
+        cdt = constrained_delaunay( pts )
+        for i in range(30):
+            (a, b) = r.sample( range(len(pts)), 2 )
+            cdt.insert_constraint( a, b )
+            path = cdt.constraint_path( a, b )
+            self.assertEqual( (path[0], path[-1]), (a, b) )
+            pass
+        cdt.check_consistent()
+        self.check_delaunay( cdt )
+        pass
+    #f test_touching_constraints
+    def test_touching_constraints(self):
+        """
+        A constraint ending within rounding of another constraint must split that at its end, not add a point
+        """
+        for n in range(3,20):
+            (c, d) = ((0.1,0.2), (1.3,3.7))
+            b = (c[0]+(d[0]-c[0])/n, c[1]+(d[1]-c[1])/n)
+            cdt = constrained_delaunay( [ c, d, b, (1.0,0.0), (-1.0,1.0), (2.0,2.0) ] )
+            cdt.insert_constraint( 0, 1 )
+            cdt.insert_constraint( 3, 2 )
+            cdt.insert_constraint( 2, 4 )
+            self.assertEqual( cdt.added_vertices, [] )
+            self.check_path( cdt, 0, 1, [0, 2, 1] )
+            self.check_path( cdt, 3, 2, [3, 2] )
+            cdt.check_consistent()
+            pass
+        pass
+    #f All done
+    pass
+
+#a Toplevel
+loader = unittest.TestLoader().loadTestsFromTestCase
+suites = [ loader(ConstrainedDelaunayTests),
+           ]
+
+if __name__ == '__main__':
+    unittest.main()
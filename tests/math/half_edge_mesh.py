@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+#a Imports
+import numpy
+from gjslib.math.half_edge_mesh import *
+import gjslib.math.delaunay as delaunay
+from gjslib.math.mesh import c_mesh, c_simple_point
+import unittest
+
+#a Test
+#c Half-edge mesh tests
+class HalfEdgeMeshTests(unittest.TestCase):
+    contours = [ [ (0,0), (10,0), (10,10), (5,10), (0,10) ],
+                 [ (2,2), (2,8), (8,8), (8,2) ],
+                 [ (4,4), (6,4), (5,6) ] ]
+    #f build
+    def build(self):
+        h = half_edge_mesh()
+        for c in self.contours:
+            h.add_contour( c )
+            pass
+        h.add_point( (3,1) )
+        return h.triangulate()
+    #f area
+    def area(self, coords, tris):
+        (a, b, c) = (coords[tris[:,0]], coords[tris[:,1]], coords[tris[:,2]])
+        return 0.5*((b[:,0]-a[:,0])*(c[:,1]-a[:,1]) - (b[:,1]-a[:,1])*(c[:,0]-a[:,0]))
+    #f face_windings
+    def face_windings(self, coords, tris, windings):
+        return sorted( [ (tuple(sorted([tuple(coords[v]) for v in tris[f]])), windings[f]) for f in range(len(tris)) ] )
+    #f test_triangulate
+    def test_triangulate(self):
+        h = self.build()
+        h.check_consistent()
+        self.assertEqual( h.num_vertices, 13 )
+        self.assertEqual( h.num_faces, 2*13-5-2 )
+        self.assertTrue( numpy.all(h.face_flags & h.FACE_WINDING_SET) )
+        for c in h.contours:
+            for (v0, v1) in h.contour_edges(c):
+                self.assertTrue( h.find_half_edge(v0, v1)>=0 )
+                self.assertEqual( h.he_winding[h.find_half_edge(v0, v1)], 1 )
+                pass
+            pass
+        (coords, tris) = h.get_vertices_and_triangles()
+        self.assertTrue( abs(self.area(coords, tris).sum()-100)<1E-9 )
+        (coords, tris) = h.get_vertices_and_triangles( odd_winding_only=True )
+        self.assertTrue( abs(self.area(coords, tris).sum()-(100-36+2))<1E-9 )
+        pass
+    #f test_swap_diagonal
+    def test_swap_diagonal(self):
+        h = self.build()
+        (coords, tris) = h.get_vertices_and_triangles()
+        before = self.face_windings( coords, tris, numpy.zeros(len(tris)) )
+        swapped = 0
+        for e in range(3*h.num_faces):
+            t = h.he_twin[e]
+            if t<0: continue
+            (a, b) = (h.he_vertex[e], h.he_vertex[t])
+            (c, d) = (h.he_vertex[h.he_next[h.he_next[e]]], h.he_vertex[h.he_next[h.he_next[t]]])
+            oa = delaunay.orient( *(tuple(coords[d])+tuple(coords[c])+tuple(coords[a])) )
+            ob = delaunay.orient( *(tuple(coords[c])+tuple(coords[d])+tuple(coords[b])) )
+            if (oa<=0) or (ob<=0): continue
+            h.swap_diagonal( e )
+            h.check_consistent()
+            self.assertEqual( h.find_half_edge(d, c), e )
+            self.assertEqual( h.find_half_edge(a, b), -1 )
+            h.swap_diagonal( e )
+            h.check_consistent()
+            swapped += 1
+            pass
+        self.assertTrue( swapped>5 )
+        (coords, tris) = h.get_vertices_and_triangles()
+        self.assertEqual( self.face_windings( coords, tris, numpy.zeros(len(tris)) ), before )
+        pass
+    #f test_winding_after_swap
+    def test_winding_after_swap(self):
+        """
+        Swapping diagonals (including contour edges, so faces either side differ in winding) moves half-edges
+        between faces; the winding orders must match those of a freshly built mesh with the same triangles
+        """
+        h = self.build()
+        (coords, tris) = h.get_vertices_and_triangles()
+        swapped = 0
+        for e in range(3*h.num_faces):
+            t = h.he_twin[e]
+            if t<0: continue
+            (a, b) = (h.he_vertex[e], h.he_vertex[t])
+            (c, d) = (h.he_vertex[h.he_next[h.he_next[e]]], h.he_vertex[h.he_next[h.he_next[t]]])
+            oa = delaunay.orient( *(tuple(coords[d])+tuple(coords[c])+tuple(coords[a])) )
+            ob = delaunay.orient( *(tuple(coords[c])+tuple(coords[d])+tuple(coords[b])) )
+            if (oa<=0) or (ob<=0): continue
+            h.swap_diagonal( e )
+            swapped += 1
+            pass
+        self.assertTrue( swapped>5 )
+        h.check_consistent()
+        h.assign_winding_order()
+        (coords, tris) = h.get_vertices_and_triangles()
+        h2 = half_edge_mesh()
+        for xy in coords: h2.add_point( xy )
+        h2.contours = h.contours
+        h2.set_triangles( tris )
+        h2.assign_winding_order()
+        self.assertTrue( numpy.all(h.face_flags & h.FACE_WINDING_SET) )
+        self.assertEqual( self.face_windings( coords, tris, h.face_winding ), self.face_windings( coords, tris, h2.face_winding ) )
+        pass
+    #f test_convert
+    def test_convert(self):
+        m = c_mesh()
+        for c in self.contours:
+            m.add_contour( [c_simple_point(xy) for xy in c], closed=True )
+            pass
+        m.map_contours_to_mesh()
+        m.triangulate_contours()
+        h = half_edge_mesh.from_mesh( m )
+        h.check_consistent()
+        self.assertEqual( h.num_faces, len(m.triangles) )
+        (coords, tris) = h.get_vertices_and_triangles()
+        windings = self.face_windings( coords, tris, h.face_winding )
+        h.assign_winding_order()
+        self.assertEqual( self.face_windings( coords, tris, h.face_winding ), windings )
+        m2 = h.to_mesh( point_fn=c_simple_point )
+        m2.check_consistent()
+        self.assertEqual( len(m2.triangles), len(m.triangles) )
+        self.assertEqual( [len(c["mesh_pts"]) for c in m2.contours], [len(c["mesh_pts"]) for c in m.contours] )
+        h2 = half_edge_mesh.from_mesh( m2 )
+        (coords2, tris2) = h2.get_vertices_and_triangles()
+        self.assertEqual( self.face_windings( coords2, tris2, h2.face_winding ), windings )
+        m3 = h.to_mesh()
+        m3.check_consistent()
+        self.assertTrue( isinstance(m3.point_set[0].pt, c_simple_point) )
+        self.assertEqual( len(m3.triangles), len(m.triangles) )
+        h3 = half_edge_mesh.from_mesh( m3 )
+        (coords3, tris3) = h3.get_vertices_and_triangles()
+        self.assertEqual( self.face_windings( coords3, tris3, h3.face_winding ), windings )
+        pass
+    #f All done
+    pass
+
+#a Toplevel
+loader = unittest.TestLoader().loadTestsFromTestCase
+suites = [ loader(HalfEdgeMeshTests),
+           ]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -153,6 +153,42 @@ class SimpleMatrixTests(unittest.TestCase):
             self.check_vector(d1,d2)
             pass
         pass
+    #f test_lup_factorization
+    def test_lup_factorization(self):
+        """
+        Test lup_decompose factorizations - solve, solve_many, determinant, inverse - and their reuse
+        """
+        for (data, det) in [ ([1.,2.,4.,3.], -5.),
+                             ([1.,2.,3,4.,5.,4.,6.,3,2.], -24.),
+                             ([1.,0.,0.,0.,  0.,4.,2.,0., -5.,0.,0.,1., 0.,0.,1.,0.], -4.),
+                             ([0.,0.,1.,  1.,0.,0.,  0.,1.,0.], 1.),
+                             ]:
+            m = matrix(data=data)
+            n = m.order
+            lup = m.lup_decompose()
+            (LU, P) = lup
+            self.check_matrix(LU.lup_invert(P), lup.inverse().get_matrix())
+            self.check_scalar(lup.determinant(), det)
+            self.check_scalar(m.determinant(), det)
+            B = [range(1,n+1), range(n,0,-1), [0.]*n]
+            X = lup.solve_many(B)
+            for (b,x) in zip(B,X):
+                self.check_vector(m.apply(x), b)
+                self.check_vector(m.solve(b), x)
+                pass
+            self.check_matrix(matrix.multiply_matrices(m,m.inverse()), matrix(order=n).set_identity().get_matrix())
+            pass
+        m = matrix(data=[1.,2.,4.,3.])
+        lup = m.lup_factorization()
+        self.assertTrue(m.lup_factorization() is lup)
+        m.inverse()[0,0] = 100.
+        self.check_matrix(m.inverse(), [-0.6,0.4,0.8,-0.2])
+        m[1,1] = 8.
+        self.assertFalse(m.lup_factorization() is lup)
+        self.check_scalar(m.determinant(), 0.)
+        self.assertEqual(m.inverse(), None)
+        self.assertEqual(m.solve((1.,1.)), None)
+        return
     #f All done
     pass
 #a Main
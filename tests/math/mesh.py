@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+#a Imports
+import math
+import random
+from gjslib.math.mesh import *
+import unittest
+
+#a Test
+#c Mesh point set tests
+class MeshPointSetTests(unittest.TestCase):
+    #f test_add_point
+    def test_add_point(self):
+        r = random.Random(1)
+        mesh = c_mesh()
+        coords = [ (r.randint(0,20), r.randint(0,20)) for i in range(200) ]
+        mesh_pts = [ mesh.add_point( c_simple_point(xy) ) for xy in coords ]
+        self.assertEqual( len(mesh.point_set), len(set(coords)) )
+        for (xy, pt) in zip(coords, mesh_pts):
+            self.assertTrue( mesh.add_point( c_simple_point(xy) ) is pt )
+            pass
+        pts = list(mesh.point_set)
+        for i in range(len(pts)-1):
+            self.assertEqual( mesh.point_set[i].compare_with(mesh.point_set[i+1].pt), -1 )
+            pass
+        mesh.number_points()
+        self.assertEqual( [p.entry_number for p in mesh.point_set.sorted_points()], range(len(pts)) )
+        pass
+    #f test_remove_and_move
+    def test_remove_and_move(self):
+        mesh = c_mesh()
+        (a, b, c) = [ mesh.add_point( c_simple_point(xy) ) for xy in [(0,0), (2,0), (1,1)] ]
+        mesh.remove_point( b )
+        self.assertEqual( len(mesh.point_set), 2 )
+        self.assertFalse( b in mesh.point_set )
+        self.assertTrue( mesh.add_point( c_simple_point((2,0)) ) is not b )
+        mesh.move_point( c, (-1,0) )
+        self.assertEqual( mesh.point_set[0], c )
+        self.assertTrue( mesh.add_point( c_simple_point((-1,0)) ) is c )
+        self.assertEqual( len(mesh.point_set), 3 )
+        self.assertTrue( mesh.add_point( c_simple_point((1,1)) ) is not c )
+        pass
+    #f All done
+    pass
+
+#c Mesh triangulation tests
+class MeshTriangulateTests(unittest.TestCase):
+    #f add_contour
+    def add_contour(self, mesh, coords):
+        mesh.add_contour( [c_simple_point(xy) for xy in coords], closed=True )
+        pass
+    #f test_triangulate_contours
+    def test_triangulate_contours(self):
+        """
+        A square with a square hole, and a triangle inside the hole; every contour segment must be
+        a mesh line, and the triangles inside an odd number of contours must have an odd winding order
+        """
+        mesh = c_mesh()
+        self.add_contour( mesh, [ (0,0), (10,0), (10,10), (5,10), (0,10) ] )
+        self.add_contour( mesh, [ (2,2), (2,8), (8,8), (8,2) ] )
+        self.add_contour( mesh, [ (4,4), (6,4), (5,6) ] )
+        mesh.add_point( c_simple_point((3,1)) )
+        mesh.map_contours_to_mesh()
+        mesh.triangulate_contours()
+        mesh.check_consistent()
+        self.assertEqual( len(mesh.triangles), 2*len(mesh.point_set)-5-2 )
+        for c in mesh.contours:
+            pts = c["mesh_pts"]
+            for i in range(len(pts)):
+                self.assertTrue( pts[i-1].find_line_segment_to(pts[i]) is not None )
+                pass
+            pass
+        self.assertEqual( len(mesh.contours[0]["mesh_pts"]), 5 )
+        for t in mesh.triangles:
+            (x, y) = [ sum([p.coords()[i] for p in t.get_points()])/3.0 for i in range(2) ]
+            inside = 1
+            if (2<x<8) and (2<y<8): inside = 0
+            if (4<x<6) and (4<y<6) and (2*abs(x-5)<(6-y)): inside = 1
+            self.assertEqual( t.winding_order & 1, inside, "Triangle %s at %f,%f"%(str(t),x,y) )
+            pass
+        pass
+    #f test_collinear_contour_points
+    def test_collinear_contour_points(self):
+        """
+        A contour whose segment passes through another contour's point is split at that point
+        """
+        mesh = c_mesh()
+        self.add_contour( mesh, [ (0,0), (10,0), (10,10), (0,10) ] )
+        self.add_contour( mesh, [ (5,0), (7,5), (3,5) ] )
+        mesh.map_contours_to_mesh()
+        mesh.triangulate_contours()
+        mesh.check_consistent()
+        self.assertEqual( [p.coords() for p in mesh.contours[0]["mesh_pts"]], [(0,0), (5,0), (10,0), (10,10), (0,10)] )
+        pass
+    #f test_crossing_contours
+    def test_crossing_contours(self):
+        """
+        Two overlapping squares cross at two points, which must be added to the mesh and both contours
+        """
+        mesh = c_mesh()
+        self.add_contour( mesh, [ (0,0), (6,0), (6,6), (0,6) ] )
+        self.add_contour( mesh, [ (3,3), (9,3), (9,9), (3,9) ] )
+        mesh.map_contours_to_mesh()
+        mesh.triangulate_contours()
+        mesh.check_consistent()
+        self.assertEqual( len(mesh.point_set), 10 )
+        for xy in [ (6,3), (3,6) ]:
+            pt = mesh.point_set.find( c_simple_point(xy) )
+            self.assertTrue( isinstance(pt.pt, c_simple_point) )
+            for c in mesh.contours:
+                self.assertTrue( pt in c["mesh_pts"] )
+                pass
+            pass
+        for c in mesh.contours:
+            pts = c["mesh_pts"]
+            self.assertEqual( len(pts), 6 )
+            for i in range(len(pts)):
+                self.assertTrue( pts[i-1].find_line_segment_to(pts[i]) is not None )
+                pass
+            pass
+        for t in mesh.triangles:
+            (x, y) = [ sum([p.coords()[i] for p in t.get_points()])/3.0 for i in range(2) ]
+            inside = int((x<6) and (y<6)) + int((x>3) and (y>3))
+            self.assertEqual( t.winding_order & 1, inside & 1, "Triangle %s at %f,%f"%(str(t),x,y) )
+            pass
+        pass
+    #f All done
+    pass
+
+#c Mesh spatial index tests
+class MeshSpatialIndexTests(unittest.TestCase):
+    #f build_mesh
+    def build_mesh(self, n=60, seed=1):
+        r = random.Random(seed)
+        mesh = c_mesh()
+        for i in range(n):
+            mesh.add_point( c_simple_point( (r.uniform(0,100), r.uniform(0,50)) ) )
+            pass
+        mesh.fill_convex_hull_with_triangles()
+        while mesh.shorten_quad_diagonals()>0: pass
+        return mesh
+    #f brute_force_lines_on_line
+    def brute_force_lines_on_line(self, mesh, pt0, pt1):
+        (x0,y0) = pt0.coords()
+        (dx,dy) = (pt1.coords()[0]-x0, pt1.coords()[1]-y0)
+        intersections = []
+        for l in mesh.line_segments:
+            l_pts = l.get_points()
+            if pt0 in l_pts or pt1 in l_pts: continue
+            intersect = l.find_intersection( (x0,y0), (dx,dy) )
+            if intersect is not None: intersections.append( (l, intersect) )
+            pass
+        return intersections
+    #f is_convex_quad
+    def is_convex_quad(self, *pts):
+        crosses = []
+        for i in range(4):
+            (x0,y0) = pts[i].coords()
+            (x1,y1) = pts[(i+1)%4].coords()
+            (x2,y2) = pts[(i+2)%4].coords()
+            crosses.append( (x1-x0)*(y2-y1)-(y1-y0)*(x2-x1) )
+            pass
+        return (min(crosses)>0) or (max(crosses)<0)
+    #f check_lines_on_line
+    def check_lines_on_line(self, mesh, seed=2):
+        r = random.Random(seed)
+        for i in range(50):
+            (pt0, pt1) = r.sample(mesh.point_set, 2)
+            self.assertEqual( mesh.find_line_segments_on_line(pt0, pt1),
+                              self.brute_force_lines_on_line(mesh, pt0, pt1) )
+            pass
+        pass
+    #f test_cells_on_segment
+    def test_cells_on_segment(self):
+        grid = c_mesh_grid(1.0)
+        self.assertEqual( grid.cells_on_segment( (0.5,0.5), (0.6,0.7) ), [(0,0)] )
+        self.assertEqual( grid.cells_on_segment( (0.5,0.5), (2.5,0.5) ), [(0,0),(1,0),(2,0)] )
+        self.assertEqual( grid.cells_on_segment( (0.5,2.5), (0.5,0.5) ), [(0,0),(0,1),(0,2)] )
+        self.assertEqual( grid.cells_on_segment( (2.5,-0.3), (0.5,1.2) ), [(0,0),(0,1),(1,0),(2,-1),(2,0)] )
+        self.assertEqual( grid.cells_on_segment( (0.5,0.5), (1.5,1.5) ), [(0,0),(0,1),(1,0),(1,1)] )
+        pass
+    #f test_find_line_segments_on_line
+    def test_find_line_segments_on_line(self):
+        mesh = self.build_mesh()
+        self.check_lines_on_line(mesh)
+        mesh.check_consistent()
+        self.assertTrue( len(mesh.spatial_index.line_cells) > 1 )
+        pass
+    #f test_index_maintained
+    def test_index_maintained(self):
+        """
+        The index must remain consistent as lines are split, swapped and points moved
+        """
+        mesh = self.build_mesh()
+        mesh.check_consistent()
+        mesh.build_spatial_index()
+        swapped = 0
+        for l in mesh.line_segments:
+            if l.triangles[1] is None: continue
+            (A, B) = l.get_points()
+            X = l.triangles[0].get_other_point( l.pts )
+            Y = l.triangles[1].get_other_point( l.pts )
+            if not self.is_convex_quad(A, X, B, Y): continue
+            l.swap_diagonal(mesh)
+            swapped += 1
+            if swapped==10: break
+            pass
+        self.assertEqual( swapped, 10 )
+        mesh.check_consistent()
+        for l in mesh.line_segments[:5]:
+            (p0, p1) = l.get_points()
+            (x0,y0) = p0.coords()
+            (x1,y1) = p1.coords()
+            pt = mesh.add_point( c_simple_point( ((x0+x1)/2.0, (y0+y1)/2.0) ) )
+            mesh.split_line_segment( l, pt )
+            pass
+        mesh.check_consistent()
+        pt = mesh.point_set[10]
+        (x,y) = pt.coords()
+        mesh.move_point( pt, (x+0.01, y-0.01) )
+        mesh.check_consistent()
+        self.check_lines_on_line(mesh, seed=3)
+        pass
+    #f test_find_points_near
+    def test_find_points_near(self):
+        mesh = self.build_mesh()
+        for (xy, radius) in [ ((50,25), 10), ((0,0), 30), ((100,50), 1) ]:
+            near = [p for p in mesh.point_set if math.hypot(p.coords()[0]-xy[0],p.coords()[1]-xy[1])<=radius]
+            self.assertEqual( set(mesh.find_points_near(xy, radius)), set(near) )
+            pass
+        pass
+    #f test_invalidate
+    def test_invalidate(self):
+        mesh = self.build_mesh()
+        mesh.build_spatial_index()
+        mesh.reset_lines()
+        self.assertEqual( mesh.spatial_index, None )
+        pass
+    #f All done
+    pass
+
+#c Mesh cleanup tests
+class MeshCleanupTests(unittest.TestCase):
+    #f build_mesh
+    def build_mesh(self, n=80, seed=1):
+        """
+        Build a mesh of random points, with some pairs of points very close together
+        """
+        r = random.Random(seed)
+        mesh = c_mesh()
+        for i in range(n):
+            (x, y) = (r.uniform(0,100), r.uniform(0,50))
+            mesh.add_point( c_simple_point( (x, y) ) )
+            if (i%8)==0: mesh.add_point( c_simple_point( (x+r.uniform(-0.05,0.05), y+r.uniform(-0.05,0.05)) ) )
+            pass
+        mesh.fill_convex_hull_with_triangles()
+        return mesh
+    #f check_clean
+    def check_clean(self, mesh, min_length):
+        mesh.check_consistent()
+        for l in mesh.line_segments:
+            self.assertTrue( l.get_length()>min_length )
+            self.assertFalse( l.can_shorten_diagonal() )
+            pass
+        pass
+    #f test_cleanup
+    def test_cleanup(self):
+        mesh = self.build_mesh()
+        num_points = len(mesh.point_set)
+        operations = mesh.cleanup( min_length=0.1, min_area=1E-6 )
+        self.check_clean( mesh, 0.1 )
+        self.assertTrue( operations["lines_merged"]>=5 )
+        self.assertTrue( operations["diagonals_swapped"]>0 )
+        self.assertEqual( len(mesh.point_set), num_points-operations["lines_merged"] )
+        self.assertEqual( mesh.cleanup( min_length=0.1, min_area=1E-6 ),
+                          {"lines_merged":0, "points_moved":0, "diagonals_swapped":0, "triangles_removed":0, "converged":True} )
+        pass
+    #f test_realistic_thresholds
+    def test_realistic_thresholds(self):
+        """
+        With thresholds that make many small lines and triangles, cleanup must finish well inside its
+        bound, and must report the triangles that actually left the mesh
+        """
+        for seed in range(1,6):
+            r = random.Random(seed)
+            mesh = c_mesh()
+            for i in range(150):
+                mesh.add_point( c_simple_point( (r.uniform(0,100), r.uniform(0,100)) ) )
+                pass
+            mesh.fill_convex_hull_with_triangles()
+            num_triangles = len(mesh.triangles)
+            num_small = len([t for t in mesh.triangles if t.get_area()<=8.0])
+            operations = mesh.cleanup( min_length=3.0, min_area=8.0 )
+            mesh.check_consistent()
+            self.assertTrue( operations["converged"] )
+            self.assertTrue( operations["lines_merged"]+operations["points_moved"]+operations["diagonals_swapped"] < 2*num_triangles )
+            self.assertEqual( operations["triangles_removed"], num_triangles-len(mesh.triangles) )
+            self.assertTrue( operations["points_moved"]>0 )
+            self.assertTrue( len([t for t in mesh.triangles if t.get_area()<=8.0]) < num_small/4 )
+            pass
+        pass
+    #f test_small_area_triangles
+    def test_small_area_triangles(self):
+        """
+        A point just off the line between two others forms a sliver triangle that must be removed
+        """
+        mesh = c_mesh()
+        for xy in [ (0,0), (10,0), (10,10), (0,10), (5,5.001), (2,8), (8,2) ]:
+            mesh.add_point( c_simple_point(xy) )
+            pass
+        mesh.fill_convex_hull_with_triangles()
+        min_area = 0.5
+        operations = mesh.cleanup( min_length=0.01, min_area=min_area )
+        mesh.check_consistent()
+        self.assertTrue( operations["points_moved"]>0 )
+        for t in mesh.triangles:
+            self.assertTrue( t.get_area()>min_area )
+            pass
+        pass
+    #f test_max_operations
+    def test_max_operations(self):
+        mesh = self.build_mesh()
+        operations = mesh.cleanup( min_length=0.1, min_area=1E-6, max_operations=3 )
+        self.assertFalse( operations["converged"] )
+        self.assertEqual( operations["lines_merged"]+operations["points_moved"]+operations["diagonals_swapped"], 3 )
+        mesh.check_consistent()
+        operations = mesh.cleanup( min_length=0.1, min_area=1E-6 )
+        self.check_clean( mesh, 0.1 )
+        pass
+    #f All done
+    pass
+
+#a Toplevel
+loader = unittest.TestLoader().loadTestsFromTestCase
+suites = [ loader(MeshPointSetTests),
+           loader(MeshTriangulateTests),
+           loader(MeshSpatialIndexTests),
+           loader(MeshCleanupTests),
+           ]
+
+if __name__ == '__main__':
+    unittest.main()
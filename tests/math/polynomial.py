@@ -128,11 +128,189 @@ class CubicTests(TestBase):
 
 #c Polynomial tests
 class PolynomialTests(TestBase):
+    def test_evaluate(self):
+        p = polynomial([-6,11,-6,1])
+        for (x,v,dv) in [(0,-6,11), (1,0,2), (2,0,-1), (3,0,2), (-1.5,-39.375,35.75)]:
+            self.check_scalar(p.evaluate(x),v)
+            self.check_vector(p.evaluate_with_derivative(x),(v,dv))
+            self.check_scalar(p.derivative().evaluate(x),dv)
+            pass
+        self.check_scalar(polynomial([]).evaluate(3),0)
+        self.check_vector(polynomial([5]).evaluate_with_derivative(3),(5,0))
+        i = complex(imaginary=1)
+        self.check_vector([p.evaluate(i)],[complex(0,10)])
+        self.check_vector(p.evaluate_with_derivative(i),[complex(0,10),complex(8,-12)])
+        pass
+    def test_evaluate_many(self):
+        import numpy
+        p = polynomial([-6,11,-6,1])
+        xs = numpy.linspace(-2,5,15)
+        (v,dv) = p.evaluate_many(xs,derivative=True)
+        self.check_vector(p.evaluate_many(xs),[p.evaluate(x) for x in xs])
+        self.check_vector(v,[p.evaluate(x) for x in xs])
+        self.check_vector(dv,[p.evaluate_with_derivative(x)[1] for x in xs])
+        self.assertEqual(p.evaluate_many(xs.reshape((3,5))).shape,(3,5))
+        i = complex(imaginary=1)
+        q = polynomial([1,i*2,0,-i])
+        v = q.evaluate_many([0.5, 1j, -2])
+        for (x,vx) in zip([complex(0.5), i, complex(-2)], v):
+            f = q.evaluate(x)
+            self.check_vector([vx.real,vx.imag],f.cartesian())
+            pass
+        pass
+    def test_derivative_cache(self):
+        p = polynomial([1,2,3])
+        d = p.derivative()
+        self.check_vector(d.coeffs(),[2,6])
+        self.assertTrue(p.derivative() is d)
+        p.add(polynomial([0,0,0,1]))
+        self.check_vector(p.derivative().coeffs(),[2,6,3])
+        p.multiply(polynomial([0,1]))
+        self.check_vector(p.derivative().coeffs(),[1,4,9,4])
+        x = polynomial([-6,11,-6,1]).find_root(0.01)
+        self.check_scalar(x[0],1)
+        pass
+    def test_find_all_roots(self):
+        import numpy
+        p = polynomial([1])
+        for k in range(1,11):
+            p.multiply(polynomial([-k,1]))
+            pass
+        (roots, iterations, converged) = aberth_ehrlich(p.coeffs())
+        self.assertTrue(converged)
+        self.assertTrue(0<iterations<200)
+        self.check_vector(sorted(roots.real),range(1,11))
+        self.check_vector(roots.imag,[0]*10)
+        i = complex(imaginary=1)
+        r = polynomial([0,0,4,0,1]).find_all_roots()
+        self.assertEqual(len(r),4)
+        self.check_vector(sorted(r,key=lambda x:x.cartesian()[1]),[i*-2,complex(0),complex(0),i*2])
+        c = numpy.random.RandomState(1).random_sample(61)-0.5
+        (roots, iterations, converged) = aberth_ehrlich(c)
+        self.assertTrue(converged)
+        self.assertEqual(len(roots),60)
+        self.assertTrue(numpy.max(numpy.abs(numpy.polyval(c[::-1],roots)))<1E-9)
+        (roots, iterations, converged) = aberth_ehrlich([1,-3,3,-1])
+        self.assertTrue(converged)
+        # A triple root can only be found to about the cube root of the rounding error
+        self.assertTrue(numpy.max(numpy.abs(roots-1))<1E-4)
+        self.assertEqual(len(polynomial([5]).find_all_roots()),0)
+        self.assertEqual(aberth_ehrlich([1,2,3],max_iterations=1,fallback=False)[2],False)
+        # The numpy.roots fallback converges after one more iteration, so only no iterations at all can fail
+        self.assertEqual(aberth_ehrlich([1,2,3],max_iterations=1)[2],True)
+        self.assertRaises(Exception, polynomial([1,2,3]).find_all_roots, max_iterations=0)
+        q = polynomial([1,i*2,0,-i])
+        for r in q.find_all_roots():
+            self.check_vector([q.evaluate(r)],[complex(0)])
+            pass
+        pass
+    def test_find_all_roots_random(self):
+        import numpy
+        def relative_residual(c, z):
+            # Measure the residual relative to the rounding error in evaluating it, using the reversed polynomial outside the unit circle
+            if abs(z)<=1: return abs(numpy.polyval(c[::-1],z))/numpy.polyval(numpy.abs(c[::-1]),abs(z))
+            return abs(numpy.polyval(c,1/z))/numpy.polyval(numpy.abs(c),abs(1/z))
+        for n in [100, 200, 300]:
+            for seed in range(10):
+                c = numpy.random.RandomState(seed).random_sample(n+1)-0.5
+                (roots, iterations, converged) = aberth_ehrlich(c, fallback=False)
+                self.assertTrue(converged)
+                self.assertEqual(len(roots),n)
+                self.assertTrue(numpy.all(numpy.isfinite(roots)))
+                self.assertTrue(max([relative_residual(c,z) for z in roots])<1E-12)
+                pass
+            pass
+        # Coefficients spanning many orders of magnitude, with a tiny leading coefficient
+        c = [1E-30, 1, 1E10, 1, 1E-10, 1E-20]
+        (roots, iterations, converged) = aberth_ehrlich(c)
+        self.assertTrue(converged)
+        self.assertTrue(max([relative_residual(numpy.array(c),z) for z in roots])<1E-12)
+        pass
+    def test_fast_multiply(self):
+        import numpy
+        rs = numpy.random.RandomState(1)
+        a = rs.random_sample(150)*2-1
+        b = rs.random_sample(100)*2-1
+        pa = polynomial(a)
+        pb = polynomial(b)
+        self.check_vector(pa.copy().multiply(pb).coeffs(), numpy.convolve(a,b))
+        self.check_vector((pa*pb).coeffs(), pa.copy().multiply(pb,exact=True).coeffs())
+        # Binomial coefficients of (1+x)^100 exceed 2^53, so only exact multiplication gets them correctly rounded
+        p = polynomial([1])
+        binomial = [1]
+        for i in range(50):
+            p.multiply(polynomial([1,1]),exact=True)
+            binomial = [x+y for (x,y) in zip([0]+binomial,binomial+[0])]
+            pass
+        self.assertEqual(p.coeffs(), [float(x) for x in binomial])
+        q = p.copy().multiply(p,exact=True)
+        binomial = [1]
+        for i in range(100):
+            binomial = [x+y for (x,y) in zip([0]+binomial,binomial+[0])]
+            pass
+        self.assertEqual(q.coeffs(), [float(x) for x in binomial])
+        self.assertEqual(polynomial([-3,0,2]).multiply(polynomial([5,-7]),exact=True).coeffs(), [-15,21,10,-14])
+        pass
+    def test_fast_divide(self):
+        import numpy
+        rs = numpy.random.RandomState(2)
+        pb = polynomial(list(rs.random_sample(99)*0.1)+[1.0])
+        pc = polynomial(rs.random_sample(200))
+        pr = polynomial(rs.random_sample(99))
+        pa = pb*pc+pr
+        (q, r) = pa.divide(pb)
+        self.check_vector(q.coeffs(), pc.coeffs())
+        self.check_vector(r.coeffs(), pr.coeffs())
+        (q, r) = pa.divide(pb,exact=True)
+        self.check_vector(q.coeffs(), pc.coeffs())
+        self.check_vector(r.coeffs(), pr.coeffs())
+        # Complex coefficients must use long division even for large polynomials
+        to_complex = lambda xs:[complex(real=x,imaginary=y) for (x,y) in xs]
+        pb = polynomial(to_complex(zip(rs.random_sample(69)*0.1,rs.random_sample(69)*0.1)+[(1.0,0.0)]))
+        pc = polynomial(to_complex(zip(rs.random_sample(131),rs.random_sample(131))))
+        (q, r) = (pb*pc).divide(pb)
+        self.check_vector(q.coeffs(), pc.coeffs())
+        self.check_vector(r.coeffs(), [complex(0)]*69)
+        (q, r) = polynomial([-6,11,-6,1]).divide(polynomial([-1,1]))
+        self.check_vector(q.coeffs(), [6,-5,1])
+        self.assertEqual(len(r.coeffs()), 0)
+        pass
+    def test_evaluate_poly(self):
+        x_p_1 = polynomial([1,1])
+        self.check_vector(polynomial([0,0,1]).evaluate_poly(x_p_1).coeffs(), [1,2,1])
+        self.check_vector(polynomial([5]).evaluate_poly(x_p_1).coeffs(), [5])
+        self.assertEqual(len(polynomial([]).evaluate_poly(x_p_1).coeffs()), 0)
+        x = polynomial([-1,2,3])
+        for n in range(1,40):
+            p = polynomial([1.0/k for k in range(1,n+1)])
+            y = p.evaluate_poly(x)
+            self.assertEqual(len(y.coeffs()), 2*n-1)
+            for t in [-0.3, 0.1, 0.5]:
+                self.check_scalar(y.evaluate(t), p.evaluate(x.evaluate(t)))
+                pass
+            pass
+        p = polynomial([1]*30)
+        self.assertEqual(p.evaluate_poly(x_p_1,exact=True).coeffs(), p.evaluate_poly(x_p_1).coeffs())
+        pass
+    def test_factorize(self):
+        factors = polynomial([6,-1,-4,-1]).factorize()
+        self.assertEqual(len(factors),4)
+        self.check_vector(sorted([f.coeff(0) for f in factors[:3]]),[-1,2,3])
+        self.check_vector(factors[3].coeffs(),[-1])
+        factors = polynomial([2,2,2,2]).factorize()
+        self.assertEqual(len(factors),3)
+        factors = [factors[2]]+sorted(factors[:2],key=lambda f:len(f.coeffs()))
+        self.check_vector(factors[0].coeffs(),[2])
+        self.check_vector(factors[1].coeffs(),[1,1])
+        self.check_vector(factors[2].coeffs(),[1,0,1])
+        pass
     pass
 
 #a Toplevel
 loader = unittest.TestLoader().loadTestsFromTestCase
 suites = [ loader(QuadraticTests),
+           loader(CubicTests),
+           loader(PolynomialTests),
            ]
 
 if __name__ == '__main__':
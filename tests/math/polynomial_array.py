@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+#a Imports
+import math
+import numpy
+from gjslib.math.polynomial import *
+from gjslib.math.polynomial_array import *
+from gjslib.math.matrix import matrix
+import unittest
+epsilon = 1E-6
+
+#a Test
+#c Polynomial array tests
+class PolynomialArrayTests(unittest.TestCase):
+    """
+    Test that the batched solvers match quadratic and cubic
+    """
+    quadratics = [ (1,0,-1), (1,0,1), (1,-2,1), (1,2,1), (4,4,1), (2,-3,-7), (-1,0.5,3), (0,1,1) ]
+    cubics = [ (1,0,0,-1), (1,0,0,1), (1,3,3,1), (1,-3,3,-1), (1,-6,11,-6), (1,-5,3,9), (1,3,3,2),
+               (1,0,-1,0), (1,2,3,4), (5,4,3,2), (1,0,0,0), (-1,-2,-3,-4), (2,-1,-8,4), (0,1,2,3) ]
+    #f check_roots
+    def check_roots(self,roots,valid,value):
+        r = sorted(roots[valid])
+        value = sorted(value)
+        self.assertEqual(len(r),len(value), 'Number of real roots differs (%s, %s)'%(str(r),str(value)))
+        for i in range(len(r)):
+            self.assertTrue(abs(r[i]-value[i])<epsilon, 'Root %d mismatches (%s, %s)'%(i,str(r),str(value)))
+            pass
+        pass
+    #f test_quadratic
+    def test_quadratic(self):
+        (roots, valid) = solve_quadratic(self.quadratics)
+        self.assertEqual(roots.shape, (len(self.quadratics),2))
+        for n in range(len(self.quadratics)-1):
+            self.check_roots(roots[n], valid[n], quadratic(*self.quadratics[n]).find_real_roots())
+            all_roots = quadratic_roots(self.quadratics[n])[0]
+            for (r,c) in zip(all_roots, quadratic(*self.quadratics[n]).find_all_roots()):
+                self.assertTrue(abs(r-(c.real()+1j*c.imaginary()))<epsilon)
+                pass
+            pass
+        self.assertFalse(numpy.any(valid[-1]))
+        pass
+    #f test_cubic
+    def test_cubic(self):
+        (roots, valid) = solve_cubic(self.cubics)
+        self.assertEqual(roots.shape, (len(self.cubics),3))
+        for n in range(len(self.cubics)-1):
+            self.check_roots(roots[n], valid[n], cubic(*self.cubics[n]).find_real_roots())
+            pass
+        self.assertFalse(numpy.any(valid[-1]))
+        # The scalar cubic does not handle a depressed cubic with zero linear term; the batched one does
+        self.check_roots(*(solve_cubic((1,0,0,8))+([-2],)))
+        self.check_roots(*(solve_cubic((1,-3,3,7))+([-1],)))
+        coeffs = numpy.random.RandomState(1).random_sample((200,4))*2-1
+        r = cubic_roots(coeffs)
+        for n in range(len(coeffs)):
+            (a,b,c,d) = coeffs[n]
+            f = ((a*r[n]+b)*r[n]+c)*r[n]+d
+            self.assertTrue(numpy.all(numpy.abs(f)<1E-6*(1+abs(a)*numpy.abs(r[n])**3)))
+            pass
+        pass
+    #f test_eigenvalues
+    def test_eigenvalues(self):
+        datas = [ [2.,0.,0., 0.,3.,4., 0.,4.,9.],
+                  [1.,0.,1., 4.,3.,1., -2.,3.,2.],
+                  [1.,0.,0., 0.,0.,-1., 0.,1.,0.],
+                  [0.,1.,0., 0.,0.,1., 1.,0.,0.],
+                  ]
+        (e, valid) = solve_eigenvalues(datas)
+        for n in range(len(datas)):
+            self.check_roots(e[n], valid[n], matrix(data=datas[n]).eigenvalues())
+            pass
+        datas = [ [3.,0.,2.,1.], [1.,0.,-2.,3.], [0.,-1.,1.,0.] ]
+        (e, valid) = solve_eigenvalues(numpy.array(datas).reshape((-1,2,2)))
+        for n in range(len(datas)):
+            self.check_roots(e[n], valid[n], matrix(data=datas[n]).eigenvalues())
+            pass
+        self.assertRaises(Exception, solve_eigenvalues, [range(16)])
+        pass
+    #f All done
+    pass
+
+#a Toplevel
+loader = unittest.TestLoader().loadTestsFromTestCase
+suites = [ loader(PolynomialArrayTests),
+           ]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -121,6 +121,38 @@ class SimpleQuatTests(unittest.TestCase):
         self.assertFalse(bool(qj1-qj1))
         self.assertFalse(bool(qk1-qk1))
         pass
+    def test_rotate_vector(self):
+        for q in [quaternion.identity(),
+                  quaternion.of_euler(roll=10,pitch=20,yaw=30,degrees=True),
+                  quaternion(r=0.5,i=-1.5,j=2,k=0.25),
+                  quaternion(r=0,i=0,j=0,k=0),
+                  ]:
+            for v in [(1,0,0),(0,1,0),(0,0,1),(1,2,3)]:
+                expected = (q.copy().conjugate() * quaternion(r=0,i=v[0],j=v[1],k=v[2]) * q).get()
+                self.check_quat(quaternion(quat=(0,)+q.rotate_vector(v)), expected)
+                pass
+            pass
+        self.check_quat(quaternion(quat=(0,)+quaternion.pitch(90,degrees=True).rotate_vector((1,2,3))), (0,-3,2,1))
+        pass
+    def test_matrix_cache(self):
+        q = quaternion.of_euler(roll=30,degrees=True)
+        m = q.get_matrix().get_matrix()
+        q.multiply(quaternion.of_euler(roll=30,degrees=True))
+        self.assertTrue(abs(q.get_matrix()[0,0]-0.5)<epsilon, 'Matrix not updated by multiply')
+        self.check_quat(quaternion(quat=(0,)+q.rotate_vector((1,0,0))), (0,0.5,-math.sqrt(3)/2,0))
+        q.quat = {"r":1,"i":0,"j":0,"k":0}
+        self.assertTrue(abs(q.get_matrix()[0,0]-1)<epsilon, 'Matrix not updated by setting quat')
+        self.assertEqual(q.quat, {"r":1,"i":0,"j":0,"k":0})
+        pass
+    def test_interpolate(self):
+        q0 = quaternion.of_euler(roll=10,degrees=True)
+        q1 = quaternion.of_euler(roll=50,degrees=True)
+        self.check_quat(q0.interpolate(q1,0), q0.get())
+        self.check_quat(q0.interpolate(q1,1), q1.get())
+        self.check_quat(q0.interpolate(q1,0.25), quaternion.of_euler(roll=20,degrees=True).get())
+        self.check_quat(q0.interpolate(-q1,0.25), quaternion.of_euler(roll=20,degrees=True).get())
+        self.check_quat(q0.interpolate(q0,0.5), q0.get())
+        pass
     def dont_test_other_stuff(self):
         print "Identity, roll30, pitch30, yaw30..."
         i = c_quaternion.identity()
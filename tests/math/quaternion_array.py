@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+#a Imports
+import math
+import numpy
+from gjslib.math.quaternion import *
+from gjslib.math.quaternion_array import *
+import unittest
+epsilon = 1E-6
+
+#a Test
+#c Quaternion array tests
+class QuatArrayTests(unittest.TestCase):
+    """
+    Test that quaternion_array matches quaternion element by element
+    """
+    rpys = [ (0,0,0), (10,20,30), (-40,5,60), (90,0,0), (0,90,0), (170,-80,45), (10,20,30.00001), (200,10,-100) ]
+    #f check_quat
+    def check_quat(self,d,value):
+        self.assertEqual(len(value),len(d), 'BUG: Length of quaternion test value is not 4!!')
+        for i in range(len(d)):
+            self.assertTrue(abs(value[i]-d[i])<epsilon, 'Coordinate %d mismatches (%s, %s)'%(i,str(value),str(d)))
+            pass
+        pass
+    #f check_quats
+    def check_quats(self,qa,qs):
+        self.assertEqual(len(qa),len(qs), 'Number of quaternions differs')
+        for i in range(len(qs)):
+            self.check_quat(qa.get()[i], qs[i].get())
+            pass
+        pass
+    #f quats
+    def quats(self):
+        qs = [quaternion.of_euler(rpy=rpy, degrees=True) for rpy in self.rpys]
+        qs.append(quaternion(r=0.5,i=-1.5,j=2,k=0.25))
+        return qs
+    #f test_make
+    def test_make(self):
+        qs = self.quats()
+        qa = quaternion_array.of_quaternions(qs)
+        self.check_quats(qa, qs)
+        self.check_quats(quaternion_array.of_euler(rpy=self.rpys, degrees=True), qs[:-1])
+        self.check_quats(quaternion_array.identity(3), [quaternion.identity()]*3)
+        for i in range(len(qs)):
+            self.check_quat(qa[i].get(), qs[i].get())
+            pass
+        self.check_quats(qa, quaternion_array.of_quaternions(qa.to_quaternions()).to_quaternions())
+        pass
+    #f test_arithmetic
+    def test_arithmetic(self):
+        qs = self.quats()
+        qa = quaternion_array.of_quaternions(qs)
+        others = qs[1:]+qs[:1]
+        qo = quaternion_array.of_quaternions(others)
+        self.check_quats(qa.copy().multiply(qo), [q.copy().multiply(o) for (q,o) in zip(qs,others)])
+        self.check_quats(qa.copy().multiply(qo,premultiply=True), [q.copy().multiply(o,premultiply=True) for (q,o) in zip(qs,others)])
+        self.check_quats(qa.copy().multiply(qs[1]), [q.copy().multiply(qs[1]) for q in qs])
+        self.check_quats(qa.copy().conjugate(), [q.copy().conjugate() for q in qs])
+        self.check_quats(qa.copy().reciprocal(), [q.copy().reciprocal() for q in qs])
+        self.check_quats(qa.copy().normalize(), [q.copy().normalize() for q in qs])
+        self.check_quats(qa.copy().add(qo,scale=-2), [q.copy().add(o,scale=-2) for (q,o) in zip(qs,others)])
+        self.check_quats(qa.copy().scale(3), [q.copy().scale(3) for q in qs])
+        self.check_quat(qa.modulus(), [q.modulus() for q in qs])
+        pass
+    #f test_conversions
+    def test_conversions(self):
+        qs = self.quats()
+        qa = quaternion_array.of_quaternions(qs)
+        self.check_quat(qa.to_euler(degrees=True).ravel(), numpy.array([q.to_euler(degrees=True) for q in qs]).ravel())
+        self.check_quat(qa.to_euler(include_modulus=True).ravel(), numpy.array([q.to_euler(include_modulus=True) for q in qs]).ravel())
+        self.check_quat(qa.get_matrices().ravel(), numpy.array([q.get_matrix().get_matrix() for q in qs]).ravel())
+        qm = quaternion_array.of_matrices(qa.get_matrices())
+        self.check_quats(qm, [quaternion().from_matrix(q.get_matrix()) for q in qs])
+        self.assertRaises(Exception, quaternion_array.of_matrices, [[0,0,0],[0,1,0],[0,0,1]])
+        pass
+    #f test_rotate_vectors
+    def test_rotate_vectors(self):
+        qs = self.quats()
+        qa = quaternion_array.of_quaternions(qs)
+        v = (1,2,3)
+        self.check_quat(qa.rotate_vectors(v).ravel(), numpy.array([q.rotate_vector(v) for q in qs]).ravel())
+        vs = [(i,1-i,2*i) for i in range(len(qs))]
+        self.check_quat(qa.rotate_vectors(vs).ravel(), numpy.array([q.rotate_vector(v) for (q,v) in zip(qs,vs)]).ravel())
+        pass
+    #f test_interpolate
+    def test_interpolate(self):
+        qs = self.quats()
+        qa = quaternion_array.of_quaternions(qs)
+        # Include exact, near-parallel and opposite-sign partners
+        others = [qs[1], qs[0], -qs[2], qs[3], qs[4].copy().scale(-1), qs[5], qs[1], qs[0], qs[2]]
+        qo = quaternion_array.of_quaternions(others)
+        for t in [0, 0.25, 0.5, 1.0]:
+            self.check_quats(qa.interpolate(qo,t), [q.interpolate(o,t) for (q,o) in zip(qs,others)])
+            self.check_quats(qa.interpolate(qs[2],t), [q.interpolate(qs[2],t) for q in qs])
+            pass
+        ts = numpy.linspace(0,1,len(qs))
+        self.check_quats(qa.interpolate(qo,ts), [q.interpolate(o,t) for (q,o,t) in zip(qs,others,ts)])
+        self.check_quats(qa.interpolate(qo,ts,epsilon=0.5), [q.interpolate(o,t,epsilon=0.5) for (q,o,t) in zip(qs,others,ts)])
+        pass
+    #f All done
+    pass
+
+#a Toplevel
+loader = unittest.TestLoader().loadTestsFromTestCase
+suites = [ loader(QuatArrayTests),
+           ]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+#a Imports
+import math
+import numpy
+from gjslib.math.quaternion import *
+from gjslib.math.quaternion_spline import *
+import unittest
+epsilon = 1E-6
+
+#a Test
+#c Quaternion spline tests
+class QuatSplineTests(unittest.TestCase):
+    times = [0, 1, 3, 4, 8]
+    rpys = [ (0,0,0), (40,10,0), (40,10,0.00001), (-100,80,30), (170,-20,200) ]
+    #f check_quat
+    def check_quat(self,d,value,same_rotation=False):
+        self.assertEqual(len(value),len(d), 'BUG: Length of quaternion test value is not 4!!')
+        if same_rotation and (numpy.dot(d,value)<0): value = [-x for x in value]
+        for i in range(len(d)):
+            self.assertTrue(abs(value[i]-d[i])<epsilon, 'Coordinate %d mismatches (%s, %s)'%(i,str(value),str(d)))
+            pass
+        pass
+    #f keys
+    def keys(self):
+        keys = [quaternion.of_euler(rpy=rpy, degrees=True) for rpy in self.rpys]
+        keys[3].scale(-1)
+        return keys
+    #f test_slerp
+    def test_slerp(self):
+        """
+        Without squad, samples must match quaternion.interpolate between the surrounding keys
+        """
+        keys = self.keys()
+        spline = quaternion_spline(self.times, keys)
+        ts = numpy.linspace(-1, 9, 101)
+        qa = spline.sample(ts)
+        self.assertEqual(len(qa), len(ts))
+        for (t,q) in zip(ts, qa.get()):
+            tc = min(max(t,self.times[0]),self.times[-1])
+            n = 0
+            while (n<len(self.times)-2) and (tc>=self.times[n+1]): n+=1
+            u = (tc-self.times[n])/float(self.times[n+1]-self.times[n])
+            self.check_quat(q, keys[n].interpolate(keys[n+1],u).get())
+            pass
+        self.check_quat(spline.sample_at(3).get(), keys[2].get())
+        self.assertEqual(len(spline.sample_range(0,8,17)), 17)
+        pass
+    #f test_squad
+    def test_squad(self):
+        """
+        With squad, the track must pass through the keys and be continuous, and two keys give a slerp
+        """
+        keys = self.keys()
+        spline = quaternion_spline(self.times, keys, squad=True)
+        for (t,k) in zip(self.times, keys):
+            self.check_quat(spline.sample_at(t).get(), k.get(), same_rotation=True)
+            pass
+        ts = numpy.linspace(0, 8, 8001)
+        q = spline.sample(ts).get()
+        self.assertTrue(numpy.max(numpy.abs(numpy.diff(q,axis=0)))<0.01, 'Squad track is not continuous')
+        self.assertTrue(numpy.all(numpy.abs(spline.sample(ts).modulus()-1)<0.01), 'Squad track strays from unit quaternions')
+        spline = quaternion_spline(self.times[:2], keys[:2], squad=True)
+        for t in [0, 0.3, 0.5, 1]:
+            self.check_quat(spline.sample_at(t).get(), keys[0].interpolate(keys[1],t).get(), same_rotation=True)
+            pass
+        pass
+    #f test_errors
+    def test_errors(self):
+        keys = self.keys()
+        self.assertRaises(Exception, quaternion_spline, [0], keys[:1])
+        self.assertRaises(Exception, quaternion_spline, [0,1,2], keys[:2])
+        self.assertRaises(Exception, quaternion_spline, [0,1,1], keys[:3])
+        pass
+    #f All done
+    pass
+
+#a Toplevel
+loader = unittest.TestLoader().loadTestsFromTestCase
+suites = [ loader(QuatSplineTests),
+           ]
+
+if __name__ == '__main__':
+    unittest.main()
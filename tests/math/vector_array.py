@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+#a Imports
+import math
+from gjslib.math.vectors import *
+from gjslib.math.vector_array import *
+import unittest
+epsilon = 1E-9
+
+#a Test
+#c Vector array tests
+class VectorArrayTests(unittest.TestCase):
+    """
+    Test that the vector_array functions match the vectors functions row by row
+    """
+    vecs = [ (1,2,3), (-1,0.5,2), (0,0,0), (1E-10,0,0), (3,-4,12), (0.25,0.5,-0.125) ]
+    #f check_scalar
+    def check_scalar(self,d,value):
+        self.assertTrue(abs(d-value)<epsilon, 'Scalars differ too much %s,%s'%(str(d),str(value)))
+        pass
+    #f check_vector
+    def check_vector(self,d,value):
+        self.assertEqual(len(value),len(d), 'Length of vectors differs')
+        for i in range(len(d)):
+            self.assertTrue(abs(value[i]-d[i])<epsilon, 'Coordinate %d mismatches'%i)
+            pass
+        pass
+    #f check_scalars
+    def check_scalars(self,ds,values):
+        self.assertEqual(len(ds),len(values), 'Number of results differs')
+        for i in range(len(ds)):
+            self.check_scalar(ds[i],values[i])
+            pass
+        pass
+    #f check_vectors
+    def check_vectors(self,ds,values):
+        self.assertEqual(len(ds),len(values), 'Number of results differs')
+        for i in range(len(ds)):
+            self.check_vector(ds[i],values[i])
+            pass
+        pass
+    #f test_length
+    def test_length(self):
+        """
+        Test lengths, squared lengths and dot products
+        """
+        others = self.vecs[1:]+self.vecs[:1]
+        self.check_scalars(vector_array_length(self.vecs), [vector_length(v) for v in self.vecs])
+        self.check_scalars(vector_array_squared(self.vecs), [vector_squared(v) for v in self.vecs])
+        self.check_scalars(vector_array_dot_product(self.vecs,others), [vector_dot_product(a,b) for (a,b) in zip(self.vecs,others)])
+        self.check_scalars(vector_array_separation(self.vecs,others), [vector_separation(a,b) for (a,b) in zip(self.vecs,others)])
+        self.check_scalars(vector_array_cos_angle_between(self.vecs,others), [vector_cos_angle_between(a,b) for (a,b) in zip(self.vecs,others)])
+        return
+    #f test_normalize
+    def test_normalize(self):
+        """
+        Test normalization, including vectors shorter than epsilon
+        """
+        self.check_vectors(vector_array_normalize(self.vecs), [vector_normalize(v) for v in self.vecs])
+        self.check_vectors(vector_array_normalize(self.vecs,epsilon=1), [vector_normalize(v,epsilon=1) for v in self.vecs])
+        return
+    #f test_scale_add
+    def test_scale_add(self):
+        """
+        Test scaling and addition with scalar, cyclic list and per-vector scales
+        """
+        for scale in [2.0, -1, (2,), (1,2,3), (1,-1)]:
+            self.check_vectors(vector_array_scale(self.vecs,scale), [vector_scale(v,scale) for v in self.vecs])
+            self.check_vectors(vector_array_add(self.vecs,(1,0,-1),scale), [vector_add(v,(1,0,-1),scale) for v in self.vecs])
+            pass
+        scales = [[i] for i in range(len(self.vecs))]
+        self.check_vectors(vector_array_scale(self.vecs,numpy.array(scales)), [vector_scale(v,i) for (v,i) in zip(self.vecs,scales)])
+        return
+    #f test_vector_product
+    def test_vector_product(self):
+        """
+        Test n-dimensional vector products against vector_cross_product
+        """
+        tests = [ [((1,2),), ((0,1),), ((-3,0.5),)],
+                  [((1,0,0),(0,1,0)), ((1,4,6),(7,2,3)), ((1,0,1),(0,0,1))],
+                  [((1,2,3,4),(4,2,3,1),(1,1,1,1)), ((1,2,3,4),(1,2,2,1),(1,1,1,1)), ((1,1,1,1),(1,2,2,1),(1,2,3,4))],
+                  ]
+        for rows in tests:
+            vs = [ [r[i] for r in rows] for i in range(len(rows[0])) ]
+            self.check_vectors(vector_array_cross_product(vs), [vector_cross_product(r) for r in rows])
+            pass
+        self.assertRaises(Exception, vector_array_cross_product, [[(1,2,3)]])
+        return
+    #f test_plane_points
+    def test_plane_points(self):
+        """
+        Test points on planes
+        """
+        (p0,p1,p2) = ((10,10,10),(1,0,-1),(5,0,-5))
+        ks = [(0,0),(1,0),(0,1),(0.5,0.5),(-2,3)]
+        k01 = numpy.array([[k[0]] for k in ks])
+        k02 = numpy.array([[k[1]] for k in ks])
+        self.check_vectors(vector_array_point_on_plane(p0,p1,p2,k01,k02), [vector_point_on_plane(p0,p1,p2,k[0],k[1]) for k in ks])
+        return
+    pass
+
+#a Toplevel
+loader = unittest.TestLoader().loadTestsFromTestCase
+suites = [ loader(VectorArrayTests),
+           ]
+
+if __name__ == '__main__':
+    unittest.main()
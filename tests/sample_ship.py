@@ -1,6 +1,6 @@
 #a Imports
 import gjslib.graphics.bone as bones
-from gjslib.math.bezier import c_point
+from gjslib.graphics.bone import c_point
 
 #a Test stuff
 def build_ship():